@@ -0,0 +1,475 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Runs many extraction jobs at once, reading each TLE file only once.
+
+The jobs are setup files, see :mod:`setup_file`. The jobs sharing input
+files, directly or through other jobs, form a group. In a group, each input
+file is read and validated once, each TLE is decoded once, and its row is
+written in the output files of all the jobs whose designators and filters
+accept it. The groups do not share any file, so they are run in parallel by
+worker processes.
+
+Once all the groups are done, the status of each job is logged and written
+in a JSON report, see :func:`write_report`.
+
+Usage::
+
+    stope.pyw --batch "jobs/*.txt" --report report.json --workers 4
+
+..note:: The rows of a job are written in the order of the files of its group, that is the order in which the files first appear in the jobs of the group.
+"""
+
+import collections
+import json
+import logging
+import os
+import time
+
+import setup_file
+import tle
+import writers
+
+logger = logging.getLogger("root")
+
+# Statuses of the jobs in the report.
+STATUS_WRITTEN = "written"
+STATUS_EMPTY = "empty"
+STATUS_FAILED = "failed"
+STATUS_INVALID = "invalid"
+
+class Job:
+    """An extraction job of a batch, described by a setup file.
+    
+    :param job_file: Path of the setup file.
+    :type job_file: str
+    :param data: The data of the setup file, see :func:`setup_file.load`.
+    :type data: dict
+    :raise ValueError: If the filters or the columns of the job are invalid.
+    
+    :ivar cospars: Set of the designators, or None for all satellites.
+    :ivar input_files: Absolute paths of the input files.
+    :ivar tle_filter: The :class:`tle.TLEFilter` of the job, or None.
+    :ivar columns: Keys of the written columns, or None for all of them.
+    """
+    
+    def __init__(self, job_file, data):
+        self.job_file = job_file
+        self.cospars = tle.designator_set(data["cospar_designators"] or None)
+        self.output_file = data["output_file"]
+        self.input_files = [os.path.abspath(input_file) for input_file in data["input_files"] if input_file]
+        self.tle_filter = tle.TLEFilter(data["filters"]) if data["filters"] else None
+        self.columns = tle.select_columns(data["columns"]) if data["columns"] else None
+
+def load_jobs(job_files):
+    """Reads the setup files of the jobs.
+    
+    A setup file given many times, for example by overlapping patterns, is
+    read once. The jobs writing the same output file are all invalid, since
+    they would overwrite each other.
+    
+    :param job_files: Paths of the setup files.
+    :type job_files: list
+    :return: Tuple of the list of the valid :class:`Job` and of the statuses of the invalid ones, see :func:`job_status`.
+    :rtype: tuple
+    """
+    
+    jobs = []
+    statuses = []
+    read_files = set()
+    
+    for job_file in job_files:
+        if os.path.abspath(job_file) in read_files:
+            logger.warning("The setup file " + job_file + " is given many times, its job is run once.")
+            continue
+        
+        read_files.add(os.path.abspath(job_file))
+        data = setup_file.load(job_file)
+        
+        if data is None:
+            statuses.append(job_status(job_file, None, STATUS_INVALID, message="The setup file cannot be read."))
+            continue
+        
+        try:
+            jobs.append(Job(job_file, data))
+        except ValueError as error:
+            logger.error("In " + job_file + ": " + str(error))
+            statuses.append(job_status(job_file, data["output_file"], STATUS_INVALID, message=str(error)))
+    
+    writing_jobs = collections.OrderedDict()
+    
+    for job in jobs:
+        writing_jobs.setdefault(os.path.abspath(job.output_file), []).append(job)
+    
+    for output_jobs in writing_jobs.values():
+        if len(output_jobs) > 1:
+            for job in output_jobs:
+                message = "The output file " + job.output_file + " is also written by " + ", ".join(other.job_file for other in output_jobs if other is not job) + "."
+                logger.error("In " + job.job_file + ": " + message)
+                statuses.append(job_status(job.job_file, job.output_file, STATUS_INVALID, message=message))
+    
+    return [job for job in jobs if len(writing_jobs[os.path.abspath(job.output_file)]) == 1], statuses
+
+def group_jobs(jobs):
+    """Groups the jobs sharing input files, directly or through other jobs.
+    
+    :param jobs: The jobs.
+    :type jobs: list
+    :return: List of the groups, each one being a list of jobs in the order of ``jobs``.
+    :rtype: list
+    """
+    
+    # Union-find over the jobs: each input file points to the first job which
+    # reads it, and the jobs reading the same file are merged.
+    parents = list(range(len(jobs)))
+    
+    def root(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+    
+    readers = {}
+    
+    for index, job in enumerate(jobs):
+        for input_file in job.input_files:
+            if input_file in readers:
+                parents[root(index)] = root(readers[input_file])
+            else:
+                readers[input_file] = index
+    
+    groups = collections.OrderedDict()
+    
+    for index, job in enumerate(jobs):
+        groups.setdefault(root(index), []).append(job)
+    
+    return list(groups.values())
+
+def job_status(job_file, output_file, status, rows=0, seconds=0.0, output_files=(), missing_files=(), message=""):
+    """Builds the entry of a job in the report, see :func:`write_report`."""
+    
+    return {"job": job_file, "output_file": output_file, "status": status, "rows": rows, "seconds": round(seconds, 3), "output_files": list(output_files), "missing_files": list(missing_files), "message": message}
+
+class _JobOutput:
+    """Writes the rows of a job, opening its output files with the first rows, see :func:`run_group`."""
+    
+    def __init__(self, job, output_format=None, per_satellite=False):
+        self.job = job
+        self.output_format = output_format
+        self.per_satellite = per_satellite
+        self.writers = {}
+        self.rows = 0
+        self.missing_files = []
+        self.message = ""
+    
+    def write(self, row):
+        # After an error, the rows of the job are dropped.
+        if self.message:
+            return
+        
+        output_file = tle.satellite_output_file(self.job.output_file, row.cospar) if self.per_satellite else self.job.output_file
+        writer = self.writers.get(output_file)
+        
+        if writer is None:
+            try:
+                writer = self.writers[output_file] = writers.open_writer(output_file, self.output_format, columns=self.job.columns)
+            except PermissionError:
+                self.fail("Impossible to write in " + output_file + ".")
+                return
+            except ImportError as error:
+                self.fail("The module " + str(error.name) + " is needed to write " + output_file + ".")
+                return
+            except ValueError as error:
+                self.fail(str(error))
+                return
+        
+        writer.write(row)
+        self.rows += 1
+    
+    def fail(self, message):
+        logger.error("In " + self.job.job_file + ": " + message)
+        self.message = message
+    
+    def close(self, seconds):
+        """Closes the output files and returns the status of the job."""
+        
+        for writer in self.writers.values():
+            writer.close()
+        
+        if self.message:
+            status = STATUS_FAILED
+        elif self.rows:
+            status = STATUS_WRITTEN
+        else:
+            status = STATUS_EMPTY
+        
+        return job_status(self.job.job_file, self.job.output_file, status, self.rows, seconds, sorted(self.writers), self.missing_files, self.message)
+
+def run_group(jobs, precise_epoch=False, error_summary=False, output_format=None, per_satellite=False):
+    """Runs the jobs of a group, reading each of their input files once.
+    
+    The TLEs are sent to the jobs by designator: only the jobs asking for the
+    designator of a TLE, or for all satellites, check their filter on it. The
+    TLE is decoded once, with the fields needed by all the jobs of the group.
+    
+    :param jobs: The jobs of the group, see :func:`group_jobs`.
+    :type jobs: list
+    :param precise_epoch: Whether to keep the microseconds of the epochs, see :func:`tle.epoch_to_datetime`.
+    :type precise_epoch: bool
+    :param error_summary: Whether to log a summary of the errors of each file instead of one message per invalid TLE, see :class:`tle.ErrorSummary`.
+    :type error_summary: bool
+    :param output_format: Format of the output files, see :data:`writers.FORMATS`, or None to choose it with the extension of each output file.
+    :type output_format: str
+    :param per_satellite: Whether to write one output file per satellite for each job, see :func:`tle.satellite_output_file`.
+    :type per_satellite: bool
+    :return: The statuses of the jobs, see :func:`job_status`.
+    :rtype: list
+    """
+    
+    start_time = time.perf_counter()
+    outputs = [_JobOutput(job, output_format, per_satellite) for job in jobs]
+    
+    # Input files, in the order in which they first appear, with the outputs of
+    # the jobs reading them.
+    readers = collections.OrderedDict()
+    
+    for output in outputs:
+        for input_file in output.job.input_files:
+            readers.setdefault(input_file, []).append(output)
+    
+    decoded = set()
+    
+    for job in jobs:
+        job_decoded = tle.decoded_columns(job.columns, per_satellite)
+        
+        if job_decoded is None:
+            decoded = None
+            break
+        
+        decoded.update(job_decoded)
+    
+    if decoded is None:
+        def decode(line1, line2, name):
+            return tle.decode_tle(line1, line2, precise_epoch, name)
+    else:
+        decode = tle.column_decoder(tuple(decoded), precise_epoch)
+    
+    try:
+        for input_file, file_outputs in readers.items():
+            try:
+                compression = tle.compression_format(input_file)
+            except FileNotFoundError:
+                logger.error("Unable to find " + input_file + ".")
+                
+                for output in file_outputs:
+                    output.missing_files.append(input_file)
+                continue
+            
+            routes = _routes(file_outputs)
+            
+            if compression is None:
+                _scan(input_file, tle.mapped_lines(input_file), routes, decode, error_summary)
+                continue
+            
+            failures = []
+            
+            for member, lines in tle.archive_lines(input_file, compression, failures):
+                _scan(member, lines, routes, decode, error_summary)
+            
+            if failures:
+                logger.error(input_file + " is not a valid " + compression + " file (" + str(failures[0]) + ").")
+    finally:
+        seconds = time.perf_counter() - start_time
+        statuses = [output.close(seconds) for output in outputs]
+    
+    return statuses
+
+def _routes(outputs):
+    """Indexes the outputs of the jobs reading a file by designator.
+    
+    :return: Tuple of the dictionary of the outputs of each designator and of the list of the outputs of the jobs asking for all satellites.
+    :rtype: tuple
+    """
+    
+    by_cospar = collections.defaultdict(list)
+    everyone = []
+    
+    for output in outputs:
+        if output.job.cospars is None:
+            everyone.append(output)
+        else:
+            for cospar in output.job.cospars:
+                by_cospar[cospar].append(output)
+    
+    return dict(by_cospar), everyone
+
+def _scan(tle_file, numbered_lines, routes, decode, error_summary):
+    """Writes the TLEs of one file in the outputs of the jobs which accept them."""
+    
+    by_cospar, everyone = routes
+    errors = tle.ErrorSummary() if error_summary else None
+    
+    for i, name, line1, line2, j in tle.validated_tles(tle_file, numbered_lines, errors):
+        targets = by_cospar.get(line1[tle.COSPAR].strip())
+        
+        if targets is None:
+            if not everyone:
+                continue
+            targets = everyone
+        elif everyone:
+            targets = targets + everyone
+        
+        row = None
+        
+        for output in targets:
+            tle_filter = output.job.tle_filter
+            
+            if tle_filter is None or tle_filter.accepts(line1, line2):
+                if row is None:
+                    row = decode(line1, line2, name)
+                
+                output.write(row)
+    
+    if errors is not None:
+        errors.log(tle_file)
+
+def _run_group_in_worker(jobs, *options):
+    """Runs a group in a worker process, see :func:`run_group`.
+    
+    :return: Tuple of the statuses of the jobs and of the log records, to be logged by the main process.
+    :rtype: tuple
+    """
+    
+    collector = tle.RecordCollector()
+    logger.addHandler(collector)
+    
+    try:
+        return run_group(jobs, *options), collector.records
+    finally:
+        logger.removeHandler(collector)
+
+def run_batch(job_files, report_file=None, workers=1, precise_epoch=False, error_summary=False, output_format=None, per_satellite=False):
+    """Runs the jobs of many setup files, grouped by shared input files.
+    
+    The groups are run by a pool of worker processes, the largest ones first.
+    The log records of each group are logged once it is done.
+    
+    :param job_files: Paths of the setup files.
+    :type job_files: list
+    :param report_file: Path of the JSON report, or None for no report, see :func:`write_report`.
+    :type report_file: str
+    :param workers: Number of groups run at once, by as many processes, or None for one per processor.
+    :type workers: int
+    :return: The statuses of the jobs, in the order of ``job_files``, see :func:`job_status`.
+    :rtype: list
+    
+    ..seealso:: :func:`run_group` for the other parameters.
+    """
+    
+    start_time = time.perf_counter()
+    jobs, statuses = load_jobs(job_files)
+    groups = group_jobs(jobs)
+    options = (precise_epoch, error_summary, output_format, per_satellite)
+    
+    logger.info("%d jobs in %d groups of input files.", len(jobs), len(groups))
+    
+    if workers == 1 or len(groups) <= 1:
+        for group in groups:
+            statuses.extend(run_group(group, *options))
+    else:
+        # The largest groups are started first, so that they do not end last.
+        groups.sort(key=_group_size, reverse=True)
+        
+        with tle.process_pool(workers) as executor:
+            futures = [(group, executor.submit(_run_group_in_worker, group, *options)) for group in groups]
+            
+            for group, future in futures:
+                try:
+                    group_statuses, records = future.result()
+                except Exception as error:
+                    # A worker process may die with various errors.
+                    logger.error("Unable to run the jobs " + ", ".join(job.job_file for job in group) + " (" + str(error) + ").")
+                    statuses.extend(job_status(job.job_file, job.output_file, STATUS_FAILED, message=str(error)) for job in group)
+                    continue
+                
+                for record in records:
+                    logger.handle(record)
+                
+                statuses.extend(group_statuses)
+    
+    order = {job_file: index for index, job_file in reversed(list(enumerate(job_files)))}
+    statuses.sort(key=lambda status: order[status["job"]])
+    
+    for status in statuses:
+        logger.info("%s: %s, %d rows.", status["job"], status["status"], status["rows"])
+    
+    if report_file is not None:
+        write_report(report_file, statuses, time.perf_counter() - start_time)
+    
+    return statuses
+
+def _group_size(jobs):
+    """Total size of the input files of a group, 0 for the missing files."""
+    
+    input_files = {input_file for job in jobs for input_file in job.input_files}
+    
+    return sum(os.path.getsize(input_file) for input_file in input_files if os.path.isfile(input_file))
+
+def write_report(report_file, statuses, seconds):
+    """Writes the status report of a batch.
+    
+    The report is a JSON dictionary with the ``seconds`` taken by the batch,
+    the ``counts`` of the jobs of each status, and the list of the ``jobs``.
+    Each job has its setup file (``job``), its ``output_file``, its
+    ``status`` (``written``, ``empty``, ``failed`` or ``invalid``), the number
+    of ``rows`` written, the ``seconds`` taken by its group, the
+    ``output_files`` written, the ``missing_files`` among its input files and
+    the error ``message``, if any.
+    
+    :param report_file: Path of the report.
+    :type report_file: str
+    :param statuses: The statuses of the jobs, see :func:`job_status`.
+    :type statuses: list
+    :param seconds: Duration of the batch.
+    :type seconds: float
+    """
+    
+    report = {"seconds": round(seconds, 3), "counts": collections.Counter(status["status"] for status in statuses), "jobs": statuses}
+    
+    try:
+        with open(report_file, "w") as file:
+            json.dump(report, file, indent=2)
+    except OSError:
+        logger.error("Unable to write the report in " + report_file + ".")
+    else:
+        logger.info("Wrote the report in " + report_file + ".")
@@ -0,0 +1,446 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Benchmarks of the TLE extraction.
+
+Generates a synthetic set of TLE files and measures the duration of
+:func:`tle.data_extract` with an increasing number of worker processes, in
+order to check how the parallel extraction scales. With ``--columnar``, the
+per-TLE decoding is compared to the NumPy backend of :mod:`columnar` instead.
+With ``--cold-start``, short command line extractions are timed from the start
+of the interpreter.
+
+With ``--suite``, the functions of the :mod:`tle` module are measured one by
+one, then :func:`tle.data_extract` for all the satellites and for a single
+one, with one process and with the workers, for each number of TLEs of
+``--sizes``. The generated files are the same from one run to the other, and
+``--corrupt`` makes a part of their TLEs invalid. The results can be saved in
+a JSON file with ``--json``, and compared to a previous one with
+``--compare``.
+
+Usage::
+
+    python benchmark.py --files 32 --tles 100000 --workers 1 2 4 8 16 32
+    python benchmark.py --files 1 --tles 1000000 --columnar
+    python benchmark.py --files 1 --tles 10 --cold-start 50
+    python benchmark.py --suite --sizes 1000 100000 10000000 --corrupt 0.01 --json results.json
+    python benchmark.py --suite --sizes 1000 100000 --json new.json --compare results.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import tle
+
+def checksum(line):
+    """Computes the checksum digit of a TLE line (without its last character)."""
+    
+    return str(sum(int(character) if character.isdigit() else character == "-" for character in line) % 10)
+
+def generate_tle(rng):
+    """Generates a random valid TLE.
+    
+    :param rng: Random number generator.
+    :type rng: random.Random
+    :return: The two lines of the TLE.
+    :rtype: tuple
+    """
+    
+    satnum = rng.randint(1, 99999)
+    cospar = "{year:02d}{launch:03d}{piece:<3}".format(year=rng.randint(0, 99), launch=rng.randint(1, 300), piece=rng.choice(["A", "B", "AC", "ABC"]))
+    
+    line1 = "1 {satnum:05d}U {cospar} {year:02d}{day:03d}.{dayfrac:08d} {mmotd:+.8f}  {mmotdd:05d}-{mmotddexp}  {bstar:05d}-{bstarexp} 0 {eltnum:4d}".format(
+        satnum=satnum, cospar=cospar, year=rng.randint(0, 99), day=rng.randint(1, 365), dayfrac=rng.randint(0, 99999999),
+        mmotd=rng.uniform(-0.1, 0.1), mmotdd=rng.randint(0, 99999), mmotddexp=rng.randint(0, 9),
+        bstar=rng.randint(0, 99999), bstarexp=rng.randint(0, 9), eltnum=rng.randint(1, 9999)).replace("+0.", " .").replace("-0.", "-.")
+    line2 = "2 {satnum:05d} {inclin:8.4f} {raan:8.4f} {eccentr:07d} {argofper:8.4f} {manomaly:8.4f} {mmot:11.8f}{epochrev:5d}".format(
+        satnum=satnum, inclin=rng.uniform(0, 180), raan=rng.uniform(0, 360), eccentr=rng.randint(0, 9999999),
+        argofper=rng.uniform(0, 360), manomaly=rng.uniform(0, 360), mmot=rng.uniform(10, 16), epochrev=rng.randint(0, 99999))
+    
+    return line1 + checksum(line1), line2 + checksum(line2)
+
+# Kinds of invalid TLEs made by :func:`corrupt_tle`.
+CORRUPTIONS = ["checksum", "format", "satnum", "truncated"]
+
+# Number of TLEs written at once by :func:`generate_file`.
+WRITE_BATCH_SIZE = 10000
+
+def corrupt_tle(rng, line1, line2):
+    """Makes a TLE invalid, in one of the ways of :data:`CORRUPTIONS`.
+    
+    * checksum: the checksum of the first line is wrong;
+    * format: a digit of the epoch is replaced by a letter;
+    * satnum: the second line is for another satellite (with a good checksum);
+    * truncated: the end of the first line is missing.
+    
+    :param rng: Random number generator.
+    :type rng: random.Random
+    :return: The two lines of the TLE.
+    :rtype: tuple
+    """
+    
+    corruption = rng.choice(CORRUPTIONS)
+    
+    if corruption == "checksum":
+        line1 = line1[:-1] + str((int(line1[-1]) + 1) % 10)
+    elif corruption == "format":
+        line1 = line1[:20] + "X" + line1[21:]
+    elif corruption == "satnum":
+        line2 = line2[:2] + "{0:05d}".format((int(line2[2:7]) + 1) % 100000) + line2[7:-1]
+        line2 += checksum(line2)
+    else:
+        line1 = line1[:rng.randint(10, 60)]
+    
+    return line1, line2
+
+def generate_file(filename, tles_count, seed=0, corrupt_ratio=0.0):
+    """Writes a file of random TLEs.
+    
+    :param filename: Path of the file to write.
+    :type filename: str
+    :param tles_count: Number of TLEs in the file.
+    :type tles_count: int
+    :param seed: Seed of the random number generator, the same seed always gives the same file.
+    :type seed: int
+    :param corrupt_ratio: Probability of each TLE to be invalid, see :func:`corrupt_tle`.
+    :type corrupt_ratio: float
+    """
+    
+    rng = random.Random(seed)
+    
+    with open(filename, "w") as file:
+        for start in range(0, tles_count, WRITE_BATCH_SIZE):
+            lines = []
+            
+            for i in range(start, min(start + WRITE_BATCH_SIZE, tles_count)):
+                line1, line2 = generate_tle(rng)
+                
+                if corrupt_ratio and rng.random() < corrupt_ratio:
+                    line1, line2 = corrupt_tle(rng, line1, line2)
+                
+                lines += [line1, line2]
+            
+            file.write("\n".join(lines) + "\n")
+
+def bench_scaling(tle_files, workers_counts, chunk_size=tle.CHUNK_SIZE):
+    """Measures the duration of the full extraction for each number of workers.
+    
+    :return: List of ``(workers, duration)`` tuples, durations in seconds.
+    :rtype: list
+    """
+    
+    results = []
+    output_file = os.path.join(os.path.dirname(tle_files[0]), "output.csv")
+    
+    for workers in workers_counts:
+        start_time = time.perf_counter()
+        tle.data_extract(None, tle_files, output_file, workers=workers, chunk_size=chunk_size)
+        results.append((workers, time.perf_counter() - start_time))
+    
+    return results
+
+def bench_columnar(tle_files):
+    """Measures the duration of the decoding of all the TLEs, one by one and with :mod:`columnar`.
+    
+    :return: Tuple of the two durations, in seconds.
+    :rtype: tuple
+    """
+    
+    import columnar
+    
+    start_time = time.perf_counter()
+    for row in tle.extract_rows(None, tle_files, precise_epoch=True):
+        pass
+    per_tle_duration = time.perf_counter() - start_time
+    
+    start_time = time.perf_counter()
+    columnar.load(None, tle_files)
+    columnar_duration = time.perf_counter() - start_time
+    
+    return per_tle_duration, columnar_duration
+
+def bench_cold_start(tle_files, repeat):
+    """Measures the duration of command line extractions, interpreter start included.
+    
+    :return: List of the durations, in seconds.
+    :rtype: list
+    """
+    
+    stope = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stope.pyw")
+    output_file = os.path.join(os.path.dirname(tle_files[0]), "output.csv")
+    command = [sys.executable, stope, "--input"] + tle_files + ["--output", output_file]
+    
+    durations = []
+    
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        subprocess.call(command, stderr=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - start_time)
+    
+    return durations
+
+def best_duration(function, repeat):
+    """Calls the function several times and returns its best duration, in seconds."""
+    
+    durations = []
+    
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start_time)
+    
+    return min(durations)
+
+def bench_functions(tles, repeat=5):
+    """Measures the duration of the functions of the :mod:`tle` module on each TLE.
+    
+    :param tles: List of ``(line1, line2)`` tuples, valid or not.
+    :type tles: list
+    :param repeat: Number of measures of each function, the best one is kept.
+    :type repeat: int
+    :return: List of result dictionaries, see :func:`run_suite`.
+    :rtype: list
+    """
+    
+    # check_integrity() expects well formatted lines.
+    formatted_tles = [(line1, line2) for line1, line2 in tles if tle.check_format(line1, line2)]
+    valid_tles = [(line1, line2) for line1, line2 in tles if tle.validate_tle(line1, line2) == tle.TLE_VALID and line1[tle.SATNUM] == line2[tle.SATNUM]]
+    epochs = [line1[tle.EPOCH] for line1, line2 in valid_tles]
+    
+    functions = [
+        ("check_format", tles, lambda: [tle.check_format(line1, line2) for line1, line2 in tles]),
+        ("check_integrity", formatted_tles, lambda: [tle.check_integrity(line1) for line1, line2 in formatted_tles]),
+        ("validate_tle", tles, lambda: [tle.validate_tle(line1, line2) for line1, line2 in tles]),
+        ("epoch_to_datetime", epochs, lambda: [tle.epoch_to_datetime(epoch) for epoch in epochs]),
+        ("epoch_to_datetime (precise)", epochs, lambda: [tle.epoch_to_datetime(epoch, True) for epoch in epochs]),
+        ("convert_tle", valid_tles, lambda: [tle.convert_tle(line1, line2) for line1, line2 in valid_tles]),
+        ("decode_tle", valid_tles, lambda: [tle.decode_tle(line1, line2) for line1, line2 in valid_tles])]
+    
+    results = []
+    
+    for name, items, function in functions:
+        duration = best_duration(function, repeat)
+        results.append({"benchmark": "function", "name": name, "tles": len(items), "seconds": duration, "ns_per_tle": 1e9 * duration / max(len(items), 1)})
+    
+    return results
+
+def bench_extraction(tle_files, tles_count, workers, repeat=1):
+    """Measures the duration of :func:`tle.data_extract` for all the satellites and for one satellite.
+    
+    Each extraction is measured with one process, then with the given number of
+    workers if it is more than one.
+    
+    :param tle_files: List of the TLE files.
+    :type tle_files: list
+    :param tles_count: Total number of TLEs in the files.
+    :type tles_count: int
+    :param workers: Number of worker processes.
+    :type workers: int
+    :param repeat: Number of measures of each extraction, the best one is kept.
+    :type repeat: int
+    :return: List of result dictionaries, see :func:`run_suite`.
+    :rtype: list
+    """
+    
+    output_file = os.path.join(os.path.dirname(tle_files[0]), "output.csv")
+    
+    # The satellite of the first valid TLE is extracted in the second mode.
+    with open(tle_files[0]) as file:
+        cospar = next((line1[tle.COSPAR].strip() for line1, line2 in zip(file, file) if tle.validate_tle(line1.strip(), line2.strip()) == tle.TLE_VALID), None)
+    
+    results = []
+    
+    for mode, mode_cospar in [("all", None), ("satellite", cospar)]:
+        for mode_workers in sorted({1, workers}):
+            duration = best_duration(lambda: tle.data_extract(mode_cospar, tle_files, output_file, workers=mode_workers), repeat)
+            results.append({"benchmark": "data_extract", "name": mode, "workers": mode_workers, "tles": tles_count, "seconds": duration, "tles_per_second": tles_count / duration})
+    
+    return results
+
+def result_key(result):
+    """Identifies a result, to compare it to the same result of another run."""
+    
+    return result["benchmark"], result["name"], result.get("workers"), result["tles"]
+
+def run_suite(sizes, files_count, workers, corrupt_ratio, repeat):
+    """Runs the micro-benchmarks and the extraction benchmarks for each size.
+    
+    Each result is a dictionary with the ``benchmark`` ("function" or
+    "data_extract"), the ``name`` of the function or of the extraction mode
+    ("all" or "satellite"), the number of ``workers`` of the extractions, the
+    number of ``tles`` processed, the best duration in ``seconds``, and the
+    ``size`` of the generated files.
+    
+    :param sizes: Total numbers of TLEs, spread across the files.
+    :type sizes: list
+    :return: List of result dictionaries.
+    :rtype: list
+    """
+    
+    results = []
+    
+    for size in sizes:
+        directory = tempfile.mkdtemp(prefix="stope-benchmark-")
+        
+        try:
+            tle_files = [os.path.join(directory, "tle{0}.txt".format(i)) for i in range(files_count)]
+            for seed, tle_file in enumerate(tle_files):
+                generate_file(tle_file, size // files_count + (seed < size % files_count), seed, corrupt_ratio)
+            
+            # The functions are measured on at most 100000 TLEs, which is enough
+            # to get stable results.
+            with open(tle_files[0]) as file:
+                tles = [(line1.strip(), line2.strip()) for line1, line2 in zip(file, file)][:100000]
+            
+            for result in bench_functions(tles, repeat) + bench_extraction(tle_files, size, workers, repeat):
+                result["size"] = size
+                results.append(result)
+                print_result(result)
+        finally:
+            shutil.rmtree(directory)
+    
+    return results
+
+def print_result(result, previous=None):
+    """Prints a result of the suite, with the ratio to the previous duration if any."""
+    
+    name = result["name"] + (" ({0} workers)".format(result["workers"]) if result.get("workers", 1) > 1 else "")
+    line = "{0:<14} {1:<36} {2:>10} {3:>10.4f}".format(result["benchmark"], name, result["tles"], result["seconds"])
+    
+    if previous is not None:
+        line += " {0:>8.2f}x".format(previous["seconds"] / result["seconds"])
+    
+    print(line)
+
+def git_commit():
+    """Returns the commit of the working tree, None if it is not known."""
+    
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    cli_parser = argparse.ArgumentParser(description="Benchmarks of the TLE extraction")
+    cli_parser.add_argument("--files", type=int, default=8, help="Number of generated TLE files")
+    cli_parser.add_argument("--tles", type=int, default=50000, help="Number of TLEs per file")
+    cli_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Numbers of worker processes to try")
+    cli_parser.add_argument("--chunk-size", type=int, default=tle.CHUNK_SIZE, help="Size in bytes of the pieces of files given to the workers")
+    cli_parser.add_argument("--columnar", action="store_true", help="Compare the per-TLE decoding to the NumPy backend")
+    cli_parser.add_argument("--cold-start", type=int, default=0, metavar="REPEAT", help="Time this number of command line extractions")
+    cli_parser.add_argument("--suite", action="store_true", help="Run the micro-benchmarks and the extraction benchmarks")
+    cli_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000], help="Total numbers of TLEs of the suite")
+    cli_parser.add_argument("--corrupt", type=float, default=0.0, help="Ratio of invalid TLEs in the generated files")
+    cli_parser.add_argument("--repeat", type=int, default=3, help="Number of measures of each benchmark of the suite, the best one is kept")
+    cli_parser.add_argument("--json", help="File where the results of the suite are saved")
+    cli_parser.add_argument("--compare", help="Results of a previous run of the suite to compare to")
+    cli_arguments = cli_parser.parse_args()
+    
+    # The extraction logs are not wanted in the measures.
+    logging.getLogger().addHandler(logging.NullHandler())
+    logging.getLogger("root").propagate = False
+    logging.getLogger("root").addHandler(logging.NullHandler())
+    
+    if cli_arguments.suite:
+        print("{0:<14} {1:<36} {2:>10} {3:>10}".format("Benchmark", "Name", "TLEs", "Time (s)"))
+        results = run_suite(cli_arguments.sizes, cli_arguments.files, max(cli_arguments.workers), cli_arguments.corrupt, cli_arguments.repeat)
+        
+        # The results are identified by the commit and the machine, so that the
+        # files of several runs can be compared.
+        report = {
+            "date": datetime.datetime.now().isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processors": os.cpu_count(),
+            "corrupt_ratio": cli_arguments.corrupt,
+            "results": results}
+        
+        if cli_arguments.json:
+            with open(cli_arguments.json, "w") as file:
+                json.dump(report, file, indent=1)
+        
+        if cli_arguments.compare:
+            with open(cli_arguments.compare) as file:
+                previous_results = {result_key(result): result for result in json.load(file)["results"]}
+            
+            print("\nCompared to " + cli_arguments.compare + " (speedup):")
+            for result in results:
+                print_result(result, previous_results.get(result_key(result)))
+        return
+    
+    directory = tempfile.mkdtemp(prefix="stope-benchmark-")
+    
+    try:
+        tle_files = [os.path.join(directory, "tle{0}.txt".format(i)) for i in range(cli_arguments.files)]
+        for seed, tle_file in enumerate(tle_files):
+            generate_file(tle_file, cli_arguments.tles, seed)
+        
+        if cli_arguments.cold_start:
+            durations = bench_cold_start(tle_files, cli_arguments.cold_start)
+        elif cli_arguments.columnar:
+            per_tle_duration, columnar_duration = bench_columnar(tle_files)
+        else:
+            results = bench_scaling(tle_files, cli_arguments.workers, cli_arguments.chunk_size)
+    finally:
+        shutil.rmtree(directory)
+    
+    if cli_arguments.cold_start:
+        print("{0:>8} {1:>10} {2:>10}".format("Runs", "Mean (ms)", "Best (ms)"))
+        print("{0:>8} {1:>10.1f} {2:>10.1f}".format(len(durations), 1000 * sum(durations) / len(durations), 1000 * min(durations)))
+        return
+    
+    if cli_arguments.columnar:
+        print("{0:>11} {1:>12} {2:>8}".format("Per TLE (s)", "Columnar (s)", "Speedup"))
+        print("{0:>11.3f} {1:>12.3f} {2:>8.2f}".format(per_tle_duration, columnar_duration, per_tle_duration / columnar_duration))
+        return
+    
+    reference_duration = results[0][1] * results[0][0]
+    
+    print("{0:>8} {1:>10} {2:>8} {3:>10}".format("Workers", "Time (s)", "Speedup", "Efficiency"))
+    for workers, duration in results:
+        speedup = reference_duration / duration
+        print("{0:>8} {1:>10.3f} {2:>8.2f} {3:>9.0%}".format(workers, duration, speedup, speedup / workers))
+
+if __name__ == "__main__":
+    main()
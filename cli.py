@@ -0,0 +1,286 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Runs extractions from the command line, without any window.
+
+This module is used by ``stope.pyw`` when an output file or a job file is
+given. It never imports :mod:`gui`, so that tkinter is not loaded and the
+extractions can run on computers without display, for instance from cron.
+
+Usage::
+
+    stope.pyw --cospar 98067A 90037B --input "tle/*.txt" --output iss.csv
+    stope.pyw --job job.txt
+    stope.pyw --batch "jobs/*.txt" --report report.json --workers 4
+    stope.pyw --input "tle/*.txt" --output leo.csv --filter "mmot > 11" "epoch >= 2014-01-01"
+    stope.pyw --cospar 98067A --input "tle/*.txt" --output decay.csv --columns epoch mmot bstar
+    stope.pyw --watch feed/ --output tle.csv --per-satellite
+    stope.pyw --store tle.db --input "tle/*.txt"
+    stope.pyw --store tle.db --cospar 98067A --start 2014-01-01 --output iss.csv
+
+With ``--batch``, the jobs of many setup files are run at once, reading
+each input file once, see :mod:`batch`. With ``--watch``, the directories are
+watched until the program is interrupted, see :mod:`watch`. With ``--store``, the input files are loaded
+into the store and the output file is extracted from it, see :mod:`store`.
+"""
+
+import glob
+import logging
+
+import setup_file
+import tle
+import writers
+
+logger = logging.getLogger("root")
+
+def add_arguments(cli_parser):
+    """Adds the options of the command line extraction to the parser.
+    
+    :param cli_parser: The parser of the command line arguments.
+    :type cli_parser: argparse.ArgumentParser
+    """
+    
+    cli_parser.add_argument("--cospar", nargs="+", default=[], metavar="DESIGNATOR", help="International designators of the satellites to extract, all satellites if none")
+    cli_parser.add_argument("--cospar-file", help="File listing the international designators to extract")
+    cli_parser.add_argument("--input", nargs="+", default=[], metavar="PATTERN", help="TLE files, wildcards are allowed")
+    cli_parser.add_argument("--output", help="CSV output file, enables the command line extraction")
+    cli_parser.add_argument("--job", help="Setup file describing the extraction, enables the command line extraction")
+    cli_parser.add_argument("--batch", nargs="+", default=[], metavar="JOB", help="Setup files of many jobs to run at once, reading each input file once, wildcards are allowed")
+    cli_parser.add_argument("--report", help="JSON file in which the status of each job of the batch is written")
+    cli_parser.add_argument("--workers", type=int, default=1, help="Number of worker processes, 0 for one per processor")
+    cli_parser.add_argument("--per-satellite", action="store_true", help="Write one output file per satellite")
+    cli_parser.add_argument("--use-index", action="store_true", help="Use the indexes of the TLE files to find the satellites")
+    cli_parser.add_argument("--precise-epoch", action="store_true", help="Keep the microseconds of the epochs")
+    cli_parser.add_argument("--format", choices=writers.FORMATS, help="Format of the output files, chosen with the extension of the output file by default")
+    cli_parser.add_argument("--sort", action="store_true", help="Sort the rows by satellite and epoch")
+    cli_parser.add_argument("--deduplicate", action="store_true", help="Drop the TLEs found several times, the rows are then sorted")
+    cli_parser.add_argument("--error-summary", action="store_true", help="Log the number of invalid TLEs of each file instead of each of them")
+    cli_parser.add_argument("--filter", nargs="+", default=[], metavar="EXPRESSION", help="Conditions on the fields of the TLEs, such as \"mmot > 11\", \"epoch < 2015-01-01\" or \"cospar ^= 98\"")
+    cli_parser.add_argument("--columns", nargs="+", default=[], metavar="KEY", help="Columns written in the output files, in this order, all of them if none: " + ", ".join(tle.CSV_KEYS))
+    cli_parser.add_argument("--incremental", action="store_true", help="Only append the TLEs added since the previous incremental extraction")
+    cli_parser.add_argument("--profile", metavar="REPORT", help="Measure the stages of the extraction and save the report in this JSON file")
+    cli_parser.add_argument("--profile-capture", action="store_true", help="Also run the profiled extraction under cProfile and tracemalloc")
+    cli_parser.add_argument("--watch", nargs="+", default=[], metavar="DIRECTORY", help="Watch the directories and extract the TLE files as soon as they arrive, until interrupted")
+    cli_parser.add_argument("--watch-pattern", default="*", metavar="PATTERN", help="Names of the watched TLE files, with wildcards")
+    cli_parser.add_argument("--poll-interval", type=float, default=0.2, metavar="SECONDS", help="Delay between two scans of the watched directories")
+    cli_parser.add_argument("--store", metavar="DATABASE", help="Load the input files into this SQLite store, and extract the output file from it")
+    cli_parser.add_argument("--start", metavar="DATE", help="First epoch extracted from the store, YYYY-MM-DD or YYYY-MM-DD hh:mm:ss")
+    cli_parser.add_argument("--end", metavar="DATE", help="Epoch after the last one extracted from the store")
+
+def is_requested(cli_arguments):
+    """Tells whether the arguments ask for a command line extraction instead of the GUI."""
+    
+    return cli_arguments.output is not None or cli_arguments.job is not None or bool(cli_arguments.batch) or bool(cli_arguments.watch) or cli_arguments.store is not None
+
+def expand_patterns(patterns):
+    """Lists the files matching the patterns, in the order of the patterns.
+    
+    A pattern matching no file is kept as is, so that the extraction reports
+    the missing file.
+    
+    :param patterns: List of paths, possibly with wildcards.
+    :type patterns: list
+    :return: List of paths.
+    :rtype: list
+    """
+    
+    files = []
+    
+    for pattern in patterns:
+        files.extend(sorted(glob.glob(pattern)) or [pattern])
+    
+    return files
+
+def run(cli_arguments):
+    """Runs the extraction described by the command line arguments.
+    
+    The options given on the command line override the ones of the job file.
+    
+    :param cli_arguments: The parsed command line arguments, see :func:`add_arguments`.
+    :type cli_arguments: argparse.Namespace
+    :return: The exit status: 0 if data was written, 1 if there was nothing to extract, 2 if the extraction could not run.
+    :rtype: int
+    """
+    
+    if cli_arguments.batch:
+        return run_batch(cli_arguments)
+    
+    # The designators are written like in the designator files, in any case
+    # and possibly separated by commas.
+    designators = tle.split_designators(" ".join(cli_arguments.cospar))
+    input_files = expand_patterns(cli_arguments.input)
+    output_file = cli_arguments.output
+    filters = list(cli_arguments.filter)
+    columns = list(cli_arguments.columns)
+    
+    if cli_arguments.job is not None:
+        job = setup_file.load(cli_arguments.job)
+        if job is None:
+            return 2
+        
+        designators = designators or job["cospar_designators"]
+        input_files = input_files or job["input_files"]
+        output_file = output_file or job["output_file"]
+        filters = filters or job["filters"]
+        columns = columns or job["columns"]
+    
+    if cli_arguments.cospar_file is not None:
+        try:
+            designators += tle.load_designators(cli_arguments.cospar_file)
+        except FileNotFoundError:
+            logger.error("Unable to find " + cli_arguments.cospar_file + ".")
+            return 2
+    
+    workers = cli_arguments.workers or None
+    
+    try:
+        tle_filter = tle.TLEFilter(filters) if filters else None
+        columns = tle.select_columns(columns) if columns else None
+    except ValueError as error:
+        logger.error(str(error))
+        return 2
+    
+    if cli_arguments.watch:
+        if output_file is None:
+            logger.error("No output file given.")
+            return 2
+        
+        # Imported here, since asyncio is only needed to watch.
+        import watch
+        
+        try:
+            watch.watch(designators or None, cli_arguments.watch, output_file, pattern=cli_arguments.watch_pattern, workers=workers, interval=cli_arguments.poll_interval, precise_epoch=cli_arguments.precise_epoch, per_satellite=cli_arguments.per_satellite, output_format=cli_arguments.format, error_summary=cli_arguments.error_summary, tle_filter=tle_filter, columns=columns)
+        except ValueError as error:
+            logger.error(str(error))
+            return 2
+        
+        return 0
+    
+    if cli_arguments.store is not None:
+        if tle_filter is not None:
+            logger.warning("The filters are not applied to the store.")
+        
+        return run_store(cli_arguments, designators, input_files, output_file, workers, columns)
+    
+    if not input_files:
+        logger.error("No input file given.")
+        return 2
+    
+    if cli_arguments.profile is not None:
+        profile = tle.ExtractionProfile(capture=cli_arguments.profile_capture)
+    else:
+        profile = None
+    
+    monitor = tle.ExtractionMonitor(profile=profile)
+    
+    extraction_success = tle.data_extract(designators or None, input_files, output_file, workers=workers, precise_epoch=cli_arguments.precise_epoch, use_index=cli_arguments.use_index, per_satellite=cli_arguments.per_satellite, monitor=monitor, incremental=cli_arguments.incremental, output_format=cli_arguments.format, sort=cli_arguments.sort, deduplicate=cli_arguments.deduplicate, error_summary=cli_arguments.error_summary, tle_filter=tle_filter, columns=columns)
+    
+    if profile is not None:
+        try:
+            profile.save(cli_arguments.profile)
+        except OSError:
+            logger.error("Unable to write the profile in " + cli_arguments.profile + ".")
+        else:
+            logger.info("Profile of the extraction:\n" + profile.summary())
+    
+    if extraction_success:
+        return 0
+    elif extraction_success is None:
+        return 2
+    else:
+        return 1
+
+def run_batch(cli_arguments):
+    """Runs the jobs of the setup files given with ``--batch``.
+    
+    The designators, filters and columns of each job come from its setup file.
+    
+    :return: The exit status: 0 if all the jobs wrote data, 1 if some had nothing to extract, 2 if some failed or are invalid.
+    :rtype: int
+    """
+    
+    # Imported here, since the batches are only run with --batch.
+    import batch
+    
+    statuses = batch.run_batch(expand_patterns(cli_arguments.batch), cli_arguments.report, cli_arguments.workers or None, cli_arguments.precise_epoch, cli_arguments.error_summary, cli_arguments.format, cli_arguments.per_satellite)
+    results = {status["status"] for status in statuses}
+    
+    if results & {batch.STATUS_FAILED, batch.STATUS_INVALID}:
+        return 2
+    elif batch.STATUS_EMPTY in results:
+        return 1
+    else:
+        return 0
+
+def run_store(cli_arguments, designators, input_files, output_file, workers, columns=None):
+    """Loads the input files into the store, then extracts the output file from it.
+    
+    :return: The exit status, like with :func:`run`.
+    :rtype: int
+    """
+    
+    # Imported here, since the store is only needed with --store.
+    import sqlite3
+    import store
+    
+    if not input_files and output_file is None:
+        logger.error("No input file nor output file given.")
+        return 2
+    
+    if input_files:
+        try:
+            connection = store.open_store(cli_arguments.store, cli_arguments.precise_epoch)
+        except sqlite3.Error as error:
+            logger.error(cli_arguments.store + " is not a valid store (" + str(error) + ").")
+            return 2
+        
+        try:
+            store.load(connection, input_files, workers, error_summary=cli_arguments.error_summary)
+        finally:
+            connection.close()
+    
+    if output_file is None:
+        return 0
+    
+    try:
+        extraction_success = store.extract(designators or None, cli_arguments.store, output_file, cli_arguments.start, cli_arguments.end, cli_arguments.per_satellite, cli_arguments.format, columns)
+    except ValueError as error:
+        logger.error("Invalid epoch range (" + str(error) + ").")
+        return 2
+    
+    if extraction_success:
+        return 0
+    elif extraction_success is None:
+        return 2
+    else:
+        return 1
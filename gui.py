@@ -49,6 +49,7 @@ import webbrowser
 import logging
 import datetime
 import threading
+import queue
 import time
 import re
 import copy
@@ -58,6 +59,9 @@ import tle
 
 logger = logging.getLogger("root")
 
+# Delay between two checks of the progress of the extraction, in milliseconds.
+PROGRESS_POLL_DELAY = 100
+
 class Application(Frame):
     """Construction of the window's widgets.
     
@@ -74,14 +78,21 @@ class Application(Frame):
         
         self.master = master
         
+        # The TLEs of the files are kept between the extractions of the
+        # session, so that running again an extraction on the same files, for
+        # instance with another designator, does not read them again.
+        self.record_cache = tle.RecordCache()
+        
         # Building the menu bar.
         self.menubar = Menu(self)
-        file_menu = Menu(self.menubar, tearoff=0)
+        self.file_menu = Menu(self.menubar, tearoff=0)
         help_menu = Menu(self.menubar, tearoff=0)
-        self.menubar.add_cascade(label="File", menu=file_menu)
-        file_menu.add_command(label="New extraction", command=self.clear_interface)
-        file_menu.add_separator()
-        file_menu.add_command(label="Quit", command=master.destroy)
+        self.menubar.add_cascade(label="File", menu=self.file_menu)
+        self.file_menu.add_command(label="New extraction", command=self.clear_interface)
+        # Disabled during the extractions, which fill the cache from their thread.
+        self.file_menu.add_command(label="Forget the files read", command=self.record_cache.clear)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="Quit", command=master.destroy)
         self.menubar.add_cascade(label="Help", menu=help_menu)
         help_menu.add_command(label="User manual", command=self.show_help)
         help_menu.add_command(label="About STOPE", command=self.show_about_dialog)
@@ -96,11 +107,19 @@ class Application(Frame):
         self.cospar_radiobutton.select() # By default, the program extracts data for one satellite.
         self.full_extract_radiobutton.deselect()
         self.cospar_label = Label(self.setup_frame, text="International designator")
-        self.cospar_entry = Entry(self.setup_frame, textvariable=self.cospar_designator)
+        self.cospar_entry = Entry(self.setup_frame, textvariable=self.cospar_designator) # Several designators can be separated by commas.
+        self.per_satellite = BooleanVar()
+        self.per_satellite_checkbutton = Checkbutton(self.setup_frame, text="One output file per satellite", variable=self.per_satellite)
+        self.profiled = BooleanVar()
+        self.profiled_checkbutton = Checkbutton(self.setup_frame, text="Profile the extraction", variable=self.profiled)
         self.output_file_label = Label(self.setup_frame, text="Output file")
         self.output_file_name = StringVar()
         self.output_file_entry = Entry(self.setup_frame, state="readonly", textvariable=self.output_file_name)
         self.output_file_button = Button(self.setup_frame, text="Select file", command=self.select_output_file)
+        self.columns_label = Label(self.setup_frame, text="Columns")
+        self.columns_text = StringVar()
+        self.columns_entry = Entry(self.setup_frame, textvariable=self.columns_text) # Keys separated by commas, all the columns if empty.
+        self.columns_hint_label = Label(self.setup_frame, text="All if empty, e.g. epoch, mmot, bstar")
         
         # Building the tooblox for the list of input files.
         self.list_of_files_toolframe = Frame(self)
@@ -119,6 +138,13 @@ class Application(Frame):
         # Building the button that starts the extraction.
         self.run_button = Button(self, text="Run the extraction", command=self.run_extraction, height=2, bg="#FFCC66")
         
+        # Building the progress display of the extraction.
+        self.progress_frame = Frame(self)
+        self.progress_bar = Progressbar(self.progress_frame, orient=HORIZONTAL, mode="determinate", maximum=100)
+        self.cancel_button = Button(self.progress_frame, text="Cancel", command=self.cancel_extraction, state=DISABLED)
+        self.progress_text = StringVar()
+        self.progress_label = Label(self, textvariable=self.progress_text, anchor=W)
+        
         # Positioning the widgets.
         # The widgets are expanded to fit the window size.
         self.pack(fill=BOTH, expand=1)
@@ -130,6 +156,11 @@ class Application(Frame):
         self.output_file_label.grid(row=1, column=0, sticky=W, padx=(0,5))
         self.output_file_entry.grid(row=1, column=1)
         self.output_file_button.grid(row=1, column=2, padx=(5,0), sticky=W)
+        self.per_satellite_checkbutton.grid(row=2, column=1, sticky=W, pady=(5,0))
+        self.profiled_checkbutton.grid(row=2, column=2, sticky=W, pady=(5,0))
+        self.columns_label.grid(row=3, column=0, sticky=W, padx=(0,5), pady=(5,0))
+        self.columns_entry.grid(row=3, column=1, pady=(5,0))
+        self.columns_hint_label.grid(row=3, column=2, sticky=W, padx=(5,0), pady=(5,0))
         
         self.list_of_files_toolframe.pack(fill=X, padx=5, pady=(0,5))
         self.add_files_button.pack(fill=X, side=LEFT, padx=(0,5))
@@ -141,6 +172,10 @@ class Application(Frame):
         self.list_of_files_frame.pack(fill=BOTH, expand=1, padx=5, pady=5)
         
         self.run_button.pack(fill=BOTH, padx=5, pady=(0,5))
+        self.progress_frame.pack(fill=X, padx=5)
+        self.progress_bar.pack(side=LEFT, fill=X, expand=1, padx=(0,5))
+        self.cancel_button.pack(side=RIGHT)
+        self.progress_label.pack(fill=X, padx=5, pady=(0,5))
         
     def add_files(self):
         """Asks the user to select TLE files"""
@@ -166,28 +201,28 @@ class Application(Frame):
     def select_output_file(self):
         """Called when the 'Select files' button is clicked."""
         
-        self.output_file_name.set(asksaveasfilename(title="Select the output file name", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]))
+        self.output_file_name.set(asksaveasfilename(title="Select the output file name", filetypes=[("CSV files", "*.csv"), ("Binary files", "*.bin"), ("NumPy archives", "*.npz"), ("Parquet files", "*.parquet"), ("Feather files", "*.feather"), ("All files", "*.*")]))
     
     def run_extraction(self):
         """
         Called when the 'Run the extraction' button is clicked.
-        This functions runs the extraction using the tle module functions,
-        measures the duration of the extraction and shows the user some warnings
-        about what happened.
+        This functions checks the inputs and starts the extraction in a
+        background thread, so that the window stays responsive. The progress
+        is then followed by :meth:`poll_extraction`.
         """
         correct_input = True
         
         if self.extraction_mode.get() == "one":
-            cospar = self.cospar_designator.get().strip().upper()
+            cospar = tle.split_designators(self.cospar_designator.get())
         else:
             cospar = None
         files = self.list_of_files_listbox.get(0, END)
         
         if self.extraction_mode.get() == "one":
-            if cospar == "":
+            if len(cospar) == 0:
                 correct_input = False
                 showerror("Error", "You must specify an international designator.")
-            elif not re.match("\d\d\d\d\d[A-Z]{1,3}", cospar, re.ASCII):
+            elif not all(re.match(r"\d\d\d\d\d[A-Z]{1,3}", designator, re.ASCII) for designator in cospar):
                 correct_input = False
                 showerror("Error", "The entered international designator is invalid.")
             
@@ -198,41 +233,137 @@ class Application(Frame):
         if len(files) == 0:
             correct_input = False
             showerror("Error", "You must specify at least one data file.")
+        
+        columns = None
+        
+        if self.columns_text.get().strip():
+            try:
+                columns = tle.select_columns(self.columns_text.get())
+            except ValueError as error:
+                correct_input = False
+                showerror("Error", str(error))
             
         if correct_input:
-            extration_start_time = datetime.datetime.now()
+            self.extration_start_time = datetime.datetime.now()
             
-            extraction_success = tle.data_extract(cospar, files, self.output_file_name.get())
+            # The extraction thread only communicates with the window through
+            # the queue, since tkinter must only be used from this thread.
+            self.extraction_events = queue.Queue()
+            profile = tle.ExtractionProfile() if self.profiled.get() else None
+            self.extraction_monitor = tle.ExtractionMonitor(lambda progress: self.extraction_events.put(("progress", progress)), profile)
             
-            extraction_duration = datetime.datetime.now() - extration_start_time
+            extraction_arguments = (cospar, files, self.output_file_name.get())
+            extraction_options = {"per_satellite": self.per_satellite.get() and cospar is not None, "monitor": self.extraction_monitor, "columns": columns, "cache": self.record_cache}
             
-            days = extraction_duration.days
-            hours = extraction_duration.seconds // 3600
-            minutes = (extraction_duration.seconds // 60) - 60 * hours
-            seconds = extraction_duration.seconds - 60 * minutes
-            microseconds = extraction_duration.microseconds
+            self.extraction_thread = threading.Thread(target=self.extract, args=extraction_arguments, kwargs=extraction_options, daemon=True)
             
-            extraction_duration_str = ""
+            self.run_button.config(state=DISABLED)
+            self.cancel_button.config(state=NORMAL)
+            self.file_menu.entryconfig("Forget the files read", state=DISABLED)
+            self.progress_bar.config(value=0)
+            self.progress_text.set("Starting the extraction...")
             
-            if days != 0:
-                extraction_duration_str += str(days) + " days "
-            if hours != 0:
-                extraction_duration_str += str(hours) + " h "
-            if minutes != 0 or hours != 0:
-                extraction_duration_str += str(minutes) + " min "
-            
-            extraction_duration_str += str(seconds)
-            if microseconds != 0:
-                extraction_duration_str += "." + str(microseconds)
+            self.extraction_thread.start()
+            self.after(PROGRESS_POLL_DELAY, self.poll_extraction)
+    
+    def extract(self, *args, **kwargs):
+        """Runs the extraction, in the background thread started by :meth:`run_extraction`."""
+        
+        try:
+            extraction_success = tle.data_extract(*args, **kwargs)
+        except Exception:
+            logger.exception("The extraction failed.")
+            extraction_success = None
+        
+        self.extraction_events.put(("done", extraction_success))
+    
+    def cancel_extraction(self):
+        """Called when the 'Cancel' button is clicked."""
+        
+        self.extraction_monitor.cancel()
+        self.cancel_button.config(state=DISABLED)
+        self.progress_text.set("Cancelling the extraction...")
+    
+    def poll_extraction(self):
+        """Shows the progress events sent by the extraction thread, until it is done."""
+        
+        try:
+            while True:
+                event, value = self.extraction_events.get_nowait()
                 
-            extraction_duration_str += " s"
-            
-            extraction_duration_str.strip()
+                if event == "progress":
+                    self.show_progress(value)
+                else:
+                    self.finish_extraction(value)
+                    return
+        except queue.Empty:
+            pass
+        
+        self.after(PROGRESS_POLL_DELAY, self.poll_extraction)
+    
+    def show_progress(self, progress):
+        """Updates the progress bar and the throughput readout."""
+        
+        if progress.bytes_count > 0:
+            self.progress_bar.config(value=100 * progress.bytes_read / progress.bytes_count)
+        
+        elapsed_seconds = (datetime.datetime.now() - self.extration_start_time).total_seconds()
+        throughput = progress.bytes_read / max(elapsed_seconds, 0.001) / 2 ** 20
+        
+        self.progress_text.set("{files_done}/{files_count} files, {throughput:.1f} MB/s, {accepted} TLEs accepted, {rejected} rejected".format(throughput=throughput, **progress._asdict()))
+    
+    def finish_extraction(self, extraction_success):
+        """
+        Called when the extraction thread is done.
+        Measures the duration of the extraction and shows the user some warnings
+        about what happened.
+        """
+        
+        cancelled = self.extraction_monitor.is_cancelled()
+        
+        self.show_progress(self.extraction_monitor.progress())
+        self.run_button.config(state=NORMAL)
+        self.cancel_button.config(state=DISABLED)
+        self.file_menu.entryconfig("Forget the files read", state=NORMAL)
+        
+        extraction_duration = datetime.datetime.now() - self.extration_start_time
+        
+        days = extraction_duration.days
+        hours = extraction_duration.seconds // 3600
+        minutes = (extraction_duration.seconds // 60) - 60 * hours
+        seconds = extraction_duration.seconds - 60 * minutes
+        microseconds = extraction_duration.microseconds
+        
+        extraction_duration_str = ""
+        
+        if days != 0:
+            extraction_duration_str += str(days) + " days "
+        if hours != 0:
+            extraction_duration_str += str(hours) + " h "
+        if minutes != 0 or hours != 0:
+            extraction_duration_str += str(minutes) + " min "
+        
+        extraction_duration_str += str(seconds)
+        if microseconds != 0:
+            extraction_duration_str += "." + str(microseconds)
             
-            if extraction_success:
-                showinfo("Extraction complete", "The data extraction of orbital parameters for was successful and lasted " + extraction_duration_str + ". You should check " + log.log_file_path + " before using the extracted data.")
-            else:
-                showwarning("No data extracted", "The extraction of the orbital parameters for couldn't be completed because unexpected events occured. Please check " + log.log_file_path + " to know more about this.")
+        extraction_duration_str += " s"
+        
+        extraction_duration_str.strip()
+        
+        # The time spent in each stage is added to the message when the
+        # extraction was profiled.
+        if self.extraction_monitor.profile is not None:
+            profile_summary = "\n\n" + self.extraction_monitor.profile.summary()
+        else:
+            profile_summary = ""
+        
+        if cancelled:
+            showwarning("Extraction cancelled", "The extraction was cancelled after " + extraction_duration_str + ". The output only contains the data extracted before.")
+        elif extraction_success:
+            showinfo("Extraction complete", "The data extraction of orbital parameters for was successful and lasted " + extraction_duration_str + ". You should check " + log.log_file_path + " before using the extracted data." + profile_summary)
+        else:
+            showwarning("No data extracted", "The extraction of the orbital parameters for couldn't be completed because unexpected events occured. Please check " + log.log_file_path + " to know more about this.")
                     
     def show_about_dialog(self):
         """Called when the About 'STOPE' menu is clicked."""
@@ -320,6 +451,9 @@ class Application(Frame):
         self.cospar_radiobutton.select()
         self.cospar_entry.config(state=NORMAL)
         self.cospar_designator.set("")
+        self.per_satellite.set(False)
+        self.profiled.set(False)
+        self.columns_text.set("")
         self.output_file_name.set("")
         self.list_of_files_listbox.delete(0, END)
         self.update_files_counter()
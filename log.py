@@ -31,11 +31,35 @@
 # knowledge of the CeCILL license and that you accept its terms.
 
 import os
+import atexit
+import queue
 import logging
 from logging import FileHandler
+from logging.handlers import QueueHandler, QueueListener
 
 log_file_path = os.path.join(os.path.expanduser("~"), "extraction.log")
 
+# The handlers are called by a background thread, fed through a queue by the
+# root logger: the extraction does not wait for the writes.
+log_queue = queue.SimpleQueue()
+log_listener = None
+
+def add_handler(handler):
+    """Adds a handler to the background thread, started with the first handler."""
+    
+    global log_listener
+    
+    if log_listener is None:
+        log_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        log_listener.start()
+        
+        # The records still in the queue are written before leaving.
+        atexit.register(log_listener.stop)
+        
+        logging.getLogger().addHandler(QueueHandler(log_queue))
+    else:
+        log_listener.handlers += (handler,)
+
 def log_events(level):
     """Create logging facilities."""
     
@@ -45,4 +69,13 @@ def log_events(level):
     file_handler = FileHandler(log_file_path, "w")
     file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    add_handler(file_handler)
+
+def log_console(level):
+    """Prints the events of the given level and above on the standard error."""
+    
+    formatter = logging.Formatter("[%(levelname)s] %(message)s")
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(level)
+    console_handler.setFormatter(formatter)
+    add_handler(console_handler)
@@ -33,10 +33,26 @@
 import logging
 import codecs
 
+import tle
+
 logger = logging.getLogger("root")
 
+# Beginning of the lines holding the filters and the columns of the
+# extraction.
+FILTER_PREFIX = "filter:"
+COLUMNS_PREFIX = "columns:"
+
 def load(filename):
-    """Opens the given file and returns a dictionary containing its data."""
+    """Opens the given file and returns a dictionary containing its data.
+    
+    The first line holds one or several designators, separated by commas or
+    spaces. They are given both as written (``cospar_designator``) and as a
+    list (``cospar_designators``). The second line is the output file, and the
+    next ones are the input files, except the lines starting with ``filter:``
+    which hold the conditions of a :class:`tle.TLEFilter` (``filters``), one
+    per line, and the lines starting with ``columns:`` which list the written
+    columns (``columns``, empty for all of them), see :func:`tle.select_columns`.
+    """
     
     try:
         file = codecs.open(filename, "r", "utf-8")
@@ -51,22 +67,49 @@ def load(filename):
     else:
         # Remove extra whitespace and \n.
         lines = [line.strip() for line in lines]
-        print(lines)
 
         if len(lines) >= 2:
-            return {"cospar_designator": lines[0].replace("\ufeff", ""), "output_file": lines[1], "input_files": lines[2:]}
+            cospar_designator = lines[0].replace("\ufeff", "")
+            input_files = []
+            filters = []
+            columns = []
+            
+            for line in lines[2:]:
+                if line.startswith(FILTER_PREFIX):
+                    filters.append(line[len(FILTER_PREFIX):].strip())
+                elif line.startswith(COLUMNS_PREFIX):
+                    columns.extend(line[len(COLUMNS_PREFIX):].replace(",", " ").split())
+                else:
+                    input_files.append(line)
+            
+            return {"cospar_designator": cospar_designator, "cospar_designators": tle.split_designators(cospar_designator), "output_file": lines[1], "input_files": input_files, "filters": filters, "columns": columns}
         else:
             logger.error("Not enough data in " + filename + ".")
             return None
         
 
 def save(filename, data):
-    """Saves the current setup for the extraction."""
+    """Saves the current setup for the extraction.
+    
+    When the data has a ``cospar_designators`` list, it is written instead of
+    the ``cospar_designator`` string. The ``filters`` and the ``columns``, if
+    any, are written after the input files.
+    """
+    
+    if "cospar_designators" in data:
+        cospar_designator = ", ".join(data["cospar_designators"])
+    else:
+        cospar_designator = data["cospar_designator"]
     
     try:
         file = open(filename, "w")
         #file.writelines([data["cospar_designator"], data["output_file"]] +  data["input_files"])
-        file.write("\n".join([data["cospar_designator"], data["output_file"]] +  data["input_files"]))
+        options = [FILTER_PREFIX + " " + expression for expression in data.get("filters", [])]
+        
+        if data.get("columns"):
+            options.append(COLUMNS_PREFIX + " " + ", ".join(data["columns"]))
+        
+        file.write("\n".join([cospar_designator, data["output_file"]] +  data["input_files"] + options))
         file.close()
     except PermissionError:
         logger.error("You do not have the permission to write " + filename + ".")
@@ -36,27 +36,41 @@
 Catches the command line arguments and then choses the right interface to start
 and sets the minimal logging level.
 
-..seealso:: :mod:`gui`
+When an output file or a job file is given, the extraction runs from the command
+line and the GUI is not even imported, see :mod:`cli`.
+
+..seealso:: :mod:`gui`, :mod:`cli`
 """
 
 import argparse
 import logging
+import sys
 
 import log
-import gui
+import cli
 
 cli_parser = argparse.ArgumentParser(prog="stope", description="Simple Tool for Orbital Paremeter Extraction")
 cli_parser.add_argument("--debug", help="Enable debug mode", action="store_true")
 cli_parser.add_argument("--version", action="version", version="1.0")
-cli_arguments = cli_parser.parse_args()
-
-logger = logging.getLogger("root")
-logger.info("STOPE is starting!")
-
-if cli_arguments.debug:
-    log.log_events(level=logging.DEBUG)
-    logger.info("Debug mode enabled.")
-else:
-    log.log_events(level=logging.INFO)
+cli.add_arguments(cli_parser)
 
-gui.start()
+# The worker processes of the extraction may import this file again, they must
+# not start anything.
+if __name__ == "__main__":
+    cli_arguments = cli_parser.parse_args()
+    
+    logger = logging.getLogger("root")
+    logger.info("STOPE is starting!")
+    
+    if cli_arguments.debug:
+        log.log_events(level=logging.DEBUG)
+        logger.info("Debug mode enabled.")
+    else:
+        log.log_events(level=logging.INFO)
+    
+    if cli.is_requested(cli_arguments):
+        log.log_console(level=logging.WARNING)
+        sys.exit(cli.run(cli_arguments))
+    
+    import gui
+    gui.start()
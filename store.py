@@ -0,0 +1,293 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Stores the extracted TLEs in an SQLite database, to query them without reading the TLE files again.
+
+The TLEs are loaded once with :func:`load`, then the ones of a set of
+satellites between two epochs are written in an output file by
+:func:`extract`, like with :func:`tle.data_extract`. A TLE is stored once,
+whatever the number of times it is loaded: it is identified by its satellite
+number, its epoch and its element number, like with the ``deduplicate``
+option of :func:`tle.data_extract`.
+
+Usage::
+
+    stope.pyw --store tle.db --input "tle/*.txt"
+    stope.pyw --store tle.db --cospar 98067A --start 2014-01-01 --end 2014-02-01 --output iss.csv
+"""
+
+import contextlib
+import datetime
+import itertools
+import logging
+import os
+import sqlite3
+
+import tle
+import writers
+
+logger = logging.getLogger("root")
+
+# Version of the tables of the store, it changes whenever their format does.
+STORE_VERSION = 1
+
+# Number of TLEs inserted at once, in a single transaction.
+STORE_BATCH_SIZE = 10000
+
+# Columns of the TLEs in the store: the fields of :class:`tle.TLERecord`, then
+# the epoch as a timestamp, for the queries by epoch range.
+COLUMNS = tle.CSV_KEYS + ["timestamp"]
+
+INSERT_QUERY = "INSERT OR IGNORE INTO tles (" + ", ".join(COLUMNS) + ") VALUES (" + ", ".join("?" * len(COLUMNS)) + ")"
+
+UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+
+def open_store(store_file, precise_epoch=False):
+    """Opens the store, creating it if needed.
+    
+    The precision of the epochs is chosen when the store is created, so that a
+    TLE has the same epoch whenever it is loaded.
+    
+    :param store_file: Path of the database.
+    :type store_file: str
+    :param precise_epoch: Whether to keep the microseconds of the epochs of a new store, see :func:`tle.epoch_to_datetime`.
+    :type precise_epoch: bool
+    :return: Connection to the store.
+    :rtype: sqlite3.Connection
+    :raise sqlite3.Error: If the database cannot be opened or is not a store of this version.
+    """
+    
+    connection = sqlite3.connect(store_file)
+    
+    try:
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS info (version INTEGER, precise_epoch INTEGER)")
+            
+            info = connection.execute("SELECT version, precise_epoch FROM info").fetchone()
+            
+            if info is None:
+                connection.execute("INSERT INTO info VALUES (?, ?)", (STORE_VERSION, precise_epoch))
+            elif info[0] != STORE_VERSION:
+                raise sqlite3.DatabaseError("unsupported version of the store")
+            
+            # The satellite numbers are found with the primary key.
+            connection.execute("CREATE TABLE IF NOT EXISTS tles (satnum TEXT, cospar TEXT, epoch TEXT, mmotd REAL, mmotdd REAL, bstar REAL, ephtype INTEGER, eltnum TEXT, inclin REAL, raan REAL, eccentr REAL, argofper REAL, manomaly REAL, mmot REAL, epochrev INTEGER, name TEXT, timestamp INTEGER, PRIMARY KEY (satnum, timestamp, eltnum))")
+            connection.execute("CREATE INDEX IF NOT EXISTS tles_cospar ON tles (cospar, timestamp)")
+            connection.execute("CREATE INDEX IF NOT EXISTS tles_epoch ON tles (timestamp)")
+            connection.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER)")
+    except Exception:
+        connection.close()
+        raise
+    
+    return connection
+
+def is_precise(connection):
+    """Tells whether the epochs of the store keep their microseconds."""
+    
+    return bool(connection.execute("SELECT precise_epoch FROM info").fetchone()[0])
+
+def load(connection, tle_files, workers=1, chunk_size=tle.CHUNK_SIZE, monitor=None, error_summary=False):
+    """Loads the TLEs of the files into the store.
+    
+    The files are extracted by :func:`tle.extract_rows`, so only the valid
+    TLEs are stored. They are inserted by batches of :data:`STORE_BATCH_SIZE`,
+    each batch in its own transaction. The TLEs which are already in the store
+    are ignored, and the files which did not change since they were loaded are
+    not even read.
+    
+    :param connection: Connection to the store, see :func:`open_store`.
+    :type connection: sqlite3.Connection
+    :param tle_files: List of TLE filenames and paths.
+    :type tle_files: list
+    :param workers: Number of processes, or None for one per processor.
+    :type workers: int
+    :param chunk_size: Approximate size in bytes of the pieces of files given to the processes.
+    :type chunk_size: int
+    :param monitor: Follows the progress of the loading and allows to cancel it, the TLEs extracted before the cancellation are stored.
+    :type monitor: tle.ExtractionMonitor
+    :param error_summary: Whether to log a summary of the errors of each file instead of one message per invalid TLE, see :class:`tle.ErrorSummary`.
+    :type error_summary: bool
+    :return: Number of TLEs added to the store.
+    :rtype: int
+    """
+    
+    new_files = []
+    file_states = []
+    
+    for tle_file in tle_files:
+        path = os.path.abspath(tle_file)
+        
+        try:
+            stat = os.stat(tle_file)
+        except FileNotFoundError:
+            logger.error("Unable to find " + tle_file + ".")
+            continue
+        
+        if connection.execute("SELECT size, mtime FROM files WHERE path = ?", (path,)).fetchone() == (stat.st_size, stat.st_mtime_ns):
+            logger.info(tle_file + " is already in the store.")
+            continue
+        
+        new_files.append(tle_file)
+        file_states.append((path, stat.st_size, stat.st_mtime_ns))
+    
+    if monitor is None:
+        monitor = tle.ExtractionMonitor()
+    
+    rows = tle.extract_rows(None, new_files, workers, chunk_size, is_precise(connection), monitor=monitor, error_summary=error_summary)
+    changes = connection.total_changes
+    
+    while True:
+        batch = list(itertools.islice(rows, STORE_BATCH_SIZE))
+        if not batch:
+            break
+        
+        with connection:
+            connection.executemany(INSERT_QUERY, [row + (writers.epoch_timestamp(row.epoch),) for row in batch])
+    
+    loaded_count = connection.total_changes - changes
+    
+    # A cancelled file is read again the next time.
+    if not monitor.is_cancelled():
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", file_states)
+    
+    logger.info(str(loaded_count) + " new TLEs in the store.")
+    
+    return loaded_count
+
+def epoch_bound(bound):
+    """Converts a bound of an epoch range to a timestamp.
+    
+    The epochs of the TLEs are in UTC, so a bound with a time zone is
+    converted to UTC, and a bound without time zone is taken as UTC.
+    
+    :param bound: Date or date and time, as :class:`datetime.date`, :class:`datetime.datetime` or ISO string (YYYY-MM-DD or YYYY-MM-DD hh:mm:ss, possibly followed by a UTC offset).
+    :return: Microseconds since the 1st of January 1970.
+    :rtype: int
+    :raise ValueError: If the string is not a date.
+    """
+    
+    if isinstance(bound, str):
+        bound = datetime.datetime.fromisoformat(bound)
+    elif not isinstance(bound, datetime.datetime):
+        bound = datetime.datetime.combine(bound, datetime.time())
+    
+    if bound.tzinfo is not None:
+        bound = bound.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    
+    return (bound - UNIX_EPOCH) // datetime.timedelta(microseconds=1)
+
+def query(connection, cospar=None, start=None, end=None):
+    """Finds the TLEs of the satellites in the store, between two epochs.
+    
+    The TLEs are sorted by satellite number, epoch and element number, like
+    with :func:`tle.sorted_rows`.
+    
+    :param connection: Connection to the store, see :func:`open_store`.
+    :type connection: sqlite3.Connection
+    :param cospar: International or COSPAR designator / NSSDC ID, set of designators, or None for all satellites.
+    :type cospar: str
+    :param start: First epoch, or None for no limit, see :func:`epoch_bound`.
+    :param end: Epoch after the last one (it is excluded), or None for no limit, see :func:`epoch_bound`.
+    :return: Generator of :class:`tle.TLERecord`.
+    :rtype: generator
+    :raise ValueError: If a bound is not a date.
+    """
+    
+    cospars = tle.designator_set(cospar)
+    conditions = []
+    parameters = []
+    
+    # The designators are put in a table rather than in the query, since there
+    # may be more of them than the number of parameters of a query.
+    if cospars is not None:
+        connection.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (cospar TEXT PRIMARY KEY)")
+        with connection:
+            connection.execute("DELETE FROM wanted")
+            connection.executemany("INSERT INTO wanted VALUES (?)", ((designator,) for designator in cospars))
+        conditions.append("cospar IN wanted")
+    
+    if start is not None:
+        conditions.append("timestamp >= ?")
+        parameters.append(epoch_bound(start))
+    
+    if end is not None:
+        conditions.append("timestamp < ?")
+        parameters.append(epoch_bound(end))
+    
+    sql = "SELECT " + ", ".join(tle.CSV_KEYS) + " FROM tles"
+    
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    
+    sql += " ORDER BY satnum, timestamp, eltnum"
+    
+    return (tle.TLERecord(*row) for row in connection.execute(sql, parameters))
+
+def extract(cospar, store_file, output_file, start=None, end=None, per_satellite=False, output_format=None, columns=None):
+    """Writes the TLEs of the satellites between two epochs from the store into the output file.
+    
+    This is the equivalent of :func:`tle.data_extract`, without reading the
+    TLE files, see :func:`query`.
+    
+    :param cospar: International or COSPAR designator / NSSDC ID, set of designators, or None for all satellites.
+    :type cospar: str
+    :param store_file: Path of the database.
+    :type store_file: str
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param start: First epoch, or None for no limit, see :func:`epoch_bound`.
+    :param end: Epoch after the last one (it is excluded), or None for no limit, see :func:`epoch_bound`.
+    :param per_satellite: Whether to write one output file per satellite, see :func:`tle.satellite_output_file`.
+    :type per_satellite: bool
+    :param output_format: Format of the output files, see :data:`writers.FORMATS`, or None to choose it with the extension of the output file.
+    :type output_format: str
+    :param columns: Keys of the written columns, see :func:`tle.select_columns`, or None for all of them.
+    :type columns: list
+    :return: True if data was written, False if there was nothing to extract, None if the store cannot be read or the output file cannot be written.
+    :rtype: bool
+    :raise ValueError: If a bound is not a date.
+    """
+    
+    if not os.path.exists(store_file):
+        logger.error("Unable to find " + store_file + ".")
+        return None
+    
+    try:
+        connection = open_store(store_file)
+    except sqlite3.Error as error:
+        logger.error(store_file + " is not a valid store (" + str(error) + ").")
+        return None
+    
+    with contextlib.closing(connection):
+        return tle.write_output(query(connection, cospar, start, end), output_file, per_satellite, output_format=output_format, columns=columns)
@@ -0,0 +1,135 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Tests of the batches of extraction jobs, see :mod:`batch`."""
+
+import csv
+import json
+import logging
+
+import pytest
+
+import batch
+import benchmark
+import setup_file
+import tle
+
+def read_csv(output_file):
+    with open(output_file, newline="") as file:
+        return list(csv.reader(file))
+
+def job_data(output_file, input_files, cospars=(), filters=(), columns=()):
+    return {"cospar_designators": list(cospars), "output_file": output_file, "input_files": list(input_files), "filters": list(filters), "columns": list(columns)}
+
+def write_job(job_file, *arguments, **options):
+    setup_file.save(job_file, job_data(*arguments, **options))
+    
+    return job_file
+
+@pytest.fixture
+def tle_files(tle_file, tmp_path):
+    """Paths of two files of random TLEs, the first one with some invalid TLEs."""
+    
+    other_file = str(tmp_path / "other.txt")
+    benchmark.generate_file(other_file, 100, seed=2)
+    
+    return [tle_file, other_file]
+
+def test_group_jobs(tmp_path):
+    jobs = [batch.Job(name, job_data(name + ".csv", [str(tmp_path / input_file) for input_file in input_files])) for name, input_files in [
+        ("a", ["1", "2"]),
+        ("b", ["3"]),
+        ("c", ["4"]),
+        ("d", ["3", "4"]),
+        ("e", ["2"])]]
+    
+    # The jobs b and c share no file, but both share one with d.
+    assert [[job.job_file for job in group] for group in batch.group_jobs(jobs)] == [["a", "e"], ["b", "c", "d"]]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch(tle_files, tmp_path, workers):
+    cospar = next(tle.extract_rows(None, tle_files[:1])).cospar
+    
+    # The last job is in its own group.
+    alone_file = str(tmp_path / "alone.txt")
+    benchmark.generate_file(alone_file, 50, seed=3)
+    jobs = [
+        (str(tmp_path / "all.csv"), tle_files, {}),
+        (str(tmp_path / "satellite.csv"), tle_files[:1], {"cospars": [cospar]}),
+        (str(tmp_path / "filtered.csv"), tle_files[::-1], {"filters": ["mmot > 11"], "columns": ["epoch", "mmot"]}),
+        (str(tmp_path / "alone.csv"), [alone_file], {})]
+    job_files = [write_job(str(tmp_path / ("job" + str(index) + ".txt")), output_file, input_files, **options) for index, (output_file, input_files, options) in enumerate(jobs)]
+    report_file = str(tmp_path / "report.json")
+    
+    statuses = batch.run_batch(job_files, report_file, workers=workers)
+    
+    assert [status["status"] for status in statuses] == [batch.STATUS_WRITTEN] * len(jobs)
+    
+    # Each job writes the rows of its own extraction, in the order of the files
+    # of its group.
+    for (output_file, input_files, options), status in zip(jobs, statuses):
+        expected_file = str(tmp_path / "expected.csv")
+        input_files = [input_file for input_file in tle_files + [alone_file] if input_file in input_files]
+        tle_filter = tle.TLEFilter(options["filters"]) if "filters" in options else None
+        tle.data_extract(set(options.get("cospars", ())) or None, input_files, expected_file, tle_filter=tle_filter, columns=options.get("columns"))
+        
+        assert read_csv(output_file) == read_csv(expected_file)
+        assert status["rows"] == len(read_csv(output_file)) - 1
+    
+    with open(report_file) as file:
+        report = json.load(file)
+    
+    assert report["counts"] == {batch.STATUS_WRITTEN: len(jobs)}
+    assert [status["job"] for status in report["jobs"]] == job_files
+
+def test_duplicate_jobs(tle_files, tmp_path, caplog):
+    job_file = write_job(str(tmp_path / "job.txt"), str(tmp_path / "output.csv"), tle_files)
+    
+    # A setup file given twice is run once.
+    statuses = batch.run_batch([job_file, str(tmp_path / "." / "job.txt")])
+    
+    assert [status["status"] for status in statuses] == [batch.STATUS_WRITTEN]
+    assert "The setup file " + str(tmp_path / "." / "job.txt") + " is given many times, its job is run once." in caplog.messages
+
+def test_shared_output(tle_files, tmp_path, caplog):
+    output_file = str(tmp_path / "output.csv")
+    first_job = write_job(str(tmp_path / "first.txt"), output_file, tle_files[:1])
+    second_job = write_job(str(tmp_path / "second.txt"), output_file, tle_files[1:])
+    other_job = write_job(str(tmp_path / "third.txt"), str(tmp_path / "third.csv"), tle_files)
+    
+    statuses = batch.run_batch([first_job, second_job, other_job])
+    
+    # The jobs writing the same output file would overwrite each other.
+    assert [status["status"] for status in statuses] == [batch.STATUS_INVALID, batch.STATUS_INVALID, batch.STATUS_WRITTEN]
+    assert statuses[0]["message"] == "The output file " + output_file + " is also written by " + second_job + "."
+    assert not (tmp_path / "output.csv").exists()
+    assert len([record for record in caplog.records if record.levelno == logging.ERROR and record.getMessage().startswith("In " + first_job)]) == 1
@@ -0,0 +1,97 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Tests of the command line extraction, see :mod:`cli`."""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+import tle
+
+def run(*arguments):
+    """Runs the command line extraction with the arguments, see :func:`cli.run`."""
+    
+    cli_parser = argparse.ArgumentParser()
+    cli.add_arguments(cli_parser)
+    
+    return cli.run(cli_parser.parse_args(arguments))
+
+def read_cospars(output_file):
+    with open(output_file, newline="") as file:
+        return {row[1] for row in list(csv.reader(file))[1:]}
+
+@pytest.fixture
+def cospars(tle_file):
+    """Two designators of the TLE file."""
+    
+    rows = list(tle.extract_rows(None, [tle_file]))
+    
+    return rows[0].cospar, next(row.cospar for row in rows if row.cospar != rows[0].cospar)
+
+def test_extraction(tle_file, tmp_path):
+    output_file = str(tmp_path / "all.csv")
+    
+    assert run("--input", tle_file, "--output", output_file) == 0
+    assert read_cospars(output_file) == {row.cospar for row in tle.extract_rows(None, [tle_file])}
+
+def test_cospar_case(tle_file, tmp_path, cospars):
+    output_file = str(tmp_path / "lower.csv")
+    
+    assert run("--cospar", cospars[0].lower(), "--input", tle_file, "--output", output_file) == 0
+    assert read_cospars(output_file) == {cospars[0]}
+
+def test_cospar_commas(tle_file, tmp_path, cospars):
+    output_file = str(tmp_path / "commas.csv")
+    
+    assert run("--cospar", cospars[0] + "," + cospars[1], "--input", tle_file, "--output", output_file) == 0
+    assert read_cospars(output_file) == set(cospars)
+
+def test_nothing_extracted(tle_file, tmp_path):
+    assert run("--cospar", "57001A", "--input", tle_file, "--output", str(tmp_path / "none.csv")) == 1
+
+def test_invalid_arguments(tle_file, tmp_path):
+    assert run("--output", str(tmp_path / "none.csv")) == 2
+    assert run("--input", tle_file, "--output", str(tmp_path / "none.csv"), "--filter", "mmot >") == 2
+
+def test_no_gui_import():
+    # The command line extraction does not import Tk, nor the modules of the
+    # indexes, the incremental extractions, the sorts and the process pool.
+    modules = ["tkinter", "gui", "sqlite3", "hashlib", "json", "pickle", "tempfile", "shutil", "heapq", "queue", "concurrent.futures"]
+    command = "import sys, cli; sys.exit(sorted(set(sys.modules) & set(" + repr(modules) + ")) or None)"
+    
+    assert subprocess.run([sys.executable, "-c", command], cwd=os.path.dirname(os.path.abspath(cli.__file__))).returncode == 0
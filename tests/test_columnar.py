@@ -0,0 +1,89 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Tests of the columnar decoding, see :mod:`columnar`."""
+
+import datetime
+import random
+
+import pytest
+
+import benchmark
+import tle
+
+numpy = pytest.importorskip("numpy")
+
+import columnar
+
+def record_values(record):
+    """Returns the values of a record of the structured array like those of a row."""
+    
+    values = record.tolist()
+    
+    return values[:2] + (values[2].isoformat(" "),) + values[3:]
+
+def row_values(row):
+    # The epochs of the arrays always have their microseconds.
+    epoch = datetime.datetime.fromisoformat(row.epoch).isoformat(" ")
+    
+    return (row.satnum, row.cospar, epoch) + tuple(row[3:-1])
+
+def test_same_values(tle_file):
+    rows = list(tle.extract_rows(None, [tle_file], precise_epoch=True))
+    records = columnar.load(None, [tle_file])
+    
+    assert len(rows) > 250
+    assert [record_values(record) for record in records] == [row_values(row) for row in rows]
+
+def test_3le_and_extra_characters(tmp_path):
+    tle_file = str(tmp_path / "3le.txt")
+    rng = random.Random(4)
+    
+    # The names and the blank lines prevent decoding the lines in place, and
+    # the trailing spaces are decoded by the tle module.
+    with open(tle_file, "w") as file:
+        for index in range(20):
+            line1, line2 = benchmark.generate_tle(rng)
+            file.write("0 SATELLITE " + str(index) + "\n" + line1 + ("  " if index % 3 == 0 else "") + "\n" + line2 + "\n\n")
+    
+    rows = list(tle.extract_rows(None, [tle_file], precise_epoch=True))
+    records = columnar.load(None, [tle_file])
+    
+    assert len(rows) == 20
+    assert [record_values(record) for record in records] == [row_values(row) for row in rows]
+
+def test_cospar(tle_file):
+    cospar = next(tle.extract_rows(None, [tle_file])).cospar
+    rows = list(tle.extract_rows(cospar, [tle_file], precise_epoch=True))
+    
+    assert [record_values(record) for record in columnar.load(cospar, [tle_file])] == [row_values(row) for row in rows]
+    assert len(columnar.load(None, [tle_file + ".missing"])) == 0
@@ -0,0 +1,124 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Tests of the store of the TLEs, see :mod:`store`."""
+
+import contextlib
+import csv
+import datetime
+import logging
+import random
+
+import pytest
+
+import benchmark
+import store
+import tle
+
+def read_csv(output_file):
+    with open(output_file, newline="") as file:
+        return list(csv.reader(file))
+
+def epoch_datetime(epoch):
+    # The hours are not padded with zeros, see tle.epoch_key().
+    return datetime.datetime.strptime(epoch, "%Y-%m-%d %H:%M:%S")
+
+@pytest.fixture
+def store_file(tmp_path):
+    return str(tmp_path / "tles.db")
+
+def test_idempotent_reload(tle_file, store_file, caplog):
+    expected = list(tle.sorted_rows(tle.extract_rows(None, [tle_file, tle_file]), deduplicate=True))
+    
+    with contextlib.closing(store.open_store(store_file)) as connection:
+        assert store.load(connection, [tle_file]) == len(expected)
+        assert list(store.query(connection)) == expected
+        
+        # An unchanged file is not read again.
+        with caplog.at_level(logging.INFO):
+            assert store.load(connection, [tle_file]) == 0
+        
+        assert tle_file + " is already in the store." in caplog.messages
+    
+    # The TLEs already stored are ignored when a file changed, even in another
+    # connection.
+    line1, line2 = benchmark.generate_tle(random.Random(3))
+    
+    with open(tle_file, "a") as file:
+        file.write(line1 + "\n" + line2 + "\n")
+    
+    with contextlib.closing(store.open_store(store_file)) as connection:
+        assert store.load(connection, [tle_file, tle_file]) == 1
+        assert len(list(store.query(connection))) == len(expected) + 1
+
+def test_query_bounds(tle_file, store_file):
+    with contextlib.closing(store.open_store(store_file)) as connection:
+        store.load(connection, [tle_file])
+        rows = list(store.query(connection))
+        epochs = sorted(epoch_datetime(row.epoch) for row in rows)
+        start = epochs[len(epochs) // 4]
+        end = epochs[3 * len(epochs) // 4]
+        
+        # The start is included and the end excluded.
+        expected = [row for row in rows if start <= epoch_datetime(row.epoch) < end]
+        
+        assert 0 < len(expected) < len(rows)
+        assert list(store.query(connection, start=start, end=end)) == expected
+        assert list(store.query(connection, start=str(start), end=end.isoformat())) == expected
+        
+        # The bounds with a time zone are converted to UTC.
+        zone = datetime.timezone(datetime.timedelta(hours=2))
+        assert list(store.query(connection, start=(start + datetime.timedelta(hours=2)).replace(tzinfo=zone), end=end)) == expected
+        
+        cospars = {rows[0].cospar, rows[-1].cospar}
+        assert list(store.query(connection, cospars)) == [row for row in rows if row.cospar in cospars]
+    
+    assert store.epoch_bound(datetime.date(1970, 1, 2)) == 24 * 3600 * 10 ** 6
+    
+    with pytest.raises(ValueError):
+        store.epoch_bound("yesterday")
+
+def test_extract(tle_file, store_file, tmp_path, caplog):
+    with contextlib.closing(store.open_store(store_file)) as connection:
+        store.load(connection, [tle_file])
+    
+    output_file = str(tmp_path / "stored.csv")
+    expected_file = str(tmp_path / "expected.csv")
+    tle.data_extract(None, [tle_file], expected_file, sort=True, deduplicate=True)
+    
+    assert store.extract(None, store_file, output_file)
+    assert read_csv(output_file) == read_csv(expected_file)
+    
+    caplog.clear()
+    
+    assert store.extract(None, str(tmp_path / "missing.db"), output_file) is None
+    assert [record.getMessage() for record in caplog.records if record.levelno >= logging.ERROR] == ["Unable to find " + str(tmp_path / "missing.db") + "."]
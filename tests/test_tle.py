@@ -0,0 +1,483 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Tests of the extraction of the TLEs, see :mod:`tle`."""
+
+import contextlib
+import csv
+import datetime
+import gzip
+import itertools
+import logging
+import operator
+import os
+import random
+import zipfile
+
+import pytest
+
+import benchmark
+import tle
+
+LINE1 = "1 00005U 58002B   14001.18782563  .00000040  00000-0  40921-4 0  1802"
+LINE2 = "2 00005 034.2515 294.1619 1849340 178.4613 182.2758 10.84381573949160"
+
+def log_messages(caplog, level=logging.WARNING):
+    """Returns the messages logged at the level or above, then forgets them."""
+    
+    messages = [record.getMessage() for record in caplog.records if record.levelno >= level]
+    caplog.clear()
+    
+    return messages
+
+def read_csv(output_file):
+    with open(output_file, newline="") as file:
+        return list(csv.reader(file))
+
+def test_frame_two_lines():
+    lines = ["1 first", "2 second", "1 third", "2 fourth"]
+    
+    assert list(tle.frame_tles(enumerate(lines, 1))) == [(1, "", "1 first", "2 second", 2), (3, "", "1 third", "2 fourth", 4)]
+
+def test_frame_names_and_blank_lines():
+    lines = ["0 ISS (ZARYA)", "1 first", "2 second", "", "  ", "HST", "1 third", "", "2 fourth", ""]
+    
+    # The blank lines between the two lines are counted in the number of the
+    # second line.
+    assert list(tle.frame_tles(enumerate(lines, 1))) == [(2, "ISS (ZARYA)", "1 first", "2 second", 3), (7, "HST", "1 third", "2 fourth", 9)]
+
+def test_frame_stray_lines():
+    lines = ["1 alone", "1 first", "2 second", "2 alone", "NAME", "OTHER NAME", "1 third", "2 fourth", "X" * (tle.NAME_MAX_LENGTH + 1), "1 last"]
+    
+    # Each stray line is yielded alone, without shifting the following TLEs,
+    # and the last first line is dropped.
+    assert list(tle.frame_tles(enumerate(lines, 1))) == [
+        (1, "", "1 alone", "", 1),
+        (2, "", "1 first", "2 second", 3),
+        (4, "", "", "2 alone", 4),
+        (5, "", "NAME", "", 5),
+        (7, "OTHER NAME", "1 third", "2 fourth", 8),
+        (9, "", "X" * (tle.NAME_MAX_LENGTH + 1), "", 9)]
+
+def test_extract_3le(tmp_path):
+    tle_file = str(tmp_path / "3le.txt")
+    
+    with open(tle_file, "w") as file:
+        file.write("0 VANGUARD 1\n" + LINE1 + "\n" + LINE2 + "\n\n")
+    
+    rows = list(tle.extract_rows(None, [tle_file]))
+    
+    assert [(row.satnum, row.cospar, row.name) for row in rows] == [("00005U", "58002B", "VANGUARD 1")]
+
+def test_invalid_tle_messages(tmp_path, caplog):
+    tle_file = str(tmp_path / "blank.txt")
+    bad_line2 = LINE2[:-1] + str((int(LINE2[-1]) + 1) % 10)
+    other_line2 = LINE2[:2] + "00006" + LINE2[7:68]
+    
+    # The second lines are separated from the first ones by blank lines.
+    with open(tle_file, "w") as file:
+        file.write(LINE1 + "\n\n" + bad_line2 + "\n" + LINE1 + "\n\n\n" + other_line2 + benchmark.checksum(other_line2) + "\n")
+    
+    assert list(tle.extract_rows(None, [tle_file])) == []
+    assert log_messages(caplog) == [
+        "In " + tle_file + ", line 3: checksum verification failed.",
+        "Different satellite number for lines 4 and 7."]
+    
+    list(tle.extract_rows(None, [tle_file], error_summary=True))
+    
+    assert log_messages(caplog) == [
+        "In " + tle_file + ", 1 TLEs: checksum verification failed on the second line (first at line 3).",
+        "In " + tle_file + ", 1 TLEs: different satellite numbers (first at line 4)."]
+
+def test_parallel_extraction(tle_file, caplog):
+    serial_rows = list(tle.extract_rows(None, [tle_file, tle_file]))
+    serial_messages = log_messages(caplog)
+    
+    parallel_rows = list(tle.extract_rows(None, [tle_file, tle_file], workers=2, chunk_size=2048))
+    parallel_messages = log_messages(caplog)
+    
+    assert len(serial_rows) > 250
+    assert serial_messages
+    assert parallel_rows == serial_rows
+    assert parallel_messages == serial_messages
+
+def test_parallel_error_summary(tle_file, caplog):
+    serial_rows = list(tle.extract_rows(None, [tle_file], error_summary=True))
+    serial_messages = log_messages(caplog)
+    
+    parallel_rows = list(tle.extract_rows(None, [tle_file], workers=2, chunk_size=2048, error_summary=True))
+    parallel_messages = log_messages(caplog)
+    
+    assert parallel_rows == serial_rows
+    assert parallel_messages == serial_messages
+
+def test_parallel_3le(tmp_path):
+    tle_file = str(tmp_path / "3le.txt")
+    rng = random.Random(2)
+    
+    with open(tle_file, "w") as file:
+        for index in range(200):
+            file.write("0 SATELLITE " + str(index) + "\n" + "\n".join(benchmark.generate_tle(rng)) + "\n")
+    
+    serial_rows = list(tle.extract_rows(None, [tle_file]))
+    
+    assert len(serial_rows) == 200
+    assert list(tle.extract_rows(None, [tle_file], workers=2, chunk_size=1024)) == serial_rows
+
+def test_indexed_extraction(tle_file):
+    rows = list(tle.extract_rows(None, [tle_file]))
+    cospar = rows[0].cospar
+    expected = [row for row in rows if row.cospar == cospar]
+    
+    assert list(tle.extract_rows(cospar, [tle_file], use_index=True)) == expected
+    assert os.path.exists(tle_file + tle.INDEX_SUFFIX)
+    
+    # The TLEs can also be found by satellite number.
+    satnum = rows[0].satnum[:5]
+    
+    with contextlib.closing(tle.load_index(tle_file)) as connection:
+        entries = tle.lookup_index(connection, satnum=satnum)
+    
+    tles = tle.frame_tles(tle.indexed_lines(tle_file, entries))
+    
+    assert [line1[2:7] for line_number, name, line1, line2, line2_number in tles] == [satnum] * len(entries)
+    assert len(entries) >= len([row for row in rows if row.satnum[:5] == satnum])
+
+def test_outdated_index(tmp_path):
+    tle_file = str(tmp_path / "3le.txt")
+    
+    with open(tle_file, "w") as file:
+        file.write("0 VANGUARD 1\n" + LINE1 + "\n" + LINE2 + "\n")
+    
+    assert [row.name for row in tle.extract_rows("58002B", [tle_file], use_index=True)] == ["VANGUARD 1"]
+    
+    # The index is built again for the new TLE.
+    with open(tle_file, "a") as file:
+        file.write("\n0 VANGUARD 1\n" + LINE1 + "\n" + LINE2 + "\n")
+    
+    assert len(list(tle.extract_rows("58002B", [tle_file], use_index=True))) == 2
+
+def test_per_satellite_output(tle_file, tmp_path):
+    cospars = sorted({row.cospar for row in tle.extract_rows(None, [tle_file])})[:2]
+    output_file = str(tmp_path / "output.csv")
+    
+    assert tle.satellite_output_file(output_file, "98067A") == str(tmp_path / "output_98067A.csv")
+    assert tle.data_extract(set(cospars), [tle_file], output_file, per_satellite=True)
+    assert not os.path.exists(output_file)
+    
+    # Each file has the rows of its satellite only.
+    for cospar in cospars:
+        single_file = str(tmp_path / ("single_" + cospar + ".csv"))
+        tle.data_extract(cospar, [tle_file], single_file)
+        
+        assert read_csv(tle.satellite_output_file(output_file, cospar)) == read_csv(single_file)
+
+def test_progress(tle_file, monkeypatch):
+    monkeypatch.setattr(tle, "PROGRESS_INTERVAL", 50)
+    reports = []
+    monitor = tle.ExtractionMonitor(reports.append)
+    rows = list(tle.extract_rows(None, [tle_file, tle_file], monitor=monitor))
+    progress = monitor.progress()
+    
+    assert len(reports) > 2
+    assert [report.bytes_read for report in reports] == sorted(report.bytes_read for report in reports)
+    assert (progress.files_done, progress.files_count) == (2, 2)
+    assert progress.bytes_read == progress.bytes_count == 2 * os.path.getsize(tle_file)
+    assert progress.accepted == len(rows)
+    assert progress.rejected > 0
+
+def test_cancel(tle_file, tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(tle, "PROGRESS_INTERVAL", 50)
+    all_rows = list(tle.extract_rows(None, [tle_file, tle_file]))
+    
+    # The extraction stops at the first report after the cancellation.
+    monitor = tle.ExtractionMonitor(lambda progress: monitor.cancel())
+    rows = list(tle.extract_rows(None, [tle_file, tle_file], monitor=monitor))
+    
+    assert 0 < len(rows) < len(all_rows) / 2
+    assert rows == all_rows[:len(rows)]
+    assert monitor.progress().files_done == 0
+    
+    # The rows extracted before are written.
+    output_file = str(tmp_path / "cancelled.csv")
+    monitor = tle.ExtractionMonitor(lambda progress: monitor.cancel())
+    caplog.clear()
+    
+    assert tle.data_extract(None, [tle_file], output_file, monitor=monitor)
+    assert len(read_csv(output_file)) == len(rows) + 1
+    assert log_messages(caplog)[-1] == "The extraction was cancelled, only the data extracted before was written."
+
+def test_incremental_extraction(tle_file, tmp_path):
+    output_file = str(tmp_path / "incremental.csv")
+    
+    assert tle.data_extract(None, [tle_file], output_file, incremental=True)
+    
+    rows = read_csv(output_file)
+    
+    # Nothing new to extract.
+    assert tle.data_extract(None, [tle_file], output_file, incremental=True) is False
+    assert read_csv(output_file) == rows
+    
+    # A TLE of a satellite already written, appended to the file with the
+    # earliest epoch, is older than the last epoch of the satellite but is
+    # still new.
+    satnum = rows[1][0][:5]
+    line1, line2 = benchmark.generate_tle(random.Random(3))
+    line1 = line1[:2] + satnum + line1[7:18] + "57001.00000000" + line1[32:68]
+    line2 = line2[:2] + satnum + line2[7:68]
+    
+    with open(tle_file, "a") as file:
+        file.write(line1 + benchmark.checksum(line1) + "\n" + line2 + benchmark.checksum(line2) + "\n")
+    
+    assert tle.data_extract(None, [tle_file], output_file, incremental=True)
+    
+    full_file = str(tmp_path / "full.csv")
+    tle.data_extract(None, [tle_file], full_file)
+    
+    assert len(read_csv(output_file)) == len(rows) + 1
+    assert read_csv(output_file) == read_csv(full_file)
+
+def test_sorted_rows(tle_file, monkeypatch):
+    rows = list(tle.extract_rows(None, [tle_file]))
+    expected = sorted(rows, key=tle.row_sort_key)
+    
+    assert list(tle.sorted_rows(rows)) == expected
+    
+    # Runs spilled in temporary files, merged by groups.
+    monkeypatch.setattr(tle, "SORT_RUN_SIZE", 16)
+    monkeypatch.setattr(tle, "SORT_FAN_IN", 3)
+    
+    assert list(tle.sorted_rows(rows)) == expected
+    assert list(tle.sorted_rows(rows + rows[::-1], deduplicate=True)) == expected
+
+def test_compressed_files(tle_file, tmp_path, caplog):
+    rows = list(tle.extract_rows(None, [tle_file]))
+    messages = log_messages(caplog)
+    
+    with open(tle_file, "rb") as file:
+        data = file.read()
+    
+    gzip_file = str(tmp_path / "tles.gz")
+    
+    with gzip.open(gzip_file, "wb") as file:
+        file.write(data)
+    
+    zip_file = str(tmp_path / "tles.zip")
+    
+    with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.write(tle_file, "first.txt")
+        archive.write(tle_file, "second.txt")
+    
+    assert tle.compression_format(gzip_file) == "gzip"
+    assert list(tle.extract_rows(None, [gzip_file])) == rows
+    assert log_messages(caplog) == [message.replace(tle_file, gzip_file) for message in messages]
+    assert list(tle.extract_rows(None, [zip_file])) == rows + rows
+
+def test_truncated_archive(tle_file, tmp_path, caplog, monkeypatch):
+    monkeypatch.setattr(tle, "DECOMPRESSION_BATCH_SIZE", 1024)
+    rows = list(tle.extract_rows(None, [tle_file]))
+    gzip_file = str(tmp_path / "tles.gz")
+    
+    with open(tle_file, "rb") as file, gzip.open(gzip_file, "wb") as archive:
+        archive.write(file.read())
+    
+    with open(gzip_file, "r+b") as file:
+        file.truncate(file.seek(0, 2) // 2)
+    
+    caplog.clear()
+    truncated_rows = list(tle.extract_rows(None, [gzip_file]))
+    
+    # The rows before the end of the data are kept.
+    assert 0 < len(truncated_rows) < len(rows)
+    assert truncated_rows == rows[:len(truncated_rows)]
+    assert log_messages(caplog, logging.ERROR)[-1].startswith(gzip_file + " is not a valid gzip file")
+
+class FailingFilter(tle.TLEFilter):
+    def accepts(self, line1, line2):
+        raise RuntimeError("bug")
+
+def test_archive_bugs_raised(tle_file, tmp_path):
+    gzip_file = str(tmp_path / "tles.gz")
+    
+    with open(tle_file, "rb") as file, gzip.open(gzip_file, "wb") as archive:
+        archive.write(file.read())
+    
+    # Only the errors of the decompression are caught.
+    with pytest.raises(RuntimeError):
+        list(tle.extract_rows(None, [gzip_file], tle_filter=FailingFilter(["mmot > 0"])))
+
+@pytest.mark.parametrize("columns", [None, ["epoch", "mmot"]])
+def test_profiled_extraction(tle_file, caplog, columns):
+    columns = tle.select_columns(columns) if columns else None
+    monitor = tle.ExtractionMonitor()
+    rows = list(tle.extract_rows(None, [tle_file], columns=columns, monitor=monitor))
+    messages = log_messages(caplog)
+    
+    profile = tle.ExtractionProfile()
+    profiled_monitor = tle.ExtractionMonitor(profile=profile)
+    
+    # The profile does not change the extraction.
+    assert list(tle.extract_rows(None, [tle_file], columns=columns, monitor=profiled_monitor)) == rows
+    assert log_messages(caplog) == messages
+    assert profiled_monitor.progress() == monitor.progress()
+    
+    progress = monitor.progress()
+    stages = profile.files[tle_file]["stages"]
+    
+    assert stages["read"][1] == progress.accepted + progress.rejected
+    assert stages["checksum"][1] <= stages["format"][1] == progress.accepted + progress.rejected
+    assert stages["decode"][1] == len(rows)
+    assert stages["epoch"][1] == (len(rows) if columns is None else 0)
+    assert sum(profile.files[tle_file]["rejections"].values()) >= progress.rejected > 0
+
+@pytest.mark.parametrize("operator_str, compare", [("<", operator.lt), ("<=", operator.le), ("=", operator.eq), ("!=", operator.ne), (">=", operator.ge), (">", operator.gt)])
+def test_filter_operators(tle_file, operator_str, compare):
+    rows = list(tle.extract_rows(None, [tle_file]))
+    mmot = sorted(row.mmot for row in rows)[len(rows) // 2]
+    tle_filter = tle.TLEFilter(["mmot " + operator_str + " " + repr(mmot)])
+    
+    assert list(tle.extract_rows(None, [tle_file], tle_filter=tle_filter)) == [row for row in rows if compare(row.mmot, mmot)]
+
+def test_filter_designators(tle_file):
+    rows = list(tle.extract_rows(None, [tle_file]))
+    cospar = rows[0].cospar
+    
+    # The designators are compared in upper case.
+    assert list(tle.extract_rows(None, [tle_file], tle_filter=tle.TLEFilter(["cospar = " + cospar.lower()]))) == [row for row in rows if row.cospar == cospar]
+    assert list(tle.extract_rows(None, [tle_file], tle_filter=tle.TLEFilter(["cospar != " + cospar]))) == [row for row in rows if row.cospar != cospar]
+    assert list(tle.extract_rows(None, [tle_file], tle_filter=tle.TLEFilter(["cospar ^= " + cospar[:2]]))) == [row for row in rows if row.cospar.startswith(cospar[:2])]
+    
+    # All the conditions must be met.
+    tle_filter = tle.TLEFilter(["cospar ^= " + cospar[:2], "inclin > 90"])
+    
+    assert str(tle_filter) == "cospar ^= " + cospar[:2] + ", inclin > 90"
+    assert list(tle.extract_rows(None, [tle_file], tle_filter=tle_filter)) == [row for row in rows if row.cospar.startswith(cospar[:2]) and row.inclin > 90]
+
+def test_filter_epoch_bounds(tle_file):
+    rows = list(tle.extract_rows(None, [tle_file], precise_epoch=True))
+    epochs = sorted(datetime.datetime.fromisoformat(row.epoch) for row in rows)
+    date = epochs[len(epochs) // 2].date()
+    bound = datetime.datetime.combine(date, datetime.time())
+    
+    after = list(tle.extract_rows(None, [tle_file], precise_epoch=True, tle_filter=tle.TLEFilter(["epoch >= " + str(date)])))
+    before = list(tle.extract_rows(None, [tle_file], precise_epoch=True, tle_filter=tle.TLEFilter(["epoch < " + str(bound)])))
+    
+    assert after == [row for row in rows if datetime.datetime.fromisoformat(row.epoch) >= bound]
+    assert before == [row for row in rows if datetime.datetime.fromisoformat(row.epoch) < bound]
+    
+    # A bound with a time zone is converted to UTC.
+    assert tle.TLEFilter.epoch_bound(str(date) + "T02:30:00+02:30") == tle.TLEFilter.epoch_bound(str(date))
+    assert tle.TLEFilter.epoch_bound("2014-01-01 12:00:00") == 2014001.5
+
+@pytest.mark.parametrize("expression", ["mmot", "orbit > 1", "mmot ^= 1", "cospar < 98", "mmot > fast", "epoch > yesterday"])
+def test_invalid_filter(expression):
+    with pytest.raises(ValueError):
+        tle.TLEFilter([expression])
+
+def test_select_columns():
+    assert tle.select_columns("epoch, mmot bstar,epoch") == ["epoch", "mmot", "bstar"]
+    assert tle.decoded_columns(["mmot", "epoch"], per_satellite=True) == ("cospar", "epoch", "mmot")
+    assert tle.decoded_columns(["mmot"], ordered=True) == ("satnum", "epoch", "eltnum", "mmot")
+    
+    with pytest.raises(ValueError):
+        tle.select_columns(["epoch", "speed"])
+    
+    with pytest.raises(ValueError):
+        tle.select_columns(" , ")
+
+@pytest.mark.parametrize("options", [{}, {"sort": True}, {"per_satellite": True}])
+def test_projected_output(tle_file, tmp_path, options):
+    cospar = {row.cospar for row in itertools.islice(tle.extract_rows(None, [tle_file]), 3)}
+    columns = ["mmot", "epoch", "satnum"]
+    full_file = str(tmp_path / "full.csv")
+    output_file = str(tmp_path / "projected.csv")
+    
+    tle.data_extract(cospar, [tle_file], full_file, **options)
+    tle.data_extract(cospar, [tle_file], output_file, columns=columns, **options)
+    
+    if options.get("per_satellite"):
+        full_files = [tle.satellite_output_file(full_file, designator) for designator in sorted(cospar)]
+        output_files = [tle.satellite_output_file(output_file, designator) for designator in sorted(cospar)]
+    else:
+        full_files = [full_file]
+        output_files = [output_file]
+    
+    # The columns are written in the given order, with the values of the full
+    # extraction.
+    indices = [tle.CSV_KEYS.index(column) for column in columns]
+    
+    for full_file, output_file in zip(full_files, output_files):
+        assert read_csv(output_file) == [[row[index] for index in indices] for row in read_csv(full_file)]
+
+def test_record_cache(tle_file, caplog):
+    rows = list(tle.extract_rows(None, [tle_file]))
+    messages = log_messages(caplog)
+    cache = tle.RecordCache()
+    
+    # The second extraction takes the file from the cache.
+    assert list(tle.extract_rows(None, [tle_file], cache=cache)) == rows
+    assert log_messages(caplog) == messages
+    assert list(tle.extract_rows(None, [tle_file], cache=cache)) == rows
+    assert log_messages(caplog) == messages
+    assert (cache.hits, cache.misses) == (1, 1)
+    
+    cospar = rows[0].cospar
+    columns = tle.select_columns(["epoch"])
+    assert list(tle.extract_rows(cospar, [tle_file], columns=columns, cache=cache)) == list(tle.extract_rows(cospar, [tle_file], columns=columns))
+    assert cache.hits == 2
+    
+    # A file which changed is read again.
+    with open(tle_file, "a") as file:
+        file.write("\n".join(benchmark.generate_tle(random.Random(3))) + "\n")
+    
+    assert len(list(tle.extract_rows(None, [tle_file], cache=cache))) == len(rows) + 1
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_record_cache_options(tle_file, caplog):
+    rows = list(tle.extract_rows(None, [tle_file]))
+    messages = log_messages(caplog)
+    cospar = rows[0].cospar
+    cache = tle.RecordCache()
+    
+    # A file which is not kept is read through its index, and is not kept.
+    indexed_rows = list(tle.extract_rows(cospar, [tle_file], use_index=True))
+    
+    assert list(tle.extract_rows(cospar, [tle_file], use_index=True, cache=cache)) == indexed_rows
+    assert (cache.misses, cache.size) == (1, 0)
+    
+    # A file too large to be kept is extracted by the workers.
+    cache = tle.RecordCache(budget=0)
+    caplog.clear()
+    
+    assert list(tle.extract_rows(None, [tle_file], workers=2, chunk_size=2048, cache=cache)) == rows
+    assert log_messages(caplog) == messages
+    assert cache.size == 0
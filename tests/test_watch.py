@@ -0,0 +1,104 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Tests of the watch of the directories, see :mod:`watch`."""
+
+import asyncio
+import csv
+import os
+import shutil
+import time
+
+import benchmark
+import tle
+import watch
+
+def read_csv(output_file):
+    with open(output_file, newline="") as file:
+        return list(csv.reader(file))
+
+def watched(watcher, condition, timeout=30):
+    """Runs the watcher until the condition is met."""
+    
+    async def run():
+        task = asyncio.ensure_future(watcher.run())
+        deadline = time.monotonic() + timeout
+        
+        while not condition() and time.monotonic() < deadline and not task.done():
+            await asyncio.sleep(0.02)
+        
+        watcher.stop()
+        await task
+    
+    asyncio.run(run())
+    
+    assert condition()
+
+def test_scan(tmp_path):
+    names = ["tles.txt", "other.tle", ".hidden.txt", "tles.txt" + tle.INDEX_SUFFIX, "output.csv" + tle.STATE_SUFFIX, "output.csv"]
+    
+    for name in names:
+        (tmp_path / name).write_text("")
+    
+    (tmp_path / "subdirectory").mkdir()
+    
+    assert sorted(os.path.basename(path) for path in watch.scan([str(tmp_path)])) == ["other.tle", "tles.txt"]
+    assert list(watch.scan([str(tmp_path)], "*.txt")) == [str(tmp_path / "tles.txt")]
+
+def test_watch(tle_file, tmp_path):
+    feed = tmp_path / "feed"
+    feed.mkdir()
+    output_file = str(tmp_path / "watched.csv")
+    watcher = watch.DirectoryWatcher(None, [str(feed)], output_file, interval=0.02)
+    
+    first_file = str(feed / "first.txt")
+    shutil.copy(tle_file, first_file)
+    watched(watcher, lambda: first_file in watcher.state["files"])
+    
+    expected_file = str(tmp_path / "expected.csv")
+    tle.data_extract(None, [first_file], expected_file)
+    
+    assert read_csv(output_file) == read_csv(expected_file)
+    
+    # The rows of a new file are appended, the file already extracted is not
+    # read again.
+    second_file = str(feed / "second.txt")
+    benchmark.generate_file(second_file, 100, seed=2)
+    
+    watcher = watch.DirectoryWatcher(None, [str(feed)], output_file, interval=0.02)
+    watched(watcher, lambda: second_file in watcher.state["files"])
+    tle.data_extract(None, [first_file, second_file], expected_file)
+    
+    assert read_csv(output_file) == read_csv(expected_file)
+    
+    # An incremental extraction can follow the watch.
+    assert tle.data_extract(None, [first_file, second_file], output_file, incremental=True) is False
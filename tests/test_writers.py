@@ -0,0 +1,183 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+"""Tests of the output files, see :mod:`writers`."""
+
+import csv
+import os
+
+import pytest
+
+import tle
+import writers
+
+READERS = {"binary": writers.read_binary, "npz": writers.read_npz, "parquet": writers.read_parquet, "feather": writers.read_feather}
+
+EXTENSIONS = {"binary": ".bin", "npz": ".npz", "parquet": ".parquet", "feather": ".feather"}
+
+def expected_values(rows, columns=None):
+    """Returns the values of the rows as read from the binary formats, see :func:`writers.read_binary`."""
+    
+    values = {}
+    
+    for name, kind, typecode in writers.SCHEMA:
+        if columns is not None and name not in columns:
+            continue
+        
+        if kind == writers.CATEGORY:
+            values[name] = [getattr(row, name) for row in rows]
+        elif kind == writers.TIMESTAMP:
+            values[name] = [writers.epoch_timestamp(row.epoch) for row in rows]
+        elif typecode == "d":
+            values[name] = [float(getattr(row, name)) for row in rows]
+        else:
+            values[name] = [int(getattr(row, name)) for row in rows]
+    
+    return values
+
+def read_values(output_file, file_format):
+    return {name: list(values) for name, values in READERS[file_format](output_file).items()}
+
+@pytest.fixture
+def rows(tle_file):
+    return list(tle.extract_rows(None, [tle_file]))
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    """Writes the rows by blocks of a few rows, so that the files have many blocks."""
+    
+    monkeypatch.setattr(writers, "BLOCK_ROWS", 64)
+
+def test_csv(rows, tmp_path):
+    output_file = str(tmp_path / "rows.csv")
+    
+    with writers.open_writer(output_file) as writer:
+        writer.write_rows(rows[:100])
+    
+    with writers.open_writer(output_file, append=True) as writer:
+        writer.write_rows(rows[100:])
+    
+    with open(output_file, newline="") as file:
+        assert list(csv.reader(file)) == [tle.CSV_HEADER] + [[str(value) for value in row] for row in rows]
+
+def test_csv_append_columns(rows, tmp_path):
+    output_file = str(tmp_path / "rows.csv")
+    
+    with writers.open_writer(output_file, columns=["epoch", "satnum"]) as writer:
+        writer.write_rows(rows[:100])
+    
+    # The same columns in another order are written in the order of the file.
+    with writers.open_writer(output_file, append=True, columns=["satnum", "epoch"]) as writer:
+        writer.write_rows(rows[100:])
+    
+    with open(output_file, newline="") as file:
+        assert list(csv.reader(file)) == [["Epoch time", "Satellite number"]] + [[row.epoch, row.satnum] for row in rows]
+    
+    with pytest.raises(ValueError):
+        writers.open_writer(output_file, append=True, columns=["epoch", "satnum", "mmot"])
+    
+    with pytest.raises(ValueError):
+        writers.open_writer(output_file, append=True)
+
+@pytest.mark.parametrize("file_format", sorted(READERS))
+@pytest.mark.parametrize("columns", [None, ["epoch", "satnum", "mmot", "name"]])
+def test_binary_formats(rows, tmp_path, file_format, columns):
+    if file_format != "binary":
+        pytest.importorskip("numpy" if file_format == "npz" else "pyarrow")
+    
+    output_file = str(tmp_path / ("rows" + EXTENSIONS[file_format]))
+    
+    with writers.open_writer(output_file, columns=columns) as writer:
+        writer.write_rows(rows)
+    
+    assert read_values(output_file, file_format) == expected_values(rows, columns)
+
+@pytest.mark.parametrize("file_format", sorted(READERS))
+def test_empty_file(tmp_path, file_format):
+    if file_format != "binary":
+        pytest.importorskip("numpy" if file_format == "npz" else "pyarrow")
+    
+    output_file = str(tmp_path / ("rows" + EXTENSIONS[file_format]))
+    writers.open_writer(output_file).close()
+    
+    assert read_values(output_file, file_format) == expected_values([])
+
+def test_binary_append(rows, tmp_path):
+    output_file = str(tmp_path / "rows.bin")
+    columns = ["satnum", "epoch", "name"]
+    
+    with writers.open_writer(output_file, columns=columns) as writer:
+        writer.write_rows(rows[:100])
+    
+    # The same columns in another order.
+    with writers.open_writer(output_file, append=True, columns=columns[::-1]) as writer:
+        writer.write_rows(rows[100:])
+    
+    assert read_values(output_file, "binary") == expected_values(rows, columns)
+    
+    with pytest.raises(ValueError):
+        writers.open_writer(output_file, append=True, columns=["satnum"])
+
+def test_binary_truncated_block(rows, tmp_path):
+    output_file = str(tmp_path / "rows.bin")
+    
+    with writers.open_writer(output_file) as writer:
+        writer.write_rows(rows[:100])
+    
+    size = os.path.getsize(output_file)
+    
+    with open(output_file, "ab") as file:
+        file.write(b"\x10\x00")
+    
+    with pytest.raises(ValueError):
+        writers.read_binary(output_file)
+    
+    # The incomplete block is dropped before appending.
+    with writers.open_writer(output_file, append=True) as writer:
+        writer.write_rows(rows[100:])
+    
+    assert os.path.getsize(output_file) > size
+    assert read_values(output_file, "binary") == expected_values(rows)
+
+@pytest.mark.parametrize("file_format", ["npz", "parquet", "feather"])
+def test_append_refused(rows, tmp_path, file_format):
+    pytest.importorskip("numpy" if file_format == "npz" else "pyarrow")
+    
+    output_file = str(tmp_path / ("rows" + EXTENSIONS[file_format]))
+    
+    with writers.open_writer(output_file) as writer:
+        writer.write_rows(rows)
+    
+    assert not writers.can_append(output_file)
+    
+    with pytest.raises(ValueError):
+        writers.open_writer(output_file, append=True)
@@ -32,14 +32,143 @@
 
 """This mdoule provides TLE data extraction tools."""
 
-from operator import xor
+from operator import xor, itemgetter, lt, le, eq, ne, ge, gt
 import re
+import os
+import sys
+import io
+import mmap
 import logging
-import csv
+import threading
 import datetime
+import time
+import collections
+import itertools
+import functools
+import contextlib
 
 logger = logging.getLogger("root")
 
+# Approximate size in bytes of the pieces large files are split into for the
+# parallel extraction.
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Column headers of the CSV output files.
+CSV_HEADER = ["Satellite number", "COSPAR", "Epoch time", "Mean motion dot dot", "Mean motion dot", "BSTAR", "Ephemeris type", "Element number", "Inclination", "RAAN", "Eccentricity", "Argument of perigee", "Mean anomaly", "Mean motion", "Epoch rev", "Name"]
+
+# Keys of the :func:`convert_tle` dictionary, in the order of the CSV columns.
+CSV_KEYS = ["satnum", "cospar", "epoch", "mmotd", "mmotdd", "bstar", "ephtype", "eltnum", "inclin", "raan", "eccentr", "argofper", "manomaly", "mmot", "epochrev", "name"]
+
+# Data of a TLE, as returned by :func:`decode_tle`. The fields are the keys of
+# the :func:`convert_tle` dictionary, in the order of the CSV columns. The name
+# of the satellite is empty for the TLEs without name line.
+TLERecord = collections.namedtuple("TLERecord", CSV_KEYS, defaults=[""])
+
+# Maximum length of the name lines of the 3LE files, with the "0 " prefix of
+# Space-Track. The longer lines are not taken as names, see :func:`frame_tles`.
+NAME_MAX_LENGTH = 26
+
+# Number of days (YYDDD) kept in the cache of :func:`epoch_day_to_date`.
+EPOCH_CACHE_SIZE = 4096
+
+MICROSECONDS_PER_DAY = 86400 * 10 ** 6
+
+# Marks the log records whose arguments are all line numbers, so that they
+# are numbered again when they come from a range of a file, see
+# :func:`_collect_range`.
+LINE_NUMBERS = {"line_numbers": True}
+
+# Number of TLEs between two progress reports, see :class:`ExtractionMonitor`.
+PROGRESS_INTERVAL = 10000
+
+# Default memory budget of a :class:`RecordCache`, in bytes, and approximate
+# memory used by a cached TLE besides the characters of its lines: the tuple,
+# the line numbers and the headers of the strings.
+RECORD_CACHE_BUDGET = 256 * 1024 * 1024
+CACHED_TLE_OVERHEAD = 280
+
+# State of an extraction, as given to the callback of :class:`ExtractionMonitor`.
+ExtractionProgress = collections.namedtuple("ExtractionProgress", ["files_done", "files_count", "bytes_read", "bytes_count", "accepted", "rejected"])
+
+# Number of rows sorted in memory before being written in a temporary file, and
+# maximum number of these files merged at once, see :func:`sorted_rows`.
+SORT_RUN_SIZE = 500000
+SORT_FAN_IN = 64
+
+# Number of rows pickled together in the temporary files of the sort.
+SORT_BATCH_SIZE = 10000
+
+# Suffix added to the name of an output file to get the name of the state of
+# its incremental extraction, see :func:`load_state`.
+STATE_SUFFIX = ".state"
+STATE_VERSION = 2
+
+# Size of the blocks at the beginning and at the end of the extracted part of a
+# file which are hashed to detect changes, see :func:`hash_content`.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# First bytes of the compressed files, see :func:`compression_format`.
+COMPRESSION_SIGNATURES = [(b"\x1f\x8b", "gzip"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz"), (b"PK\x03\x04", "zip")]
+
+# Approximate number of characters of the batches of lines decompressed ahead
+# of the extraction, and maximum number of batches waiting, see
+# :func:`archive_lines`.
+DECOMPRESSION_BATCH_SIZE = 1024 * 1024
+DECOMPRESSION_DEPTH = 8
+
+# Suffix added to the name of a TLE file to get the name of its index, see
+# :func:`load_index`. The version changes whenever the format of the index does.
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 2
+
+# Columns of the fields in the first line of a TLE.
+SATNUM = slice(2, 7)
+COSPAR = slice(9, 17)
+EPOCH = slice(18, 32)
+MMOTD = slice(33, 43)
+MMOTDD_MANTISSA = slice(45, 50)
+MMOTDD_EXPONENT = slice(50, 52)
+BSTAR_SIGN = slice(53, 54)
+BSTAR_MANTISSA = slice(54, 59)
+BSTAR_EXPONENT = slice(59, 61)
+EPHTYPE = slice(62, 63)
+ELTNUM = slice(64, 68)
+
+# Columns of the fields in the second line of a TLE.
+INCLIN = slice(8, 16)
+RAAN = slice(17, 25)
+ECCENTR = slice(26, 33)
+ARGOFPER = slice(34, 42)
+MANOMALY = slice(43, 51)
+MMOT = slice(52, 63)
+EPOCHREV = slice(63, 68)
+
+# Formats of the two TLE lines.
+# The regular expressions matches the TLE format from the begining of the
+# lines, that is, all the characters after the 69th character will be
+# ignored and do not count for the format nor the conversion.
+TLE_FORMAT = (r"^1 \d\d\d\d\d[U ] \d\d\d\d\d([A-Z]  |[A-Z][A-Z] |[A-Z][A-Z][A-Z]) \d\d\d\d\d\.\d\d\d\d\d\d\d\d [\+\- ]\.\d\d\d\d\d\d\d\d [\+\- ]\d\d\d\d\d[+-]\d [\+\- ]\d\d\d\d\d[\+\-]\d \d (\d\d\d\d| \d\d\d|  \d\d|   \d)\d", r"^2 \d\d\d\d\d (\d\d\d| \d\d|  \d)\.\d\d\d\d (\d\d\d| \d\d|  \d)\.\d\d\d\d \d\d\d\d\d\d\d (\d\d\d| \d\d|  \d)\.\d\d\d\d (\d\d\d| \d\d|  \d).\d\d\d\d \d\d\.\d\d\d\d\d\d\d\d(\d\d\d\d\d| \d\d\d\d|  \d\d\d|   \d\d|    \d)\d")
+
+# The regular expressions are compiled once and for all.
+TLE_REGEX = (re.compile(TLE_FORMAT[0], re.ASCII), re.compile(TLE_FORMAT[1], re.ASCII))
+
+# Value of each byte in the checksum: digits count for their value, minus signs
+# count for 1, any other character counts for 0.
+CHECKSUM_TABLE = bytes(byte - 48 if 48 <= byte <= 57 else 1 if byte == 45 else 0 for byte in range(256))
+
+# Results of :func:`validate_tle`, the errors are combined with a bitwise or.
+TLE_VALID = 0
+TLE_BAD_FORMAT = 1
+TLE_BAD_CHECKSUM1 = 2
+TLE_BAD_CHECKSUM2 = 4
+
+# Error of the TLEs whose lines belong to different satellites, which is found
+# after the validation, see :class:`ErrorSummary`.
+TLE_DIFFERENT_SATNUMS = 8
+
+# Error of the lines which do not fit in a TLE, see :func:`frame_tles`.
+TLE_INCOMPLETE = 16
+
 def check_format(line1, line2):
     """Checks whether the two lines correspond to the TLE format or not.
     
@@ -54,18 +183,25 @@ def check_format(line1, line2):
     ..warning:: This function checks only the format, not the content.
     """
     
-    # The regular expressions matches the TLE format from the begining of the
-    # lines, that is, all the characters after the 69th character will be
-    # ignored and do not count for the format nor the conversion.
-    tle_format = ("^1 \d\d\d\d\d[U ] \d\d\d\d\d([A-Z]  |[A-Z][A-Z] |[A-Z][A-Z][A-Z]) \d\d\d\d\d\.\d\d\d\d\d\d\d\d [\+\- ]\.\d\d\d\d\d\d\d\d [\+\- ]\d\d\d\d\d[+-]\d [\+\- ]\d\d\d\d\d[\+\-]\d \d (\d\d\d\d| \d\d\d|  \d\d|   \d)\d", "^2 \d\d\d\d\d (\d\d\d| \d\d|  \d)\.\d\d\d\d (\d\d\d| \d\d|  \d)\.\d\d\d\d \d\d\d\d\d\d\d (\d\d\d| \d\d|  \d)\.\d\d\d\d (\d\d\d| \d\d|  \d).\d\d\d\d \d\d\.\d\d\d\d\d\d\d\d(\d\d\d\d\d| \d\d\d\d|  \d\d\d|   \d\d|    \d)\d")
-    
-    tle_regex = (re.compile(tle_format[0], re.ASCII), re.compile(tle_format[1], re.ASCII))
-    
-    if tle_regex[0].match(line1) and tle_regex[1].match(line2):
+    if TLE_REGEX[0].match(line1) and TLE_REGEX[1].match(line2):
         return True
     else:
         return False
     
+def compute_checksum(line):
+    """Computes the checksum of the line, ignoring its last character.
+    
+    :param line: The TLE line.
+    :type line: str
+    :return: The checksum, between 0 and 9.
+    :rtype: int
+    
+    ..seealso:: :func:`check_integrity`
+    """
+    
+    # Non-ASCII characters are replaced by "?", which counts for 0.
+    return sum(line[0:-1].encode("ascii", "replace").translate(CHECKSUM_TABLE)) % 10
+    
 def check_integrity(line):
     """Checks the integrity of the line by recalculating the checksum.
     
@@ -84,27 +220,97 @@ def check_integrity(line):
     :return: True if the checksum is valid, else False.
     :rtype: bool
     
-    ..seealso:: :func:`check_format`.
+    ..seealso:: :func:`check_format`, :func:`compute_checksum`.
     """
     
-    checksum = 0
-    
-    for character in line[0:-1]:
-        if re.match("[0-9]", character):
-            checksum += int(character)
-        elif character == "-":
-            checksum += 1
-            
-    checksum = checksum % 10
+    checksum = compute_checksum(line)
     
-    logger.debug("Checksum: " + str(checksum) + " (calculated) / " + line[-1] + "(in the TLE).")
+    logger.debug("Checksum: %d (calculated) / %s (in the TLE).", checksum, line[-1])
     
     if int(line[-1]) == checksum:
         return True
     else:
         return False
 
-def epoch_to_datetime(epoch_str):
+def validate_tle(line1, line2):
+    """Checks the format and the checksums of a TLE at once.
+    
+    This gives the same results as :func:`check_format` and
+    :func:`check_integrity`, but the regular expressions are precompiled and
+    the checksum of each line is computed in a single pass with a translation
+    table, which makes it suitable for large files. The checksums are only
+    checked when the format is good.
+    
+    :param line1: First line of the TLE.
+    :type line1: str
+    :param line2: Second line of the TLE.
+    :type line2: str
+    :return: :data:`TLE_VALID`, or the combination of :data:`TLE_BAD_FORMAT`, :data:`TLE_BAD_CHECKSUM1` and :data:`TLE_BAD_CHECKSUM2`.
+    :rtype: int
+    
+    ..note:: A line whose last character is not a digit fails the checksum verification.
+    """
+    
+    if not (TLE_REGEX[0].match(line1) and TLE_REGEX[1].match(line2)):
+        return TLE_BAD_FORMAT
+    
+    return _checksum_errors(line1, line2)
+
+def _checksum_errors(line1, line2):
+    """Checks the checksums of a well formatted TLE, see :func:`validate_tle`."""
+    
+    result = TLE_VALID
+    
+    if not _checksum_matches(line1):
+        result |= TLE_BAD_CHECKSUM1
+    
+    if not _checksum_matches(line2):
+        result |= TLE_BAD_CHECKSUM2
+    
+    return result
+
+def _checksum_matches(line):
+    """Checks the checksum of the line like :func:`check_integrity`, without logging."""
+    
+    checksum = compute_checksum(line)
+    last_character = line[-1]
+    
+    # Non-digit characters would make int() fail.
+    return last_character.isdecimal() and int(last_character) == checksum
+
+@functools.lru_cache(maxsize=EPOCH_CACHE_SIZE)
+def epoch_day_to_date(epoch_day):
+    """Converts the year and day part of an epoch to a date.
+    
+    The results are cached, since the TLEs of a file usually share a few days.
+    
+    :param epoch_day: The first five characters of the epoch (YYDDD).
+    :type epoch_day: str
+    :return: Tuple of the date and its string (YYYY-MM-DD).
+    :rtype: tuple
+    :raise ValueError: If the day is not between 1 and 366.
+    
+    ..seealso:: :func:`epoch_to_datetime`
+    """
+    
+    epoch_year = int(epoch_day[0:2])
+    day = int(epoch_day[2:5])
+    
+    if epoch_year < 57:
+        year = 2000 + epoch_year
+    else:
+        year = 1900 + epoch_year
+    
+    if not 1 <= day <= 366:
+        raise ValueError("Invalid day in the epoch " + epoch_day + ".")
+    
+    # Like with strptime(), the day 366 of a non-leap year is the 1st of
+    # january of the next year.
+    date = datetime.date.fromordinal(datetime.date(year, 1, 1).toordinal() + day - 1)
+    
+    return date, date.isoformat()
+
+def epoch_to_datetime(epoch_str, precise=False):
     """Converts the epoch string to a standardized datetime string.
     
     Epoch format: YYDDD.FFFFFFFF
@@ -112,33 +318,110 @@ def epoch_to_datetime(epoch_str):
     * DDD: number of the day in the year (1st jan. = 1)
     * FFFFFFFF: decimal part of the fraction of the day (noon = 0.5)
     
+    By default, the seconds are truncated (and the last digit of the fraction
+    is ignored). In precise mode, the whole fraction is rounded to the nearest
+    microsecond with integer arithmetic, carrying over to the next day if needed.
+    
     :param epoch_str: The epoch string.
     :type epoch_str: str
-    :return: Standard date string (YYYY-MM-DD hh:mm:ss).
+    :param precise: Whether to keep the microseconds.
+    :type precise: bool
+    :return: Standard date string (YYYY-MM-DD hh:mm:ss, or YYYY-MM-DD hh:mm:ss.ffffff in precise mode).
     :rtype: str
+    :raise ValueError: If the day is not between 1 and 366.
     """
     
-    epoch_year = epoch_str[0:2]
-    epoch_day = epoch_str[2:5]
-    epoch_dayfrac = float("0" + epoch_str[5:-1])
+    date, date_str = epoch_day_to_date(epoch_str[0:5])
     
-    if int(epoch_year) < 57:
-        epoch_year = "20" + epoch_year
-    else:
-        epoch_year = "19" + epoch_year
+    if precise:
+        fraction = epoch_str[6:]
+        scale = 10 ** len(fraction)
+        microseconds = (2 * int(fraction) * MICROSECONDS_PER_DAY + scale) // (2 * scale)
         
-    date = datetime.datetime.strptime(epoch_year + " " + epoch_day, "%Y %j")
+        epoch = datetime.datetime.combine(date, datetime.time()) + datetime.timedelta(microseconds=microseconds)
+        
+        return epoch.strftime("%Y-%m-%d %H:%M:%S.%f")
+    
+    epoch_dayfrac = float("0" + epoch_str[5:-1])
     
     epoch_hour = 24 * epoch_dayfrac
     epoch_minute = 60 * (epoch_hour - int(epoch_hour))
     epoch_second = 60 * (epoch_minute - int(epoch_minute))
     
-    epoch_hour = int(epoch_hour)
-    epoch_minute = int(epoch_minute)
-    epoch_second = int(epoch_second)
-        
-    return date.strftime("%Y-%m-%d") + " {hour}:{min}:{sec}".format(hour=epoch_hour, min=epoch_minute, sec=epoch_second)
+    return "%s %d:%d:%d" % (date_str, epoch_hour, epoch_minute, epoch_second)
+    
+def decode_tle(line1, line2, precise_epoch=False, name=""):
+    """Decodes the TLE lines into a :class:`TLERecord`.
+    
+    This is the fast version of :func:`convert_tle`: the fields are read
+    directly from their fixed columns and stored in a tuple instead of a
+    dictionary.
+    
+    :param line1: The first TLE line.
+    :type line1: str
+    :param line2: The second TLE line.
+    :type line2: str
+    :param precise_epoch: Whether to keep the microseconds of the epoch, see :func:`epoch_to_datetime`.
+    :type precise_epoch: bool
+    :param name: Name of the satellite, from the name line of a 3LE file.
+    :type name: str
+    :return: The data of the TLE, None if the lines belong to different satellites.
+    :rtype: TLERecord
+    
+    ..warning:: The TLE must be valid, see :func:`validate_tle`.
+    """
+    
+    # When the satellite number is different in the two lines, it means that the
+    # given TLE is made from two lines from different satellites.
+    if line1[SATNUM] != line2[SATNUM]:
+        return None
+    
+    return _tle_record(line1, line2, epoch_to_datetime(line1[EPOCH], precise_epoch), name)
+
+def _tle_record(line1, line2, epoch, name=""):
+    """Builds the :class:`TLERecord` of the lines of a TLE, whose epoch is already converted.
+    
+    ..seealso:: :func:`decode_tle`
+    """
+    
+    satnum = line1[SATNUM]
+    
+    if line1[7] == "U":
+        satnum += "U"
+    
+    # float() and int() ignore the spaces around the numbers, so only the
+    # fields kept as strings need to be stripped.
+    return TLERecord(
+        satnum,
+        line1[COSPAR].strip(),
+        epoch,
+        float(line1[MMOTD]),
+        float(line1[45] + "0." + line1[MMOTDD_MANTISSA] + "E" + line1[MMOTDD_EXPONENT]),
+        float(line1[BSTAR_SIGN] + "0." + line1[BSTAR_MANTISSA] + "E" + line1[BSTAR_EXPONENT]),
+        int(line1[EPHTYPE]),
+        line1[ELTNUM].strip(),
+        float(line2[INCLIN]),
+        float(line2[RAAN]),
+        float("0." + line2[ECCENTR]),
+        float(line2[ARGOFPER]),
+        float(line2[MANOMALY]),
+        float(line2[MMOT]),
+        int(line2[EPOCHREV]),
+        name)
+
+def decode_tles(tles):
+    """Decodes many TLEs at once.
+    
+    :param tles: Iterable of ``(line1, line2)`` tuples.
+    :type tles: iterable
+    :return: List of :class:`TLERecord`, with None for the TLEs whose lines belong to different satellites.
+    :rtype: list
     
+    ..seealso:: :func:`decode_tle`
+    """
+    
+    return list(itertools.starmap(decode_tle, tles))
+
 def convert_tle(line1, line2):
     """Converts the TLE lines in a single dictionary.
     
@@ -161,164 +444,2920 @@ def convert_tle(line1, line2):
     manomal   Mean anomaly
     mmot      Mean motion
     epochrev  Epoch revolution
+    name      Name of the satellite, empty without name line
     ========  =============================================
     
     :param line1: The first TLE line.
     :type line1: str
     :param line2: The second TLE line.
     :type line2: str
-    :return: Dictionary of data strored in the ``line1`` and ``line2``.
+    :return: Dictionary of data strored in the ``line1`` and ``line2``, None if the lines belong to different satellites.
     :rtype: dict
     
     ..warning:: The tle specifed in line1 and line2 must be valid.
     ..note:: This functions checks if the two lines belongs to the same satellite. The 
+    ..seealso:: :func:`decode_tle`, which returns a lighter :class:`TLERecord`.
     """
     
-    tle_data = {}
+    tle_record = decode_tle(line1, line2)
     
-    # When the satellite number is different in the two lines, it means that the
-    # given TLE is made from two lines from different satellites.
-    if line1[2:7] == line2[2:7]:
-        tle_data["satnum"] = line1[2:7]
-        
-        if line1[7] == "U":
-            tle_data["satnum"] += "U"
-            
-        tle_data["cospar"] = line1[9:17].strip()
-        logger.debug(line1[9:17].strip())
-        tle_data["epoch"] = epoch_to_datetime(line1[18:32].strip())
-        tle_data["mmotd"] = float(line1[33:43].strip())
-        tle_data["mmotdd"] = float(line1[45].strip() + "0." + line1[45:50].strip() + "E" + line1[50:52])
-        tle_data["bstar"] = float(line1[53].strip() + "0." + line1[54:59].strip() + "E" + line1[59:61])
-        tle_data["ephtype"] = int(line1[62])
-        tle_data["eltnum"] = line1[64:68].strip()
-        tle_data["inclin"] = float(line2[8:16].strip())
-        tle_data["raan"] = float(line2[17:25].strip())
-        tle_data["eccentr"] = float("0." + line2[26:33].strip())
-        tle_data["argofper"] = float(line2[34:42].strip())
-        tle_data["manomaly"] = float(line2[43:51].strip())
-        tle_data["mmot"] = float(line2[52:63].strip())
-        tle_data["epochrev"] = int(line2[63:68].strip())
-        
-        return tle_data
-    else:
+    if tle_record is None:
         return None
+    else:
+        return tle_record._asdict()
 
-def data_extract(cospar, tle_files, output_file):
-    """Extracts orbital parameters for the given satellite from the given files.
+def split_designators(text):
+    """Splits a list of designators written in a text.
     
-    The function looks into the TLE files in order to find the TLEs of the
-    satellite. Each found TLE is converted and the values are stored into a
-    CSV file.
+    The designators are separated by commas, spaces or line breaks, and are
+    converted to upper case. Everything after a "#" on a line is ignored.
     
-    The TLE files must be formatted like this:
+    :param text: The text, for instance "98067A, 90037B".
+    :type text: str
+    :return: List of the designators, in the order of the text.
+    :rtype: list
+    """
     
-        1 00005U 58002B   14001.18782563  .00000040  00000-0  40921-4 0  1802
-        2 00005 034.2515 294.1619 1849340 178.4613 182.2758 10.84381573949160
-        1 00011U 59001A   14001.49929578  .00000254  00000-0  11590-3 0   627
-        2 00011 032.8774 265.3546 1476296 264.4994 078.6020 11.84019141336756
-        1 00012U 59001B   14001.15043527  .00000935  00000-0  54042-3 0  7398
-        2 00012 032.9115 320.5248 1673017 279.4922 062.1207 11.42639539252314
+    designators = []
     
-    :param cospar: International or COSPAR designator / NSSDC ID.
+    for line in text.splitlines():
+        designators.extend(line.split("#", 1)[0].replace(",", " ").upper().split())
+    
+    return designators
+
+def load_designators(filename):
+    """Reads a list of designators from a file, see :func:`split_designators`.
+    
+    :param filename: Path of the file.
+    :type filename: str
+    :return: List of the designators.
+    :rtype: list
+    :raise FileNotFoundError: If the file does not exist.
+    """
+    
+    with open(filename, "r", encoding="utf-8-sig") as file:
+        return split_designators(file.read())
+
+def designator_set(cospar):
+    """Builds the set of the designators to extract.
+    
+    :param cospar: A designator, an iterable of designators, or None for all satellites.
     :type cospar: str
-    :param tle_files: List of TLE filenames and paths.
-    :type tle_files: list
-    :param output_file: path and filename of the CSV output file.
-    :type output_file: str
+    :return: The set of designators, or None for all satellites.
+    :rtype: frozenset
+    """
     
-    ..warning:: No blank lines before or in the middle of the files, no titles on the top of the TLEs.
-    ..note:: When there is a problem at a certain TLE, this TLE is skipped.
-    ..seealso:: :func:`convert_tle`
+    if cospar is None:
+        return None
+    elif isinstance(cospar, str):
+        return frozenset([cospar])
+    else:
+        return frozenset(cospar)
+
+def _raw_epoch(line1, line2):
+    """Reads the epoch of a TLE as a number which can be compared, see :meth:`TLEFilter.epoch_bound`.
+    
+    The number is the year times 1000 plus the day of the year with its
+    fraction, such as 2014001.5 for the 1st of january 2014 at noon.
     """
-    if cospar is not None:
-        logger.info("Extracting data for " + cospar + ".")
+    
+    epoch_str = line1[EPOCH]
+    epoch_year = int(epoch_str[0:2])
+    
+    if epoch_year < 57:
+        return (2000 + epoch_year) * 1000 + float(epoch_str[2:])
     else:
-        logger.info("Extracting all data in files:\n" + "\n".join(["\t" + file for file in tle_files]))
+        return (1900 + epoch_year) * 1000 + float(epoch_str[2:])
+
+def _raw_satnum(line1, line2):
+    return int(line1[SATNUM])
+
+def _raw_cospar(line1, line2):
+    return line1[COSPAR].strip()
+
+def _raw_mmotd(line1, line2):
+    return float(line1[MMOTD])
+
+def _raw_mmotdd(line1, line2):
+    return float(line1[45] + "0." + line1[MMOTDD_MANTISSA] + "E" + line1[MMOTDD_EXPONENT])
+
+def _raw_bstar(line1, line2):
+    return float(line1[BSTAR_SIGN] + "0." + line1[BSTAR_MANTISSA] + "E" + line1[BSTAR_EXPONENT])
+
+def _raw_ephtype(line1, line2):
+    return int(line1[EPHTYPE])
+
+def _raw_eltnum(line1, line2):
+    return int(line1[ELTNUM])
+
+def _raw_inclin(line1, line2):
+    return float(line2[INCLIN])
+
+def _raw_raan(line1, line2):
+    return float(line2[RAAN])
+
+def _raw_eccentr(line1, line2):
+    return float("0." + line2[ECCENTR])
+
+def _raw_argofper(line1, line2):
+    return float(line2[ARGOFPER])
+
+def _raw_manomaly(line1, line2):
+    return float(line2[MANOMALY])
+
+def _raw_mmot(line1, line2):
+    return float(line2[MMOT])
+
+def _raw_epochrev(line1, line2):
+    return int(line2[EPOCHREV])
+
+def _has_prefix(value, prefix):
+    return value.startswith(prefix)
+
+class TLEFilter:
+    """Conditions on the fields of the TLEs, checked on the columns of the lines before the TLEs are decoded.
+    
+    Each condition is written ``field operator value``, for instance
+    ``mmot > 11`` for the low orbits, ``epoch >= 2014-01-01`` or
+    ``cospar ^= 98`` for the satellites launched in 1998. The fields are named
+    like the keys of :func:`convert_tle`, the operators are ``<``, ``<=``,
+    ``=``, ``!=``, ``>=`` and ``>``, and ``^=`` tells that the designator
+    starts with the value. The epochs are given as YYYY-MM-DD or
+    YYYY-MM-DD hh:mm:ss. A TLE is kept when it meets all the conditions.
+    
+    Only the fields of the conditions are read, so a rejected TLE costs a few
+    conversions instead of a whole :func:`decode_tle`.
     
-    # Initialization of the resulting array of values with the column headers.
-    extracted_data = [["Satellite number", "COSPAR", "Epoch time", "Mean motion dot dot", "Mean motion dot", "BSTAR", "Ephemeris type", "Element number", "Inclination", "RAAN", "Eccentricity", "Argument of perigee", "Mean anomaly", "Mean motion", "Epoch rev"]]
+    :param expressions: The conditions.
+    :type expressions: list
+    :raise ValueError: If a condition is invalid.
+    
+    ..note:: The filter can be pickled, so that it is sent to the worker processes.
+    """
+    
+    # Reader of the raw value of each field.
+    FIELDS = {
+        "epoch": _raw_epoch,
+        "satnum": _raw_satnum,
+        "cospar": _raw_cospar,
+        "mmotd": _raw_mmotd,
+        "mmotdd": _raw_mmotdd,
+        "bstar": _raw_bstar,
+        "ephtype": _raw_ephtype,
+        "eltnum": _raw_eltnum,
+        "inclin": _raw_inclin,
+        "raan": _raw_raan,
+        "eccentr": _raw_eccentr,
+        "argofper": _raw_argofper,
+        "manomaly": _raw_manomaly,
+        "mmot": _raw_mmot,
+        "epochrev": _raw_epochrev}
+    
+    OPERATORS = {"<": lt, "<=": le, "=": eq, "!=": ne, ">=": ge, ">": gt, "^=": _has_prefix}
+    
+    # The longest operators come first, so that "<=" is not read as "<".
+    EXPRESSION_REGEX = re.compile(r"^\s*([a-z]+)\s*(<=|>=|!=|\^=|=|<|>)\s*(.+?)\s*$")
+    
+    def __init__(self, expressions):
+        self.expressions = []
+        self.checks = []
+        
+        for expression in expressions:
+            match = self.EXPRESSION_REGEX.match(expression)
+            
+            if match is None:
+                raise ValueError("Invalid filter " + expression + ".")
+            
+            field, operator_str, value_str = match.groups()
+            
+            if field not in self.FIELDS:
+                raise ValueError("Unknown field " + field + " in the filter " + expression + ".")
+            
+            # The designators are only compared as strings, and only them.
+            if (field == "cospar") != (operator_str in ("=", "!=", "^=")) and operator_str not in ("=", "!="):
+                raise ValueError("The operator " + operator_str + " can not be used on " + field + ".")
+            
+            if field == "epoch":
+                value = self.epoch_bound(value_str)
+            elif field == "cospar":
+                value = value_str.upper()
+            else:
+                try:
+                    value = float(value_str)
+                except ValueError:
+                    raise ValueError("Invalid number " + value_str + " in the filter " + expression + ".") from None
+            
+            self.expressions.append(field + " " + operator_str + " " + value_str)
+            self.checks.append((self.FIELDS[field], self.OPERATORS[operator_str], value))
+    
+    def __str__(self):
+        return ", ".join(self.expressions)
+    
+    @staticmethod
+    def epoch_bound(epoch):
+        """Converts a date to the number returned by :func:`_raw_epoch` for the TLEs of this date.
+        
+        :param epoch: The date, YYYY-MM-DD or YYYY-MM-DD hh:mm:ss, in UTC unless followed by a UTC offset.
+        :type epoch: str
+        :return: The year times 1000 plus the day of the year with its fraction.
+        :rtype: float
+        :raise ValueError: If the date is invalid.
+        """
         
-    for tle_file in tle_files:
-        logger.debug("Opening " + tle_file + ".")
         try:
-            file = open(tle_file, "r")
-            lines = file.readlines()
-            file.close()
-        except FileNotFoundError:
-            logger.error("Unable to find " + tle_file + ".")
-            continue
-        else:
-            logger.debug("Successfuly loaded the file.")
+            date = datetime.datetime.fromisoformat(epoch)
+        except ValueError:
+            raise ValueError("Invalid epoch " + epoch + " in the filter.") from None
+        
+        # The epochs of the TLEs are in UTC.
+        if date.tzinfo is not None:
+            date = date.astimezone(datetime.timezone.utc)
+        
+        microseconds = (date.hour * 3600 + date.minute * 60 + date.second) * 10 ** 6 + date.microsecond
+        
+        return date.year * 1000 + date.timetuple().tm_yday + microseconds / MICROSECONDS_PER_DAY
+    
+    def accepts(self, line1, line2):
+        """Tells whether the TLE meets all the conditions.
+        
+        ..warning:: The TLE must be valid, see :func:`validate_tle`.
+        """
+        
+        for read, compare, value in self.checks:
+            if not compare(read(line1, line2), value):
+                return False
+        
+        return True
+
+def _decoded_satnum(line1, line2):
+    if line1[7] == "U":
+        return line1[SATNUM] + "U"
+    else:
+        return line1[SATNUM]
+
+def _decoded_eltnum(line1, line2):
+    return line1[ELTNUM].strip()
+
+# Decoder of each field of :class:`TLERecord`, as in :func:`_tle_record`,
+# except the epoch and the name, see :func:`column_decoder`.
+COLUMN_DECODERS = {
+    "satnum": _decoded_satnum,
+    "cospar": _raw_cospar,
+    "mmotd": _raw_mmotd,
+    "mmotdd": _raw_mmotdd,
+    "bstar": _raw_bstar,
+    "ephtype": _raw_ephtype,
+    "eltnum": _decoded_eltnum,
+    "inclin": _raw_inclin,
+    "raan": _raw_raan,
+    "eccentr": _raw_eccentr,
+    "argofper": _raw_argofper,
+    "manomaly": _raw_manomaly,
+    "mmot": _raw_mmot,
+    "epochrev": _raw_epochrev}
+
+def select_columns(columns):
+    """Checks a selection of columns of the output files.
+    
+    :param columns: Keys of the columns (see :data:`CSV_KEYS`), or a text listing them separated by commas or spaces, such as "epoch, mmot, bstar".
+    :type columns: list
+    :return: The keys, in the given order, without duplicates.
+    :rtype: list
+    :raise ValueError: If a key is unknown or if there is no column.
+    """
+    
+    if isinstance(columns, str):
+        columns = columns.replace(",", " ").split()
+    
+    selection = []
+    
+    for column in columns:
+        if column not in CSV_KEYS:
+            raise ValueError("Unknown column " + column + ", the columns are " + ", ".join(CSV_KEYS) + ".")
+        
+        if column not in selection:
+            selection.append(column)
+    
+    if not selection:
+        raise ValueError("No column selected.")
+    
+    return selection
+
+def decoded_columns(columns, per_satellite=False, ordered=False, incremental=False):
+    """Lists the fields of the TLEs to decode in order to write the selected columns.
+    
+    Besides the written columns, the designators are needed to write one
+    output file per satellite, the satellite numbers, epochs and element
+    numbers to sort the rows, and the satellite numbers and epochs to follow
+    the last epochs of an incremental extraction.
+    
+    :param columns: Keys of the written columns, or None for all of them.
+    :type columns: list
+    :return: The keys of the decoded fields in the order of :data:`CSV_KEYS`, or None for all of them.
+    :rtype: tuple
+    """
+    
+    if columns is None:
+        return None
+    
+    needed = set(columns)
+    
+    if per_satellite:
+        needed.add("cospar")
+    if ordered:
+        needed.update(["satnum", "epoch", "eltnum"])
+    if incremental:
+        needed.update(["satnum", "epoch"])
+    
+    return tuple(key for key in CSV_KEYS if key in needed)
+
+def column_decoder(columns, precise_epoch=False):
+    """Builds a function decoding only some fields of the TLEs.
+    
+    The function takes the lines and the name of a TLE, like
+    :func:`decode_tle`, and returns a :class:`TLERecord` whose other fields are
+    None. They are never sliced nor converted, the epoch being the most
+    expensive of them.
+    
+    :param columns: Keys of the decoded fields, see :func:`decoded_columns`.
+    :type columns: tuple
+    :param precise_epoch: Whether to keep the microseconds of the epoch, see :func:`epoch_to_datetime`.
+    :type precise_epoch: bool
+    :return: The decoding function.
+    :rtype: function
+    
+    ..warning:: The TLE must be valid and its lines must have the same satellite number.
+    """
+    
+    decoders = [(CSV_KEYS.index(key), COLUMN_DECODERS[key]) for key in columns if key in COLUMN_DECODERS]
+    epoch_index = CSV_KEYS.index("epoch") if "epoch" in columns else None
+    name_index = CSV_KEYS.index("name") if "name" in columns else None
+    
+    def decode(line1, line2, name=""):
+        values = [None] * len(CSV_KEYS)
+        
+        for index, decoder in decoders:
+            values[index] = decoder(line1, line2)
         
-        i = 0
+        if epoch_index is not None:
+            values[epoch_index] = epoch_to_datetime(line1[EPOCH], precise_epoch)
+        if name_index is not None:
+            values[name_index] = name
+        
+        return TLERecord._make(values)
+    
+    return decode
+
+def frame_tles(numbered_lines):
+    """Finds the TLEs in the lines, with the names of the 3LE files.
+    
+    The lines are not paired blindly: the first and second lines of the TLEs
+    are recognized by their "1 " and "2 " prefixes, and the other lines, up to
+    :data:`NAME_MAX_LENGTH` characters, are the names of the satellites of the
+    following TLEs. The "0 " prefix of the names of Space-Track is removed. The
+    blank lines are skipped.
+    
+    A line which does not fit in a TLE (a first line without second line, a
+    second line without first line, a name without TLE or a longer line) is
+    yielded alone, with empty strings for the missing line, so that it is
+    rejected by the validation. The next TLE is found at once, each line being
+    looked at only once, so that a stray line only costs its own TLE instead of
+    shifting all the following ones. A single remaining first line or name at
+    the end is ignored.
+    
+    :param numbered_lines: Iterable of ``(line_number, line)`` tuples.
+    :type numbered_lines: iterable
+    :return: Generator of ``(line_number, name, line1, line2, line2_number)``
+        tuples, where ``line_number`` is the number of the first line (or of
+        the line yielded alone), ``name`` is empty without name line, both
+        lines are stripped, and ``line2_number`` is the number of the second
+        line, which blank lines may separate from the first one (or the same
+        number for a line yielded alone).
+    :rtype: generator
+    
+    ..note:: A TLE of the lines of two satellites is still yielded, it is then rejected when the satellite numbers are compared.
+    """
+    
+    # Number and text of the name line waiting for its TLE.
+    name = None
+    # Number, name and text of the first line waiting for the second one.
+    pending = None
+    
+    for line_number, line in numbered_lines:
+        line = line.strip()
+        prefix = line[:2]
         
-        while i + 1 < len(lines):
-            logger.debug("Scaning lines " + str(i + 1) + " and " + str(i + 2) + ".")
-            tle = (lines[i].strip(), lines[i + 1].strip())
+        if prefix == "2 ":
+            if pending is not None:
+                yield pending[0], pending[1], pending[2], line, line_number
+                pending = None
+            else:
+                # The name of the missing first line goes with it.
+                yield line_number, "", "", line, line_number
+                name = None
+        elif prefix == "1 ":
+            if pending is not None:
+                yield pending[0], pending[1], pending[2], "", pending[0]
             
-            good_to_extract = True
+            pending = (line_number, "" if name is None else name[1], line)
+            name = None
+        elif line:
+            if pending is not None:
+                yield pending[0], pending[1], pending[2], "", pending[0]
+                pending = None
+            elif name is not None:
+                yield name[0], "", name[2], "", name[0]
             
-            if check_format(*tle):
-                logger.debug("Good format.")
-                if not check_integrity(tle[0]):
-                    good_to_extract = False
-                    logger.error("In " + tle_file + ", line " + str(i + 1) + ": checksum verification failed.")
-                else:
-                    logger.debug("Checksum verification succeed.")
-                
-                if not check_integrity(tle[1]):
-                    good_to_extract = False
-                    logger.error("In " + tle_file + ", line " + str(i + 2) + ": checksum verification failed.")
-                else:
-                    logger.debug("Checksum verification succeed.")
+            if len(line) <= NAME_MAX_LENGTH:
+                name = (line_number, line[2:] if line.startswith("0 ") else line, line)
             else:
-                good_to_extract = False
-                logger.error("In " + tle_file + ", lines " + str(i + 1) + " and " + str(i + 2) + ": bad format.")
-            
-            if good_to_extract:
-                logger.debug("Convert TLE in lines " + str(i + 1) + " and " + str(i + 2) + ".")
-                tle_data = convert_tle(*tle)
-                
-                if tle_data is None:
-                    logger.error("Different satellite number for lines " + str(i + 1) + " and " + str(i + 2) + ".")
-                elif tle_data["cospar"] == cospar or cospar is None:
-                    logger.debug("This TLE corresponds to the asked satellite.")
-                    
-                    data_line = [tle_data["satnum"]]
-                    data_line.append(tle_data["cospar"])
-                    data_line.append(tle_data["epoch"])
-                    data_line.append(tle_data["mmotd"])
-                    data_line.append(tle_data["mmotdd"])
-                    data_line.append(tle_data["bstar"])
-                    data_line.append(tle_data["ephtype"])
-                    data_line.append(tle_data["eltnum"])
-                    data_line.append(tle_data["inclin"])
-                    data_line.append(tle_data["raan"])
-                    data_line.append(tle_data["eccentr"])
-                    data_line.append(tle_data["argofper"])
-                    data_line.append(tle_data["manomaly"])
-                    data_line.append(tle_data["mmot"])
-                    data_line.append(tle_data["epochrev"])
-                    
-                    extracted_data.append(data_line)
-                else:
-                    logger.debug("This TLE does not correspond to the asked satellite.")
-                
-            i = i + 2
+                yield line_number, "", line, "", line_number
+                name = None
+
+def _line_ending(mapped, start, end):
+    """Finds the line ending of the mapped file, "\\r" or "\\n" (also used for "\\r\\n")."""
     
-    try:
-        csv_output_file = csv.writer(open(output_file, "w", newline=""))
-    except PermissionError:
-        logger.error("Impossible to write in " + output_file + ".")
+    first_lf = mapped.find(b"\n", start, end)
+    first_cr = mapped.find(b"\r", start, end if first_lf == -1 else first_lf)
+    
+    # A carriage return not followed by a line feed ends the lines by itself.
+    if first_cr != -1 and first_cr + 1 != first_lf:
+        return b"\r"
     else:
-        if len(extracted_data) < 2: # Only the column headers line.
-            logger.warning("There was no data extracted. " + output_file + " won't be created.")
-            return False
-        else:
-            for line in extracted_data:
-                csv_output_file.writerow(line)
+        return b"\n"
+
+def mapped_lines(tle_file, start=0, end=None, line_number=1):
+    """Reads the lines of the file through a memory map.
+    
+    The file is not copied into a buffer: each line is decoded straight from
+    the pages of the file, which stay in the page cache of the system between
+    two extractions. The lines are found like with a text file opened in
+    universal newlines mode, provided that the file does not mix "\\r" with
+    the other line endings. The "\\r" of "\\r\\n" line endings is kept at the
+    end of the lines, like any trailing whitespace.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :param start: Offset of the first line, in bytes.
+    :type start: int
+    :param end: Offset of the end of the last line, in bytes, or None for the end of the file.
+    :type end: int
+    :param line_number: Number of the first line.
+    :type line_number: int
+    :return: Generator of ``(line_number, line)`` tuples.
+    :rtype: generator
+    :raise FileNotFoundError: If the file does not exist.
+    
+    ..seealso:: :func:`frame_tles`
+    """
+    
+    with open(tle_file, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        
+        # Empty files can not be mapped.
+        if size == 0:
+            return
+        
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    view = memoryview(mapped)
+    
+    try:
+        if end is None or end > size:
+            end = size
         
-            logger.info("Wrote " + output_file + ".")
-            return True
+        line_ending = _line_ending(mapped, start, end)
+        position = start
         
+        while position < end:
+            line_end = mapped.find(line_ending, position, end)
+            if line_end == -1:
+                line_end = end
+            
+            # Latin-1 maps each byte to one character and never fails, the
+            # non-ASCII characters are then rejected by the validation.
+            yield line_number, str(view[position:line_end], "latin-1")
+            
+            position = line_end + 1
+            line_number += 1
+    finally:
+        view.release()
+        mapped.close()
+
+def compression_format(tle_file):
+    """Detects the compressed files from their first bytes.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :return: "gzip", "bz2", "xz" or "zip", None if the file is not compressed.
+    :rtype: str
+    :raise FileNotFoundError: If the file does not exist.
+    """
+    
+    with open(tle_file, "rb") as file:
+        signature = file.read(6)
+    
+    for prefix, compression in COMPRESSION_SIGNATURES:
+        if signature.startswith(prefix):
+            return compression
+    
+    return None
+
+def _archive_streams(tle_file, compression):
+    """Opens each member of a compressed file as a binary stream.
+    
+    The gzip, bz2 and xz files have a single member (the concatenated streams
+    are read as one), named like the file. The members of the zip files are
+    named after the file and their path in the archive, and are read in order.
+    
+    :return: Generator of ``(member, stream)`` tuples.
+    :rtype: generator
+    """
+    
+    # Imported here, since they are only needed by the compressed files.
+    if compression == "zip":
+        import zipfile
+        
+        with zipfile.ZipFile(tle_file) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield tle_file + "/" + info.filename, archive.open(info)
+    elif compression == "gzip":
+        import gzip
+        yield tle_file, gzip.open(tle_file, "rb")
+    elif compression == "bz2":
+        import bz2
+        yield tle_file, bz2.open(tle_file, "rb")
+    elif compression == "xz":
+        import lzma
+        yield tle_file, lzma.open(tle_file, "rb")
+
+def _archive_batches(tle_file, compression):
+    """Decompresses the members of a compressed file into batches of lines.
+    
+    The lines are split like with a text file opened in universal newlines
+    mode, and decoded from latin-1 like by :func:`mapped_lines`.
+    
+    :return: Generator of ``(member, line_number, lines)`` tuples, where ``line_number`` is the number of the first line of the batch.
+    :rtype: generator
+    """
+    
+    for member, stream in _archive_streams(tle_file, compression):
+        with io.TextIOWrapper(stream, encoding="latin-1") as text:
+            line_number = 1
+            
+            while True:
+                lines = text.readlines(DECOMPRESSION_BATCH_SIZE)
+                if not lines:
+                    break
+                
+                yield member, line_number, lines
+                line_number += len(lines)
+
+def _prefetched(iterable, depth):
+    """Iterates over the iterable in a background thread, a few items ahead.
+    
+    The exceptions raised by the iterable are raised again in the consumer.
+    When the consumer stops early, the background thread stops too.
+    
+    :param iterable: The iterable, which is only used by the background thread.
+    :type iterable: iterable
+    :param depth: Maximum number of items waiting for the consumer.
+    :type depth: int
+    :return: Generator of the items.
+    :rtype: generator
+    """
+    
+    # Imported here, like the modules below used by some extractions only, so
+    # that the short extractions of the command line start quickly.
+    import queue
+    
+    items = queue.Queue(depth)
+    stopped = threading.Event()
+    
+    def put(item):
+        # The queue is full while the consumer is busy, and forever once it
+        # stopped: the event is checked regularly to leave in that case.
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+        except Exception as error:
+            put((False, error))
+        else:
+            put((False, None))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    
+    try:
+        while True:
+            is_item, item = items.get()
+            
+            if not is_item:
+                if item is not None:
+                    raise item
+                return
+            
+            yield item
+    finally:
+        stopped.set()
+
+def archive_errors():
+    """Returns the types of the errors raised by the decompressors on invalid archives, see :func:`archive_lines`."""
+    
+    # Imported here, since they are only needed by the compressed files.
+    import zlib
+    import lzma
+    import zipfile
+    
+    return OSError, EOFError, zlib.error, lzma.LZMAError, zipfile.BadZipFile
+
+def _archive_checked(batches, failures):
+    """Yields the batches until the decompression fails, the error being appended to ``failures``."""
+    
+    try:
+        yield from batches
+    except archive_errors() as error:
+        failures.append(error)
+
+def archive_lines(tle_file, compression, failures=None):
+    """Reads the lines of each member of a compressed file.
+    
+    The decompression runs in a background thread, ahead of the extraction,
+    so that the two overlap: the decompressors release the GIL, and the
+    consecutive members of the zip files are decompressed without waiting for
+    the previous ones to be extracted. Nothing is written to the disk.
+    
+    :param tle_file: Path of the compressed file.
+    :type tle_file: str
+    :param compression: Format of the file, see :func:`compression_format`.
+    :type compression: str
+    :param failures: List to which the error of an invalid archive is appended, the lines ending there, or None to raise it. Only the errors of the decompression are caught, see :func:`archive_errors`.
+    :type failures: list
+    :return: Generator of ``(member, numbered_lines)`` tuples, where ``numbered_lines`` is like the generator of :func:`mapped_lines`, and must be consumed before the next member.
+    :rtype: generator
+    :raise OSError: If the file is not a valid archive and ``failures`` is None (zlib.error, lzma.LZMAError, EOFError and zipfile.BadZipFile may also be raised).
+    """
+    
+    batches = _prefetched(_archive_batches(tle_file, compression), DECOMPRESSION_DEPTH)
+    
+    if failures is not None:
+        batches = _archive_checked(batches, failures)
+    
+    for member, member_batches in itertools.groupby(batches, key=itemgetter(0)):
+        yield member, itertools.chain.from_iterable(zip(itertools.count(line_number), lines) for member, line_number, lines in member_batches)
+
+def split_file(tle_file, chunk_size=CHUNK_SIZE):
+    """Splits the file into byte ranges that can be extracted independently.
+    
+    The file is cut about every ``chunk_size`` bytes, each cut being moved to
+    the end of the next second line of TLE, after which nothing is waiting to
+    be paired, so that the TLEs are found exactly as when the whole file is
+    read by :func:`frame_tles`. Only the few lines after each cut are read,
+    so the lines are not counted: the extraction of each range gives its
+    number of lines, see :func:`_extract_range`.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :param chunk_size: Approximate size of the ranges, in bytes.
+    :type chunk_size: int
+    :return: List of ``(start, end)`` tuples of offsets.
+    :rtype: list
+    :raise FileNotFoundError: If the file does not exist.
+    """
+    
+    with open(tle_file, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        
+        # Empty files can not be mapped.
+        if size == 0:
+            return []
+        
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    with mapped:
+        line_ending = _line_ending(mapped, 0, size)
+        ranges = []
+        start = 0
+        
+        while start < size:
+            end = _tle_boundary(mapped, start + chunk_size, size, line_ending)
+            ranges.append((start, end))
+            start = end
+    
+    return ranges
+
+def _tle_boundary(mapped, position, size, line_ending):
+    """Finds the end of the first second line of TLE starting after the position, or the end of the file."""
+    
+    # The position may be in the middle of a line, the lines are checked from
+    # the next one.
+    line_end = mapped.find(line_ending, min(position, size), size)
+    
+    while line_end != -1:
+        line_start = line_end + 1
+        line_end = mapped.find(line_ending, line_start, size)
+        
+        if _is_line2(mapped[line_start:size if line_end == -1 else line_end]):
+            break
+    
+    return size if line_end == -1 else line_end + 1
+
+def _is_line2(line):
+    """Tells whether a line of bytes is the second line of a TLE, after which :func:`frame_tles` has nothing waiting."""
+    
+    return line.strip()[:2] == b"2 "
+
+def _index_entries(mapped, size):
+    """Yields the designator, the satellite number, the offset and the line number of the TLEs of the mapped file.
+    
+    The offset and the line number are the ones of the name line of the TLE, if
+    any, or of its first line. The lines are framed like with
+    :func:`frame_tles`, and the lines which do not fit in a TLE are skipped.
+    """
+    
+    line_ending = _line_ending(mapped, 0, size)
+    position = 0
+    line_number = 1
+    
+    # Offset and number of the name line waiting for its TLE.
+    name = None
+    # Entry of the first line waiting for the second one.
+    pending = None
+    
+    while position < size:
+        line_end = mapped.find(line_ending, position)
+        if line_end == -1:
+            line_end = size
+        
+        line = mapped[position:line_end].strip()
+        prefix = line[:2]
+        
+        if prefix == b"2 ":
+            if pending is not None:
+                yield pending
+            
+            name = pending = None
+        elif prefix == b"1 ":
+            line1 = line.decode("latin-1")
+            start, start_line_number = name if name is not None else (position, line_number)
+            pending = (line1[COSPAR].strip(), line1[SATNUM], start, start_line_number)
+            name = None
+        elif line:
+            pending = None
+            name = (position, line_number) if len(line) <= NAME_MAX_LENGTH else None
+        
+        position = line_end + 1
+        line_number += 1
+
+def build_index(tle_file, index_file=":memory:"):
+    """Lists the TLEs of each satellite of the file, with their offsets.
+    
+    The TLEs are found like with :func:`frame_tles`, but only the satellite
+    number and the designator of the first lines are read: the TLEs are neither
+    validated nor decoded. The index is an SQLite database, so that looking for
+    a satellite does not need to load the whole index.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :param index_file: Path of the database, which must not exist yet.
+    :type index_file: str
+    :return: Connection to the database.
+    :rtype: sqlite3.Connection
+    :raise FileNotFoundError: If the file does not exist.
+    
+    ..seealso:: :func:`load_index`, :func:`lookup_index`
+    """
+    
+    # Imported here, since the indexes are only used with use_index.
+    import sqlite3
+    
+    connection = sqlite3.connect(index_file)
+    
+    try:
+        connection.execute("CREATE TABLE info (version INTEGER, size INTEGER, mtime INTEGER)")
+        connection.execute("CREATE TABLE tles (cospar TEXT, satnum TEXT, offset INTEGER, line_number INTEGER)")
+        
+        with open(tle_file, "rb") as file:
+            stat = os.fstat(file.fileno())
+            
+            # Empty files can not be mapped.
+            if stat.st_size > 0:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    connection.executemany("INSERT INTO tles VALUES (?, ?, ?, ?)", _index_entries(mapped, stat.st_size))
+        
+        connection.execute("INSERT INTO info VALUES (?, ?, ?)", (INDEX_VERSION, stat.st_size, stat.st_mtime_ns))
+        connection.execute("CREATE INDEX tles_cospar ON tles (cospar)")
+        connection.execute("CREATE INDEX tles_satnum ON tles (satnum)")
+        connection.commit()
+    except Exception:
+        connection.close()
+        raise
+    
+    return connection
+
+def _index_is_current(connection, stat):
+    """Checks whether the index was built for the current version of the file."""
+    
+    import sqlite3
+    
+    try:
+        info = connection.execute("SELECT version, size, mtime FROM info").fetchone()
+    except sqlite3.DatabaseError:
+        return False
+    
+    return info == (INDEX_VERSION, stat.st_size, stat.st_mtime_ns)
+
+def load_index(tle_file):
+    """Opens the index of the file, building it if needed.
+    
+    The index is saved next to the file, with the :data:`INDEX_SUFFIX` suffix.
+    It is built again when the size or the modification time of the file has
+    changed. When it can not be saved, it is kept in memory for this time only.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :return: Connection to the index, see :func:`build_index`.
+    :rtype: sqlite3.Connection
+    :raise FileNotFoundError: If the file does not exist.
+    """
+    
+    import sqlite3
+    
+    index_file = tle_file + INDEX_SUFFIX
+    stat = os.stat(tle_file)
+    
+    if os.path.exists(index_file):
+        try:
+            connection = sqlite3.connect(index_file)
+        except sqlite3.Error:
+            logger.debug("Impossible to open the index of " + tle_file + ".")
+        else:
+            if _index_is_current(connection, stat):
+                return connection
+            
+            connection.close()
+            logger.debug("The index of " + tle_file + " is outdated.")
+    
+    logger.debug("Indexing " + tle_file + ".")
+    
+    # The index is built aside, then moved, so that another extraction never
+    # sees a partial index.
+    temporary_file = index_file + "." + str(os.getpid())
+    
+    try:
+        build_index(tle_file, temporary_file).close()
+        os.replace(temporary_file, index_file)
+    except (OSError, sqlite3.Error):
+        logger.warning("Impossible to write the index " + index_file + ".")
+        
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+        
+        return build_index(tle_file)
+    
+    return sqlite3.connect(index_file)
+
+def lookup_index(connection, cospar=None, satnum=None):
+    """Finds the TLEs of a satellite in an index.
+    
+    :param connection: Connection to the index, see :func:`load_index`.
+    :type connection: sqlite3.Connection
+    :param cospar: International or COSPAR designator / NSSDC ID.
+    :type cospar: str
+    :param satnum: Satellite number, five digits.
+    :type satnum: str
+    :return: List of ``(offset, line_number)`` of the first lines of the TLEs, in the order of the file.
+    :rtype: list
+    """
+    
+    if cospar is not None:
+        query = connection.execute("SELECT offset, line_number FROM tles WHERE cospar = ? ORDER BY offset", (cospar,))
+    else:
+        query = connection.execute("SELECT offset, line_number FROM tles WHERE satnum = ? ORDER BY offset", (satnum,))
+    
+    return query.fetchall()
+
+def indexed_lines(tle_file, entries):
+    """Reads the TLEs found in the index of the file.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :param entries: List of ``(offset, line_number)`` of the first lines of the TLEs, see :func:`lookup_index`.
+    :type entries: list
+    :return: Generator of ``(line_number, line)`` tuples, the lines of each entry up to its second line, to be framed by :func:`frame_tles`.
+    :rtype: generator
+    :raise FileNotFoundError: If the file does not exist.
+    
+    ..seealso:: :func:`load_index`, :func:`mapped_lines`
+    """
+    
+    if not entries:
+        return
+    
+    with open(tle_file, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    with mapped:
+        line_ending = _line_ending(mapped, 0, size)
+        
+        for position, line_number in entries:
+            # The name line and the blank lines come before the second line.
+            while position < size:
+                line_end = mapped.find(line_ending, position)
+                if line_end == -1:
+                    line_end = size
+                
+                line = mapped[position:line_end]
+                yield line_number, line.decode("latin-1")
+                
+                if _is_line2(line):
+                    break
+                
+                position = line_end + 1
+                line_number += 1
+
+class ExtractionMonitor:
+    """Follows the progress of an extraction and allows to cancel it.
+    
+    The extraction updates the counters as it goes and calls the callback with
+    an :class:`ExtractionProgress` after each file and every
+    :data:`PROGRESS_INTERVAL` TLEs. The callback is called in the thread of the
+    extraction, whereas :meth:`cancel` can be called from any thread: the
+    extraction then stops at the next report.
+    
+    The accepted TLEs are the valid ones, whatever their satellite, and the
+    rejected TLEs are the others. While a file is read, its number of bytes is
+    estimated from the lengths of its lines, which overestimates the progress
+    in the compressed files until they are done.
+    
+    With a ``profile``, the duration of each stage of the extraction is
+    measured too, see :class:`ExtractionProfile`.
+    """
+    
+    def __init__(self, callback=None, profile=None):
+        self.callback = callback
+        self.profile = profile
+        self.files_done = 0
+        self.files_count = 0
+        self.bytes_read = 0
+        self.bytes_count = 0
+        self.accepted = 0
+        self.rejected = 0
+        self._bytes_done = 0
+        self._cancel_event = threading.Event()
+        
+    def cancel(self):
+        """Asks the extraction to stop."""
+        
+        self._cancel_event.set()
+        
+    def is_cancelled(self):
+        """Tells whether the extraction was asked to stop."""
+        
+        return self._cancel_event.is_set()
+        
+    def start(self, tle_files):
+        """Counts the files to extract and their sizes."""
+        
+        self.files_count = len(tle_files)
+        
+        for tle_file in tle_files:
+            try:
+                self.bytes_count += os.path.getsize(tle_file)
+            except OSError:
+                pass
+        
+    def update(self, bytes_read, accepted, rejected):
+        """Adds the counts of a part of a file and reports the progress."""
+        
+        self.bytes_read = min(self.bytes_read + bytes_read, self.bytes_count)
+        self.accepted += accepted
+        self.rejected += rejected
+        self.report()
+        
+    def finish_file(self, tle_file):
+        """Counts the file as done and reports the progress."""
+        
+        try:
+            self._bytes_done += os.path.getsize(tle_file)
+        except OSError:
+            pass
+        
+        self.bytes_read = self._bytes_done
+        self.files_done += 1
+        self.report()
+        
+    def progress(self):
+        """Returns the current :class:`ExtractionProgress`."""
+        
+        return ExtractionProgress(self.files_done, self.files_count, self.bytes_read, self.bytes_count, self.accepted, self.rejected)
+        
+    def report(self):
+        """Calls the callback with the current progress."""
+        
+        if self.callback is not None:
+            self.callback(self.progress())
+
+class ExtractionProfile:
+    """Measures the duration, the number of items and the bytes of each stage of an extraction.
+    
+    The stages of the TLEs are measured for each file:
+    
+    * read: reading and pairing the lines (the items are the TLEs);
+    * format: checking the format of the TLEs;
+    * checksum: checking the checksums of the well formatted TLEs;
+    * epoch: converting the epochs of the extracted TLEs;
+    * decode: decoding the other fields of the extracted TLEs.
+    
+    The stages of the output are measured for the whole extraction:
+    
+    * sort: sorting the rows, see :func:`sorted_rows`;
+    * write: writing the rows in the output files.
+    
+    The rejected TLEs are counted by reason: bad format, bad checksum,
+    different satellite numbers in the two lines and missing lines. With the parallel
+    extraction, the stages of the TLEs are measured in the worker processes,
+    so their total may be more than the duration of the extraction.
+    
+    With ``capture``, the extraction also runs under :mod:`cProfile` and
+    :mod:`tracemalloc` (in the main process only), and the report gives the
+    functions which took the most time and the peak of the allocated memory.
+    This slows the extraction down much more than the measures of the stages.
+    
+    :param capture: Whether to run the extraction under cProfile and tracemalloc.
+    :type capture: bool
+    
+    ..seealso:: :meth:`report`
+    """
+    
+    FILE_STAGES = ["read", "format", "checksum", "epoch", "decode"]
+    OUTPUT_STAGES = ["sort", "write"]
+    
+    # Name of each reason of rejection, see :class:`ErrorSummary`.
+    REJECTIONS = [(TLE_BAD_FORMAT, "bad format"), (TLE_BAD_CHECKSUM1 | TLE_BAD_CHECKSUM2, "bad checksum"), (TLE_DIFFERENT_SATNUMS, "different satellite numbers"), (TLE_INCOMPLETE, "missing lines")]
+    
+    # Number of functions given by the report in capture mode.
+    HOTSPOTS_COUNT = 20
+    
+    def __init__(self, capture=False):
+        self.capture = capture
+        self.files = {}
+        self.output_stages = {stage: [0.0, 0, 0] for stage in self.OUTPUT_STAGES}
+        self.seconds = 0.0
+        self.memory_peak = None
+        self.hotspots = None
+        self._iterations = {}
+        self._start_time = None
+        self._profiler = None
+        
+    def file(self, tle_file):
+        """Returns the measures of a file: a dictionary with the ``stages`` (``[seconds, items, bytes]`` lists) and the ``rejections`` (counter)."""
+        
+        file_profile = self.files.get(tle_file)
+        
+        if file_profile is None:
+            file_profile = self.files[tle_file] = {"stages": {stage: [0.0, 0, 0] for stage in self.FILE_STAGES}, "rejections": collections.Counter()}
+        
+        return file_profile
+        
+    def add(self, tle_file, stage, seconds, items=0, bytes_count=0):
+        """Adds a measure to a stage of a file."""
+        
+        measures = self.file(tle_file)["stages"][stage]
+        measures[0] += seconds
+        measures[1] += items
+        measures[2] += bytes_count
+        
+    def reject(self, tle_file, errors):
+        """Counts a rejected TLE of a file, the errors being combined like the results of :func:`validate_tle`."""
+        
+        # The checksums are not checked when the format is bad.
+        if errors & TLE_BAD_FORMAT:
+            errors = TLE_BAD_FORMAT
+        
+        for error, reason in self.REJECTIONS:
+            if errors & error:
+                self.file(tle_file)["rejections"][reason] += 1
+        
+    def merge(self, other):
+        """Adds the measures of the files of another profile, from a worker process."""
+        
+        for tle_file, other_file_profile in other.files.items():
+            for stage, measures in other_file_profile["stages"].items():
+                self.add(tle_file, stage, *measures)
+            
+            self.file(tle_file)["rejections"].update(other_file_profile["rejections"])
+        
+    def timed(self, rows, name):
+        """Yields the rows, measuring the time spent to get them.
+        
+        This is how the output stages are measured: the time spent to write is
+        the rest of the duration of the extraction.
+        """
+        
+        iteration = self._iterations[name] = [0.0, 0]
+        rows = iter(rows)
+        clock = time.perf_counter
+        
+        while True:
+            start_time = clock()
+            row = next(rows, None)
+            iteration[0] += clock() - start_time
+            
+            if row is None:
+                return
+            
+            iteration[1] += 1
+            yield row
+        
+    def start(self):
+        """Starts the measure of the whole extraction, and the capture if asked."""
+        
+        if self.capture:
+            # Imported here, since they are only needed to debug.
+            import cProfile
+            import tracemalloc
+            
+            tracemalloc.start()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        
+        self._start_time = time.perf_counter()
+        
+    def stop(self, output_files=()):
+        """Stops the measures, then computes the output stages.
+        
+        :param output_files: The files which were written, to measure the bytes written.
+        :type output_files: iterable
+        """
+        
+        self.seconds = time.perf_counter() - self._start_time
+        
+        if self._profiler is not None:
+            import pstats
+            import tracemalloc
+            
+            self._profiler.disable()
+            self.memory_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            
+            statistics = pstats.Stats(self._profiler).stats
+            functions = sorted(statistics.items(), key=lambda item: item[1][3], reverse=True)[:self.HOTSPOTS_COUNT]
+            self.hotspots = [{"function": "%s:%d(%s)" % function, "calls": calls, "seconds": own_seconds, "cumulative_seconds": cumulative_seconds} for function, (primitive_calls, calls, own_seconds, cumulative_seconds, callers) in functions]
+            self._profiler = None
+        
+        extracted_seconds, extracted_rows = self._iterations.get("extracted", (0.0, 0))
+        arranged_seconds, arranged_rows = self._iterations.get("arranged", (extracted_seconds, extracted_rows))
+        
+        written_bytes = 0
+        for output_file in output_files:
+            try:
+                written_bytes += os.path.getsize(output_file)
+            except OSError:
+                pass
+        
+        self.output_stages["sort"] = [max(arranged_seconds - extracted_seconds, 0.0), extracted_rows if "arranged" in self._iterations else 0, 0]
+        self.output_stages["write"] = [max(self.seconds - arranged_seconds, 0.0), arranged_rows, written_bytes]
+        
+    def report(self):
+        """Returns the measures as a dictionary, which can be saved in JSON.
+        
+        The report holds the ``seconds`` of the whole extraction, the
+        ``stages`` with their ``seconds``, ``items`` and ``bytes``, the
+        ``rejections`` by reason, the ``tles`` and ``bytes`` read with the
+        throughputs, and the same measures for each of the ``files``. In
+        capture mode, it also holds the ``memory_peak`` in bytes and the
+        ``hotspots``, the functions which took the most time.
+        
+        :rtype: dict
+        """
+        
+        def stages_report(stages):
+            return {stage: {"seconds": seconds, "items": items, "bytes": bytes_count} for stage, (seconds, items, bytes_count) in stages.items()}
+        
+        stages = {stage: [0.0, 0, 0] for stage in self.FILE_STAGES}
+        rejections = collections.Counter()
+        files = []
+        
+        for tle_file, file_profile in self.files.items():
+            for stage, measures in file_profile["stages"].items():
+                stages[stage] = [total + measure for total, measure in zip(stages[stage], measures)]
+            
+            rejections.update(file_profile["rejections"])
+            files.append({"file": tle_file, "tles": file_profile["stages"]["read"][1], "bytes": file_profile["stages"]["read"][2], "stages": stages_report(file_profile["stages"]), "rejections": dict(file_profile["rejections"])})
+        
+        stages.update(self.output_stages)
+        tles_count, bytes_count = stages["read"][1], stages["read"][2]
+        
+        report = {
+            "seconds": self.seconds,
+            "tles": tles_count,
+            "bytes": bytes_count,
+            "rows": stages["write"][1],
+            "tles_per_second": tles_count / self.seconds if self.seconds else None,
+            "megabytes_per_second": bytes_count / 1e6 / self.seconds if self.seconds else None,
+            "stages": stages_report(stages),
+            "rejections": {reason: rejections[reason] for error, reason in self.REJECTIONS},
+            "files": files}
+        
+        if self.memory_peak is not None:
+            report["memory_peak"] = self.memory_peak
+            report["hotspots"] = self.hotspots
+        
+        return report
+        
+    def summary(self):
+        """Describes the time spent in each stage in a few lines of text, for the user."""
+        
+        report = self.report()
+        lines = []
+        
+        for stage, measures in report["stages"].items():
+            if measures["seconds"] or measures["items"]:
+                lines.append("%s: %.3f s (%d items)" % (stage, measures["seconds"], measures["items"]))
+        
+        lines.append("Rejected TLEs: " + ", ".join("%d (%s)" % (count, reason) for reason, count in report["rejections"].items()))
+        
+        if report["tles_per_second"] is not None:
+            lines.append("Throughput: %d TLEs/s, %.1f MB/s" % (report["tles_per_second"], report["megabytes_per_second"]))
+        
+        return "\n".join(lines)
+        
+    def save(self, filename):
+        """Saves the report in a JSON file, see :meth:`report`.
+        
+        :raise OSError: If the file cannot be written.
+        """
+        
+        import json
+        
+        with open(filename, "w") as file:
+            json.dump(self.report(), file, indent=1)
+
+def extract_rows(cospar, tle_files, workers=1, chunk_size=CHUNK_SIZE, precise_epoch=False, use_index=False, monitor=None, error_summary=False, tle_filter=None, columns=None, cache=None):
+    """Extracts the CSV rows for the given satellite from the given files.
+    
+    This is the streaming core of :func:`data_extract`: the files are read
+    lazily and each row is yielded as soon as its TLE is converted, so the
+    memory usage does not depend on the size of the files.
+    
+    With more than one worker, the files are split by :func:`split_file` and
+    the pieces are extracted in a pool of processes. The rows are yielded in
+    the same order as with a single worker, and the errors are reported with
+    the same line numbers.
+    
+    With ``use_index``, only the TLEs of the satellite are read, thanks to the
+    indexes of the files (see :func:`load_index`), and the workers are not
+    needed. The errors in the TLEs of the other satellites are then not logged.
+    
+    With a ``cache``, the files kept in it are taken from it, whatever the
+    other options. A file which is not kept yet is read through its index with
+    ``use_index``, and is then not kept, since only the TLEs of the satellite
+    are read. Otherwise it is read and kept by this process, unless it is too
+    large for the cache, in which case it is extracted by the workers.
+    
+    The gzip, bz2, xz and zip files are decompressed on the fly, see
+    :func:`archive_lines`. They can not be split nor indexed, so they are
+    always read whole by the main process.
+    
+    :param cospar: International or COSPAR designator / NSSDC ID, set of designators, or None for all satellites.
+    :type cospar: str
+    :param tle_files: List of TLE filenames and paths.
+    :type tle_files: list
+    :param workers: Number of processes, or None for one per processor.
+    :type workers: int
+    :param chunk_size: Approximate size in bytes of the pieces of files given to the processes.
+    :type chunk_size: int
+    :param precise_epoch: Whether to keep the microseconds of the epochs, see :func:`epoch_to_datetime`.
+    :type precise_epoch: bool
+    :param use_index: Whether to use the indexes of the files when a satellite is given.
+    :type use_index: bool
+    :param monitor: Follows the progress of the extraction and allows to cancel it.
+    :type monitor: ExtractionMonitor
+    :param error_summary: Whether to log a summary of the errors of each file instead of one message per invalid TLE, see :class:`ErrorSummary`.
+    :type error_summary: bool
+    :param tle_filter: Conditions on the fields of the TLEs, checked before they are decoded.
+    :type tle_filter: TLEFilter
+    :param columns: Keys of the fields to decode, see :func:`decoded_columns`, or None for all of them. The other fields of the rows are None.
+    :type columns: tuple
+    :param cache: Keeps the valid TLEs of the files for the next extractions, see :class:`RecordCache`.
+    :type cache: RecordCache
+    :return: Generator of rows, ordered like :data:`CSV_HEADER`.
+    :rtype: generator
+    
+    ..seealso:: :func:`data_extract`
+    """
+    
+    cospars = designator_set(cospar)
+    
+    if monitor is None:
+        monitor = ExtractionMonitor()
+    
+    monitor.start(tle_files)
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    if cache is not None:
+        yield from _extract_cached_rows(cospars, tle_files, cache, workers, chunk_size, precise_epoch, use_index, monitor, error_summary, tle_filter, columns)
+        return
+    
+    if use_index and cospars is not None:
+        for tle_file in tle_files:
+            if monitor.is_cancelled():
+                return
+            
+            try:
+                compression = compression_format(tle_file)
+            except FileNotFoundError:
+                logger.error("Unable to find " + tle_file + ".")
+                monitor.finish_file(tle_file)
+                continue
+            
+            yield from _extract_indexed_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, columns)
+            
+            # A cancelled file is not done.
+            if not monitor.is_cancelled():
+                monitor.finish_file(tle_file)
+        return
+    
+    if workers > 1:
+        yield from _extract_rows_parallel(cospars, tle_files, workers, chunk_size, precise_epoch, monitor, error_summary, tle_filter, columns)
+        return
+    
+    for tle_file in tle_files:
+        if monitor.is_cancelled():
+            return
+        
+        logger.debug("Opening " + tle_file + ".")
+        
+        try:
+            compression = compression_format(tle_file)
+        except FileNotFoundError:
+            logger.error("Unable to find " + tle_file + ".")
+            monitor.finish_file(tle_file)
+            continue
+        else:
+            logger.debug("Successfuly loaded the file.")
+        
+        if compression is not None:
+            yield from _extract_archive_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, columns)
+        else:
+            yield from _extract_summarized_rows(cospars, tle_file, mapped_lines(tle_file), precise_epoch, monitor, error_summary, tle_filter, columns)
+        
+        # A cancelled file is not done.
+        if not monitor.is_cancelled():
+            monitor.finish_file(tle_file)
+
+def _extract_indexed_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, columns):
+    """Yields the rows of the TLEs of the satellites in a file, reading only them thanks to the index of the file.
+    
+    ..seealso:: :func:`load_index`, :func:`extract_rows`
+    """
+    
+    # The compressed files can not be read at given offsets.
+    if compression is not None:
+        logger.info(tle_file + " is compressed, it is read without index.")
+        yield from _extract_archive_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, columns)
+        return
+    
+    with contextlib.closing(load_index(tle_file)) as connection:
+        entries = sorted(itertools.chain.from_iterable(lookup_index(connection, designator) for designator in cospars))
+    
+    yield from _extract_summarized_rows(cospars, tle_file, indexed_lines(tle_file, entries), precise_epoch, monitor, error_summary, tle_filter, columns)
+
+class RecordCache:
+    """Keeps the valid TLEs of the files recently extracted, so that the next extractions of the same files do not read nor validate them again.
+    
+    The TLEs of each file are kept as their lines, so that they can still be
+    extracted for any satellite, filter, columns or precision of the epochs.
+    The invalid TLEs are kept as their errors, which are reported again. The
+    files are identified by their path, modification time and size, so a file
+    which changed is read again.
+    
+    When the estimated memory used by the TLEs exceeds the budget, the least
+    recently used files are dropped. The files which do not fit in the budget
+    are never kept.
+    
+    :param budget: Memory budget, in bytes.
+    :type budget: int
+    
+    :ivar hits: Number of files found in the cache.
+    :ivar misses: Number of files read.
+    :ivar size: Estimated memory used by the TLEs kept, in bytes.
+    
+    ..note:: A cache must be used by one extraction at a time.
+    ..seealso:: :func:`extract_rows`
+    """
+    
+    def __init__(self, budget=RECORD_CACHE_BUDGET):
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._files = collections.OrderedDict()
+        self._keys = {}
+        
+    @staticmethod
+    def key(tle_file):
+        """Returns the key of a file: its absolute path, its modification time in nanoseconds and its size.
+        
+        :raise FileNotFoundError: If the file does not exist.
+        """
+        
+        stat = os.stat(tle_file)
+        
+        return os.path.abspath(tle_file), stat.st_mtime_ns, stat.st_size
+        
+    def get(self, key):
+        """Returns the parts of a file kept in the cache, see :meth:`put`, or None if it is not kept."""
+        
+        entry = self._files.get(key)
+        
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self._files.move_to_end(key)
+        
+        return entry[0]
+        
+    def put(self, key, parts, size):
+        """Keeps the parts of a file, then drops the least recently used files until the budget is met.
+        
+        :param key: The key of the file, see :meth:`key`.
+        :type key: tuple
+        :param parts: List of ``(member, tles, errors, bytes)`` tuples, one per member of the file, with the tuples of its valid TLEs (see :func:`frame_tles`), the ``(validation, line_number, line2_number)`` tuples of its invalid ones, and its number of bytes.
+        :type parts: list
+        :param size: Estimated memory used by the parts, in bytes.
+        :type size: int
+        """
+        
+        # The previous version of the file is useless.
+        previous_key = self._keys.pop(key[0], None)
+        
+        if previous_key is not None:
+            self.size -= self._files.pop(previous_key)[1]
+        
+        if size > self.budget:
+            return
+        
+        self._files[key] = (parts, size)
+        self._keys[key[0]] = key
+        self.size += size
+        
+        while self.size > self.budget:
+            old_key, (old_parts, old_size) = self._files.popitem(last=False)
+            del self._keys[old_key[0]]
+            self.size -= old_size
+            self.evictions += 1
+        
+    def clear(self):
+        """Drops all the files."""
+        
+        self._files.clear()
+        self._keys.clear()
+        self.size = 0
+        
+    def log(self):
+        """Logs the hits and misses of the cache, and the memory it uses."""
+        
+        logger.info("Cache of the TLE files: %d hits, %d misses, %d evictions, %d files kept in %.1f MB of %.1f MB.", self.hits, self.misses, self.evictions, len(self._files), self.size / 2 ** 20, self.budget / 2 ** 20)
+
+class _InvalidTLEs(list):
+    """Keeps the errors of the invalid TLEs of a cached file or of a range extracted by a worker, in place of an :class:`ErrorSummary`."""
+    
+    def add(self, validation, line_number, line2_number):
+        self.append((validation, line_number, line2_number))
+
+def _extract_cached_rows(cospars, tle_files, cache, workers, chunk_size, precise_epoch, use_index, monitor, error_summary, tle_filter, columns):
+    """Yields the rows of the TLEs of the files, taking the files from the cache when they are kept in it.
+    
+    The files which are not kept are read through their index with
+    ``use_index``, or read and kept. Those too large to be kept are extracted
+    by the workers.
+    
+    ..seealso:: :class:`RecordCache`, :func:`extract_rows`
+    """
+    
+    for tle_file in tle_files:
+        if monitor.is_cancelled():
+            break
+        
+        try:
+            compression = compression_format(tle_file)
+            key = cache.key(tle_file)
+        except FileNotFoundError:
+            logger.error("Unable to find " + tle_file + ".")
+            monitor.finish_file(tle_file)
+            continue
+        
+        parts = cache.get(key)
+        
+        if parts is None:
+            if use_index and cospars is not None:
+                # Only the TLEs of the satellites are read, so the file is not
+                # kept.
+                yield from _extract_indexed_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, columns)
+                
+                if not monitor.is_cancelled():
+                    monitor.finish_file(tle_file)
+                continue
+            
+            parts = _read_cached_parts(tle_file, compression, cache, key)
+        
+        if parts is None:
+            # The file is too large to be kept, it is extracted as usual. The
+            # pool finishes the file itself.
+            if workers > 1 and compression is None:
+                yield from _extract_rows_parallel(cospars, [tle_file], workers, chunk_size, precise_epoch, monitor, error_summary, tle_filter, columns)
+                continue
+            
+            if compression is not None:
+                yield from _extract_archive_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, columns)
+            else:
+                yield from _extract_summarized_rows(cospars, tle_file, mapped_lines(tle_file), precise_epoch, monitor, error_summary, tle_filter, columns)
+        else:
+            yield from _cached_file_rows(cospars, parts, precise_epoch, monitor, error_summary, tle_filter, columns)
+        
+        # A cancelled file is not done.
+        if not monitor.is_cancelled():
+            monitor.finish_file(tle_file)
+    
+    cache.log()
+
+def _read_cached_parts(tle_file, compression, cache, key):
+    """Reads and validates the TLEs of a file, and keeps them in the cache.
+    
+    :return: The parts of the file, see :meth:`RecordCache.put`, or None if the file is too large to be kept.
+    :rtype: list
+    """
+    
+    # The TLEs take about three times the size of the file in memory. The
+    # compressed files are only checked once read.
+    if 3 * key[2] > cache.budget:
+        logger.info(tle_file + " is too large to be kept in the cache.")
+        return None
+    
+    parts = []
+    size = 0
+    
+    failures = []
+    
+    if compression is not None:
+        logger.debug("Decompressing " + tle_file + " (" + compression + ").")
+        members = archive_lines(tle_file, compression, failures)
+    else:
+        members = [(tle_file, mapped_lines(tle_file))]
+    
+    for member, lines in members:
+        errors = _InvalidTLEs()
+        tles = list(validated_tles(member, lines, errors))
+        characters = sum(len(line1) + len(line2) + len(name) for i, name, line1, line2, j in tles)
+        
+        parts.append((member, tles, errors, characters + 2 * len(tles)))
+        size += characters + CACHED_TLE_OVERHEAD * len(tles)
+    
+    if failures:
+        # The file is not kept, so that it is read again next time.
+        logger.error(tle_file + " is not a valid " + compression + " file (" + str(failures[0]) + ").")
+        return parts
+    
+    cache.put(key, parts, size)
+    
+    return parts
+
+def _cached_file_rows(cospars, parts, precise_epoch, monitor, error_summary, tle_filter, columns):
+    """Yields the rows of the valid TLEs of a cached file, and reports its invalid TLEs again.
+    
+    ..seealso:: :func:`_selected_rows`
+    """
+    
+    for member, tles, invalid_tles, bytes_count in parts:
+        errors = ErrorSummary() if error_summary else None
+        
+        for validation, line_number, line2_number in invalid_tles:
+            _report_invalid_tle(member, validation, line_number, line2_number, errors)
+        
+        if errors is not None:
+            errors.log(member)
+        
+        monitor.update(0, 0, len(invalid_tles))
+        stages = _StageTimer(monitor.profile, member) if monitor.profile is not None else None
+        
+        try:
+            yield from _selected_rows(cospars, _cached_progress(tles, bytes_count, monitor), precise_epoch, tle_filter, columns, stages)
+        finally:
+            if stages is not None:
+                stages.save()
+        
+        if monitor.is_cancelled():
+            return
+
+def _cached_progress(tles, bytes_count, monitor):
+    """Yields the cached TLEs of a file, giving the progress to the monitor by blocks of :data:`PROGRESS_INTERVAL` TLEs, with their average size."""
+    
+    tle_bytes = bytes_count // len(tles) if tles else 0
+    
+    for start in range(0, len(tles), PROGRESS_INTERVAL):
+        block = tles[start:start + PROGRESS_INTERVAL]
+        
+        yield from block
+        
+        monitor.update(len(block) * tle_bytes, len(block), 0)
+        
+        if monitor.is_cancelled():
+            return
+
+def _extract_rows_parallel(cospars, tle_files, workers, chunk_size, precise_epoch, monitor, error_summary, tle_filter, columns):
+    """Extracts the rows of the pieces of the files in a pool of processes.
+    
+    Only a few pieces are submitted ahead of the one being yielded, so that the
+    memory usage stays bounded. When the extraction is cancelled, the pieces
+    which are not started yet are dropped.
+    
+    ..seealso:: :func:`extract_rows`
+    """
+    
+    # The summaries of the errors of the pieces are merged until the last piece
+    # of their file.
+    summaries = {} if error_summary else None
+    # Number of the lines of the pieces collected, for each file being
+    # extracted.
+    lines_counts = {}
+    
+    with process_pool(workers) as executor:
+        pending = collections.deque()
+        
+        for tle_file in tle_files:
+            logger.debug("Splitting " + tle_file + ".")
+            try:
+                compression = compression_format(tle_file)
+                ranges = split_file(tle_file, chunk_size) if compression is None else []
+            except FileNotFoundError:
+                logger.error("Unable to find " + tle_file + ".")
+                monitor.finish_file(tle_file)
+                continue
+            
+            # The compressed files can not be split: they are extracted by this
+            # process once the pieces before them are done.
+            if compression is not None:
+                while pending:
+                    yield from _collect_range(*pending.popleft(), monitor, lines_counts, summaries)
+                
+                yield from _extract_archive_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, columns)
+                
+                if monitor.is_cancelled():
+                    return
+                
+                monitor.finish_file(tle_file)
+                continue
+            
+            # Empty files are done at once.
+            if not ranges:
+                monitor.finish_file(tle_file)
+            
+            for range_index, (start, end) in enumerate(ranges):
+                future = executor.submit(_extract_range, cospars, tle_file, start, end, precise_epoch, error_summary, monitor.profile is not None, tle_filter, columns)
+                pending.append((future, tle_file, range_index == len(ranges) - 1))
+                
+                if len(pending) > 2 * workers:
+                    yield from _collect_range(*pending.popleft(), monitor, lines_counts, summaries)
+                
+                if monitor.is_cancelled():
+                    for future, tle_file, is_last in pending:
+                        future.cancel()
+                    return
+        
+        while pending:
+            yield from _collect_range(*pending.popleft(), monitor, lines_counts, summaries)
+            
+            if monitor.is_cancelled():
+                for future, tle_file, is_last in pending:
+                    future.cancel()
+                return
+
+def _collect_range(future, tle_file, is_last, monitor, lines_counts, summaries=None):
+    """Replays the log records of an extracted range and yields its rows.
+    
+    The lines of the range were numbered from 1, they are numbered again after
+    the lines of the previous ranges of the file, counted in the
+    ``lines_counts`` dictionary. The errors of the range are reported, or
+    merged in the summary of its file, in the ``summaries`` dictionary, which
+    is logged after the last range of the file. The measures of the range are
+    merged in the profile of the monitor.
+    """
+    
+    rows, records, counts, errors, profile, lines_count = future.result()
+    line_offset = lines_counts.pop(tle_file, 0)
+    
+    for record in records:
+        if getattr(record, "line_numbers", False):
+            record.args = tuple(line_number + line_offset for line_number in record.args)
+        
+        logger.handle(record)
+    
+    if profile is not None:
+        monitor.profile.merge(profile)
+    
+    if summaries is not None:
+        summaries.setdefault(tle_file, ErrorSummary()).merge(errors, line_offset)
+    else:
+        for validation, line_number, line2_number in errors:
+            _report_invalid_tle(tle_file, validation, line_number + line_offset, line2_number + line_offset)
+    
+    yield from rows
+    
+    monitor.update(*counts)
+    if is_last:
+        if summaries is not None:
+            summaries.pop(tle_file).log(tle_file)
+        
+        monitor.finish_file(tle_file)
+    else:
+        lines_counts[tle_file] = line_offset + lines_count
+
+def process_pool(workers):
+    """Creates a pool of worker processes for the extractions.
+    
+    The workers log at the level of this process, but their records must be
+    sent back to it to be logged, see :class:`RecordCollector`.
+    
+    :param workers: Number of processes, or None for one per processor.
+    :type workers: int
+    :rtype: concurrent.futures.ProcessPoolExecutor
+    """
+    
+    # Imported here, since it takes half the time of importing this module,
+    # which matters for the short extractions of the command line.
+    from concurrent.futures import ProcessPoolExecutor
+    
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(logger.getEffectiveLevel(),))
+
+class RecordCollector(logging.Handler):
+    """Keeps the log records of a worker process, to be replayed in the main one."""
+    
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+        
+    def emit(self, record):
+        self.records.append(record)
+
+def _init_worker(level):
+    """Sets up the logging of a worker process of :func:`_extract_rows_parallel`."""
+    
+    # The handlers inherited from the main process are dropped: the records are
+    # sent back to the main process, which logs them in order.
+    root_logger = logging.getLogger()
+    root_logger.handlers = []
+    root_logger.setLevel(level)
+    
+    # The forked processes inherit the capture of a profiled extraction, which
+    # only covers the main process, see :class:`ExtractionProfile`.
+    sys.setprofile(None)
+    
+    if "tracemalloc" in sys.modules:
+        sys.modules["tracemalloc"].stop()
+
+def _extract_range(cospars, tle_file, start, end, precise_epoch, error_summary=False, profiled=False, tle_filter=None, columns=None):
+    """Extracts the rows of a byte range of a file, in a worker process.
+    
+    The lines are numbered from the start of the range, and the errors are
+    kept rather than logged, to be reported by the main process with the line
+    numbers of the file, see :func:`_collect_range`.
+    
+    :return: Tuple of the list of rows, the list of log records, the counts to give to :meth:`ExtractionMonitor.update`, the errors of the range (an :class:`ErrorSummary` with ``error_summary``, the list of the validations and line numbers of the invalid TLEs otherwise), the :class:`ExtractionProfile` of the range (None unless ``profiled``) and the number of lines of the range.
+    :rtype: tuple
+    
+    ..seealso:: :func:`split_file`
+    """
+    
+    collector = RecordCollector()
+    logger.addHandler(collector)
+    monitor = ExtractionMonitor(profile=ExtractionProfile() if profiled else None)
+    errors = ErrorSummary() if error_summary else _InvalidTLEs()
+    lines_count = 0
+    
+    def counted(numbered_lines):
+        nonlocal lines_count
+        
+        for line_number, line in numbered_lines:
+            lines_count = line_number
+            yield line_number, line
+    
+    try:
+        lines = counted(mapped_lines(tle_file, start, end))
+        rows = list(_extract_file_rows(cospars, tle_file, lines, precise_epoch, monitor, errors, tle_filter, columns))
+    finally:
+        logger.removeHandler(collector)
+    
+    return rows, collector.records, (end - start, monitor.accepted, monitor.rejected), errors, monitor.profile, lines_count
+
+def _extract_archive_rows(cospars, tle_file, compression, precise_epoch=False, monitor=None, error_summary=False, tle_filter=None, columns=None):
+    """Yields the CSV rows of the TLEs found in the members of a compressed file.
+    
+    ..seealso:: :func:`archive_lines`, :func:`extract_rows`
+    """
+    
+    logger.debug("Decompressing " + tle_file + " (" + compression + ").")
+    failures = []
+    
+    for member, lines in archive_lines(tle_file, compression, failures):
+        yield from _extract_summarized_rows(cospars, member, lines, precise_epoch, monitor, error_summary, tle_filter, columns)
+        
+        if monitor is not None and monitor.is_cancelled():
+            return
+    
+    if failures:
+        logger.error(tle_file + " is not a valid " + compression + " file (" + str(failures[0]) + ").")
+
+def _extract_summarized_rows(cospars, tle_file, numbered_lines, precise_epoch=False, monitor=None, error_summary=False, tle_filter=None, columns=None):
+    """Yields the rows of the TLEs of one file, then logs the summary of its errors if asked.
+    
+    ..seealso:: :func:`_extract_file_rows`, :class:`ErrorSummary`
+    """
+    
+    errors = ErrorSummary() if error_summary else None
+    
+    yield from _extract_file_rows(cospars, tle_file, numbered_lines, precise_epoch, monitor, errors, tle_filter, columns)
+    
+    if errors is not None:
+        errors.log(tle_file)
+
+class ErrorSummary:
+    """Counts the errors of the TLEs of a file instead of logging each of them.
+    
+    On files with many invalid TLEs, logging one message per TLE takes most of
+    the time of the extraction and floods the log. The summary is logged once
+    the file is done, with one message per kind of error, see :meth:`log`.
+    """
+    
+    # Message of each kind of error.
+    MESSAGES = [
+        (TLE_BAD_FORMAT, "bad format"),
+        (TLE_BAD_CHECKSUM1, "checksum verification failed on the first line"),
+        (TLE_BAD_CHECKSUM2, "checksum verification failed on the second line"),
+        (TLE_DIFFERENT_SATNUMS, "different satellite numbers"),
+        (TLE_INCOMPLETE, "missing lines")]
+    
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.first_lines = {}
+        
+    def add(self, errors, line_number, line2_number):
+        """Counts the errors of a TLE, combined like the results of :func:`validate_tle`.
+        
+        The TLEs are found by the number of their first line, except for the
+        checksums of the second lines.
+        """
+        
+        # The checksums are not checked when the format is bad.
+        if errors & TLE_BAD_FORMAT:
+            errors = TLE_BAD_FORMAT
+        
+        for error, message in self.MESSAGES:
+            if errors & error:
+                self.counts[error] += 1
+                
+                if error not in self.first_lines:
+                    self.first_lines[error] = line2_number if error == TLE_BAD_CHECKSUM2 else line_number
+        
+    def merge(self, other, line_offset=0):
+        """Adds the counts of the summary of another part of the same file.
+        
+        :param other: The summary of the other part.
+        :type other: ErrorSummary
+        :param line_offset: Number of the lines before the other part, when its lines are numbered from its start.
+        :type line_offset: int
+        """
+        
+        self.counts.update(other.counts)
+        
+        for error, line_number in other.first_lines.items():
+            line_number += line_offset
+            self.first_lines[error] = min(line_number, self.first_lines.get(error, line_number))
+        
+    def log(self, tle_file):
+        """Logs the summary of the errors of the file."""
+        
+        for error, message in self.MESSAGES:
+            if self.counts[error]:
+                logger.error("In %s, %d TLEs: %s (first at line %d).", tle_file, self.counts[error], message, self.first_lines[error])
+
+def _extract_file_rows(cospars, tle_file, numbered_lines, precise_epoch=False, monitor=None, errors=None, tle_filter=None, columns=None):
+    """Yields the CSV rows of the TLEs found in the lines of one file.
+    
+    The TLEs are validated by :func:`validated_tles`, which gives the counts
+    to the monitor and stops if the extraction was cancelled, then selected
+    and decoded by :func:`_selected_rows`. The errors are logged for each TLE,
+    or counted in ``errors`` when it is an :class:`ErrorSummary`.
+    
+    When the monitor has a profile, the stages are measured by a
+    :class:`_StageTimer`, whose measures are added to the profile when the
+    file is done or stopped. The other extractions do not pay for them.
+    
+    ..seealso:: :func:`extract_rows`
+    """
+    
+    stages = _StageTimer(monitor.profile, tle_file) if monitor is not None and monitor.profile is not None else None
+    tles = validated_tles(tle_file, numbered_lines, errors, monitor, stages)
+    
+    try:
+        yield from _selected_rows(cospars, tles, precise_epoch, tle_filter, columns, stages)
+    finally:
+        if stages is not None:
+            stages.save()
+
+def validated_tles(tle_file, numbered_lines, errors=None, monitor=None, stages=None):
+    """Yields the valid TLEs found in the lines of one file, and reports the invalid ones.
+    
+    The counts are given to the monitor every :data:`PROGRESS_INTERVAL` TLEs,
+    and the validation stops there if the extraction was cancelled. The TLEs
+    are decoded by :func:`_selected_rows`, or chosen by the caller, see
+    :mod:`batch`.
+    
+    :param tle_file: Path of the file, for the messages.
+    :type tle_file: str
+    :param numbered_lines: Iterable of ``(line_number, line)`` tuples, see :func:`mapped_lines`.
+    :type numbered_lines: iterable
+    :param errors: Counts the errors instead of logging them, see :class:`ErrorSummary`.
+    :type errors: ErrorSummary
+    :param monitor: Progress of the extraction, or None.
+    :type monitor: ExtractionMonitor
+    :param stages: Measures of the stages when the extraction is profiled, or None.
+    :type stages: _StageTimer
+    :return: Generator of ``(line_number, name, line1, line2, line2_number)`` tuples, like :func:`frame_tles`.
+    :rtype: generator
+    """
+    
+    bytes_read = 0
+    accepted = 0
+    rejected = 0
+    
+    # The level is checked once per file: the debug messages are not even
+    # built in the loop when they are not logged.
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    tles = frame_tles(numbered_lines)
+    validate = validate_tle
+    
+    if stages is not None:
+        tles = stages.framed(tles)
+        validate = stages.validate
+    
+    for framed in tles:
+        i, name, line1, line2, j = framed
+        
+        if accepted + rejected == PROGRESS_INTERVAL and monitor is not None:
+            monitor.update(bytes_read, accepted, rejected)
+            bytes_read = accepted = rejected = 0
+            
+            if monitor.is_cancelled():
+                return
+        
+        # The line endings are counted as one byte.
+        bytes_read += len(line1) + len(line2) + 2
+        
+        if debug:
+            logger.debug("Scaning lines %d and %d.", i, j, extra=LINE_NUMBERS)
+        
+        validation = validate(line1, line2)
+        
+        if validation != TLE_VALID:
+            # A line alone is reported as such rather than as badly formatted.
+            if not (line1 and line2):
+                validation = TLE_INCOMPLETE
+        elif line1[SATNUM] != line2[SATNUM]:
+            validation = TLE_DIFFERENT_SATNUMS
+        
+        if validation != TLE_VALID:
+            rejected += 1
+            
+            if stages is not None:
+                stages.reject(validation)
+            
+            _report_invalid_tle(tle_file, validation, i, j, errors)
+            continue
+        
+        if debug:
+            logger.debug("Good format.")
+        
+        accepted += 1
+        
+        yield framed
+    
+    if monitor is not None:
+        monitor.update(bytes_read, accepted, rejected)
+
+def _selected_rows(cospars, tles, precise_epoch=False, tle_filter=None, columns=None, stages=None):
+    """Yields the CSV rows of the valid TLEs of the satellites and the filter.
+    
+    The TLEs are kept when their designator is in the ``cospars`` set, or
+    always when it is None. The satellite and the filter are checked on the
+    raw columns, so that only the kept TLEs are decoded, with the selected
+    columns only, see :func:`column_decoder`.
+    
+    :param tles: Iterable of valid ``(line_number, name, line1, line2, line2_number)`` tuples, see :func:`validated_tles`.
+    :type tles: iterable
+    :param stages: Measures of the stages when the extraction is profiled, or None.
+    :type stages: _StageTimer
+    :return: Generator of :class:`TLERecord`.
+    :rtype: generator
+    """
+    
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    decode = column_decoder(columns, precise_epoch) if columns is not None else None
+    decode_record = decode_tle
+    
+    if stages is not None:
+        decode_record = stages.decode_tle
+        
+        if decode is not None:
+            decode = stages.decoder(decode)
+    
+    for i, name, line1, line2, j in tles:
+        if (cospars is None or line1[COSPAR].strip() in cospars) and (tle_filter is None or tle_filter.accepts(line1, line2)):
+            if debug:
+                logger.debug("Convert TLE in lines %d and %d.", i, j, extra=LINE_NUMBERS)
+            
+            if decode is None:
+                yield decode_record(line1, line2, precise_epoch, name)
+            else:
+                yield decode(line1, line2, name)
+        elif debug:
+            logger.debug("This TLE does not correspond to the asked satellite or filter.")
+
+def _report_invalid_tle(tle_file, validation, line_number, line2_number, errors=None):
+    """Logs the errors of an invalid TLE, or counts them in ``errors`` when it is an :class:`ErrorSummary`."""
+    
+    if errors is not None:
+        errors.add(validation, line_number, line2_number)
+    elif validation & TLE_INCOMPLETE:
+        logger.error("In %s, line %d: the other lines of the TLE are missing.", tle_file, line_number)
+    elif validation & TLE_BAD_FORMAT:
+        logger.error("In %s, lines %d and %d: bad format.", tle_file, line_number, line2_number)
+    elif validation & TLE_DIFFERENT_SATNUMS:
+        logger.error("Different satellite number for lines %d and %d.", line_number, line2_number)
+    else:
+        if validation & TLE_BAD_CHECKSUM1:
+            logger.error("In %s, line %d: checksum verification failed.", tle_file, line_number)
+        if validation & TLE_BAD_CHECKSUM2:
+            logger.error("In %s, line %d: checksum verification failed.", tle_file, line2_number)
+
+class _StageTimer:
+    """Measures the stages of the TLEs of a file for an :class:`ExtractionProfile`.
+    
+    Its methods replace the steps of :func:`validated_tles` and
+    :func:`_selected_rows` when the extraction is profiled: the checks of
+    :func:`validate_tle` and the conversions of :func:`decode_tle` are made
+    one by one, so that their durations are measured separately.
+    
+    :param profile: The profile of the extraction.
+    :type profile: ExtractionProfile
+    :param tle_file: Path of the file.
+    :type tle_file: str
+    """
+    
+    def __init__(self, profile, tle_file):
+        self.profile = profile
+        self.tle_file = tle_file
+        # Seconds, items and bytes of each stage.
+        self.stages = {stage: [0.0, 0, 0] for stage in ExtractionProfile.FILE_STAGES}
+    
+    def framed(self, tles):
+        """Yields the TLEs of :func:`frame_tles`, measuring the reading and the pairing of their lines."""
+        
+        clock = time.perf_counter
+        read = self.stages["read"]
+        
+        while True:
+            start_time = clock()
+            tle = next(tles, None)
+            read[0] += clock() - start_time
+            
+            if tle is None:
+                return
+            
+            read[1] += 1
+            # The line endings are counted as one byte.
+            read[2] += len(tle[2]) + len(tle[3]) + 2
+            
+            yield tle
+    
+    def validate(self, line1, line2):
+        """Checks a TLE like :func:`validate_tle`, measuring the format and the checksums apart."""
+        
+        clock = time.perf_counter
+        
+        start_time = clock()
+        well_formatted = TLE_REGEX[0].match(line1) and TLE_REGEX[1].match(line2)
+        self._add("format", clock() - start_time)
+        
+        if not well_formatted:
+            return TLE_BAD_FORMAT
+        
+        start_time = clock()
+        validation = _checksum_errors(line1, line2)
+        self._add("checksum", clock() - start_time)
+        
+        return validation
+    
+    def reject(self, validation):
+        """Counts a rejected TLE, see :meth:`ExtractionProfile.reject`."""
+        
+        self.profile.reject(self.tle_file, validation)
+    
+    def decode_tle(self, line1, line2, precise_epoch=False, name=""):
+        """Decodes a TLE like :func:`decode_tle`, measuring the epoch and the other fields apart."""
+        
+        clock = time.perf_counter
+        
+        start_time = clock()
+        tle_epoch = epoch_to_datetime(line1[EPOCH], precise_epoch)
+        middle_time = clock()
+        record = _tle_record(line1, line2, tle_epoch, name)
+        end_time = clock()
+        
+        self._add("epoch", middle_time - start_time)
+        self._add("decode", end_time - middle_time)
+        
+        return record
+    
+    def decoder(self, decode):
+        """Measures a decoder of :func:`column_decoder`, the epoch being measured with the other fields."""
+        
+        clock = time.perf_counter
+        
+        def timed_decode(line1, line2, name=""):
+            start_time = clock()
+            record = decode(line1, line2, name)
+            self._add("decode", clock() - start_time)
+            
+            return record
+        
+        return timed_decode
+    
+    def _add(self, stage, seconds):
+        measures = self.stages[stage]
+        measures[0] += seconds
+        measures[1] += 1
+    
+    def save(self):
+        """Adds the measures to the profile."""
+        
+        for stage, measures in self.stages.items():
+            self.profile.add(self.tle_file, stage, *measures)
+
+def satellite_output_file(output_file, cospar):
+    """Builds the name of the output file of a satellite, by adding its designator before the extension.
+    
+    For instance, the output file of 98067A for "output.csv" is "output_98067A.csv".
+    
+    :param output_file: Path of the output file of the extraction.
+    :type output_file: str
+    :param cospar: International or COSPAR designator / NSSDC ID.
+    :type cospar: str
+    :return: Path of the output file of the satellite.
+    :rtype: str
+    """
+    
+    root, extension = os.path.splitext(output_file)
+    
+    return root + "_" + cospar + extension
+
+def _open_writer(output_file, output_format, append, columns=None):
+    """Opens a writer of the output file, see :func:`writers.open_writer`.
+    
+    :return: The writer, None if the output file cannot be written.
+    :rtype: writers.Writer
+    """
+    
+    # Imported here since the writers use this module.
+    import writers
+    
+    try:
+        return writers.open_writer(output_file, output_format, append, columns)
+    except PermissionError:
+        logger.error("Impossible to write in " + output_file + ".")
+    except ImportError as error:
+        logger.error("The module " + str(error.name) + " is needed to write " + output_file + ".")
+    except ValueError as error:
+        logger.error(str(error))
+    
+    return None
+
+def _write_per_satellite(rows, output_file, append=False, output_format=None, columns=None):
+    """Writes the rows in one output file per satellite, see :func:`satellite_output_file`.
+    
+    :return: True if data was written, False if there was nothing to extract, None if an output file cannot be written.
+    :rtype: bool
+    """
+    
+    writers = {}
+    
+    with contextlib.ExitStack() as outputs:
+        for row in rows:
+            writer = writers.get(row.cospar)
+            
+            if writer is None:
+                writer = _open_writer(satellite_output_file(output_file, row.cospar), output_format, append, columns)
+                
+                if writer is None:
+                    return None
+                
+                writers[row.cospar] = outputs.enter_context(writer)
+            
+            writer.write(row)
+    
+    if not writers:
+        if append:
+            logger.info("There was no new data to extract.")
+        else:
+            logger.warning("There was no data extracted. No output file will be created.")
+        return False
+    
+    for cospar in writers:
+        logger.info("Wrote " + satellite_output_file(output_file, cospar) + ".")
+    
+    return True
+
+def row_sort_key(row):
+    """Returns the key of a row in :func:`sorted_rows`: satellite number, epoch and element number."""
+    
+    return row.satnum, epoch_key(row.epoch), row.eltnum
+
+def _spill_run(rows):
+    """Writes sorted rows in a temporary file, deleted once closed.
+    
+    :param rows: Iterable of sorted rows, consumed by batches of :data:`SORT_BATCH_SIZE` rows.
+    :type rows: iterable
+    :return: The temporary file, at its beginning.
+    :rtype: file
+    """
+    
+    # Imported here, since the rows are only spilled by the large sorts.
+    import pickle
+    import tempfile
+    
+    run_file = tempfile.TemporaryFile()
+    rows = iter(rows)
+    
+    while True:
+        batch = list(itertools.islice(rows, SORT_BATCH_SIZE))
+        if not batch:
+            break
+        
+        pickle.dump(batch, run_file, pickle.HIGHEST_PROTOCOL)
+    
+    run_file.seek(0)
+    return run_file
+
+def _read_run(run_file):
+    """Yields the rows of a temporary file written by :func:`_spill_run`, then closes it."""
+    
+    import pickle
+    
+    with run_file:
+        while True:
+            try:
+                batch = pickle.load(run_file)
+            except EOFError:
+                return
+            
+            yield from batch
+
+def _merge_runs(run_files):
+    """Merges the temporary files of sorted rows, see :func:`sorted_rows`.
+    
+    :return: Generator of the sorted rows.
+    :rtype: generator
+    """
+    
+    import heapq
+    
+    # Only SORT_FAN_IN files are read at once: the groups of files are merged
+    # into new files until there are few enough of them.
+    while len(run_files) > SORT_FAN_IN:
+        logger.debug("Merging " + str(len(run_files)) + " sorted runs.")
+        groups = [run_files[i:i + SORT_FAN_IN] for i in range(0, len(run_files), SORT_FAN_IN)]
+        run_files = [_spill_run(heapq.merge(*[_read_run(run_file) for run_file in group], key=row_sort_key)) for group in groups]
+    
+    return heapq.merge(*[_read_run(run_file) for run_file in run_files], key=row_sort_key)
+
+def sorted_rows(rows, deduplicate=False):
+    """Sorts the rows by satellite number, epoch and element number.
+    
+    The memory usage is bounded: the rows are sorted by runs of
+    :data:`SORT_RUN_SIZE` rows, which are written in temporary files and then
+    merged lazily, :data:`SORT_FAN_IN` files at a time. When all the rows fit
+    in a single run, no file is written. The rows with the same key keep their
+    order.
+    
+    :param rows: Iterable of :class:`TLERecord`.
+    :type rows: iterable
+    :param deduplicate: Whether to drop the rows whose key is the same as the previous row, i.e. the same TLE found several times.
+    :type deduplicate: bool
+    :return: Generator of the sorted rows.
+    :rtype: generator
+    
+    ..seealso:: :func:`row_sort_key`
+    """
+    
+    rows = iter(rows)
+    run_files = []
+    
+    try:
+        while True:
+            run = sorted(itertools.islice(rows, SORT_RUN_SIZE), key=row_sort_key)
+            
+            if len(run) < SORT_RUN_SIZE:
+                break
+            
+            run_files.append(_spill_run(run))
+    except BaseException:
+        for run_file in run_files:
+            run_file.close()
+        raise
+    
+    if run_files:
+        if run:
+            run_files.append(_spill_run(run))
+        
+        merged = _merge_runs(run_files)
+    else:
+        merged = iter(run)
+    
+    del run
+    previous_key = None
+    
+    for row in merged:
+        if deduplicate:
+            key = row_sort_key(row)
+            
+            if key == previous_key:
+                continue
+            
+            previous_key = key
+        
+        yield row
+
+def hash_content(tle_file, end):
+    """Hashes the beginning of a file, up to the given offset.
+    
+    Only the first and the last :data:`HASH_BLOCK_SIZE` bytes are hashed, with
+    the offset, so that the hash of a large file is quick to compute. This is
+    enough to detect a file which was replaced or rewritten, since the TLEs
+    hold their epochs and checksums.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :param end: Offset of the end of the hashed content.
+    :type end: int
+    :return: Hexadecimal SHA-1 digest.
+    :rtype: str
+    :raise FileNotFoundError: If the file does not exist.
+    """
+    
+    # Imported here, like json, since they are only used by the incremental
+    # extractions.
+    import hashlib
+    
+    content_hash = hashlib.sha1(str(end).encode("ascii"))
+    
+    with open(tle_file, "rb") as file:
+        content_hash.update(file.read(min(end, HASH_BLOCK_SIZE)))
+        
+        if end > HASH_BLOCK_SIZE:
+            file.seek(max(end - HASH_BLOCK_SIZE, HASH_BLOCK_SIZE))
+            content_hash.update(file.read(end - file.tell()))
+    
+    return content_hash.hexdigest()
+
+def resume_point(tle_file, start, end, line_number):
+    """Finds where the extraction of a growing file should resume.
+    
+    This is the end of the last second line of TLE which has its line ending,
+    since a line without line ending may still be being written. The name and
+    the first line of the next TLE may already be there, see :func:`frame_tles`.
+    
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :param start: Offset of the first line of the extracted part of the file, in bytes.
+    :type start: int
+    :param end: Offset of the end of the extracted part of the file, in bytes.
+    :type end: int
+    :param line_number: Number of the first line of the extracted part of the file.
+    :type line_number: int
+    :return: Tuple of the offset and of the number of the line at which to resume.
+    :rtype: tuple
+    :raise FileNotFoundError: If the file does not exist.
+    """
+    
+    if end <= start:
+        return start, line_number
+    
+    with open(tle_file, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    with mapped:
+        line_ending = _line_ending(mapped, start, end)
+        position = start
+        resume = (start, line_number)
+        
+        while True:
+            line_end = mapped.find(line_ending, position, end)
+            
+            if line_end == -1:
+                return resume
+            
+            line_number += 1
+            
+            if _is_line2(mapped[position:line_end]):
+                resume = (line_end + 1, line_number)
+            
+            position = line_end + 1
+
+def epoch_key(epoch):
+    """Converts an epoch string of the rows to a value which can be compared.
+    
+    The times are not padded with zeros when the epochs are not precise, so the
+    strings can not be compared directly.
+    """
+    
+    date_str, time_str = epoch.split(" ")
+    hours, minutes, seconds = time_str.split(":")
+    
+    return date_str, int(hours), int(minutes), float(seconds)
+
+def incremental_settings(cospars, precise_epoch, per_satellite, tle_filter=None, columns=None):
+    """Returns the settings of an incremental extraction, which must not change between two extractions, see :func:`load_state`."""
+    
+    settings = {"cospars": sorted(cospars) if cospars is not None else None, "precise_epoch": precise_epoch, "per_satellite": per_satellite}
+    
+    # The filter and the columns are only written when they are set, so that
+    # the states of the previous extractions stay valid.
+    if tle_filter is not None:
+        settings["filter"] = tle_filter.expressions
+    if columns is not None:
+        settings["columns"] = list(columns)
+    
+    return settings
+
+def new_state(settings):
+    """Returns the state of an incremental extraction which did not extract anything yet, see :func:`load_state`."""
+    
+    return {"version": STATE_VERSION, "settings": settings, "files": {}, "last_epochs": {}}
+
+def load_state(output_file, settings):
+    """Loads the state of the incremental extraction into the output file.
+    
+    The state is saved next to the output file, with the :data:`STATE_SUFFIX`
+    suffix. It is a JSON dictionary with:
+    
+    * ``settings``: the settings of the extraction, which must not change;
+    * ``files``: for each TLE file (absolute path), its ``size``, its ``mtime``
+      (in nanoseconds), and the ``offset`` and ``line_number`` at which to
+      resume its extraction, with the ``hash`` of its content up to there (see
+      :func:`hash_content`), and ``cancelled`` when its previous extraction
+      was cancelled after some of its rows were written;
+    * ``last_epochs``: for each satellite number, the last epoch written.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param settings: The settings of the extraction.
+    :type settings: dict
+    :return: The state, or None if there is no usable state and the extraction must start over.
+    :rtype: dict
+    """
+    
+    import json
+    
+    state_file = output_file + STATE_SUFFIX
+    
+    try:
+        with open(state_file, "r") as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        logger.info("No previous extraction into " + output_file + ", all the files will be extracted.")
+        return None
+    
+    if state.get("version") != STATE_VERSION or state.get("settings") != settings:
+        logger.info("The settings of the extraction into " + output_file + " changed, all the files will be extracted.")
+        return None
+    
+    return state
+
+def save_state(output_file, state):
+    """Saves the state of the incremental extraction, see :func:`load_state`."""
+    
+    import json
+    
+    state_file = output_file + STATE_SUFFIX
+    temporary_file = state_file + "." + str(os.getpid())
+    
+    try:
+        with open(temporary_file, "w") as file:
+            json.dump(state, file, indent=1, sort_keys=True)
+        os.replace(temporary_file, state_file)
+    except OSError:
+        logger.error("Impossible to write " + state_file + ", the next extraction will start over.")
+
+def _resume_plan(tle_file, entry, stat, compression):
+    """Finds which part of a file must be extracted since the previous incremental extraction.
+    
+    :param entry: State of the file after the previous extraction, None if it is new.
+    :type entry: dict
+    :return: Tuple of the offset and of the number of the first line to extract, and of whether only the TLEs more recent than the last epochs written must be kept, or None if the file did not change.
+    :rtype: tuple
+    
+    ..seealso:: :func:`_extract_incrementally`
+    """
+    
+    if entry is None:
+        return 0, 1, False
+    elif entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+        logger.debug(tle_file + " did not change.")
+        return None
+    elif compression is None and stat.st_size >= entry["offset"] and hash_content(tle_file, entry["offset"]) == entry["hash"]:
+        logger.info(tle_file + " grew, extracting its end.")
+        # The end of the file was never extracted, so all its TLEs are kept,
+        # even the ones older than the last epoch written for their satellite,
+        # unless some of them were written by a cancelled extraction.
+        return entry["offset"], entry["line_number"], entry.get("cancelled", False)
+    else:
+        logger.info(tle_file + " changed, extracting its new TLEs.")
+        return 0, 1, True
+
+def _state_entry(tle_file, stat, compression, start, line_number):
+    """Returns the state of a file extracted from the given offset to its end, see :func:`load_state`.
+    
+    The compressed files are always extracted from their beginning.
+    """
+    
+    if compression is not None:
+        return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "offset": 0, "line_number": 1, "hash": None}
+    
+    offset, next_line_number = resume_point(tle_file, start, stat.st_size, line_number)
+    
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "offset": offset, "line_number": next_line_number, "hash": hash_content(tle_file, offset)}
+
+def extract_changes(cospars, tle_file, entry, last_epochs, precise_epoch=False, error_summary=False, tle_filter=None, columns=None):
+    """Extracts the TLEs of a file which are new since its previous incremental extraction.
+    
+    This is what :func:`data_extract` does for each file with ``incremental``,
+    made to run in a worker process (see :func:`process_pool`): the rows are
+    returned at once, and the log records too, to be logged by the main
+    process.
+    
+    :param cospars: Set of designators, or None for all satellites.
+    :type cospars: set
+    :param tle_file: Path of the TLE file.
+    :type tle_file: str
+    :param entry: State of the file after the previous extraction, None if it is new, see :func:`load_state`.
+    :type entry: dict
+    :param last_epochs: Last epoch written for each satellite number.
+    :type last_epochs: dict
+    :param precise_epoch: Whether to keep the microseconds of the epochs, see :func:`epoch_to_datetime`.
+    :type precise_epoch: bool
+    :param error_summary: Whether to log a summary of the errors of the file instead of one message per invalid TLE, see :class:`ErrorSummary`.
+    :type error_summary: bool
+    :param tle_filter: Conditions on the fields of the TLEs, checked before they are decoded.
+    :type tle_filter: TLEFilter
+    :param columns: Keys of the fields to decode, see :func:`decoded_columns`, or None for all of them.
+    :type columns: tuple
+    :return: Tuple of the list of new rows, of the list of log records and of the new state of the file, None if it did not change or could not be read.
+    :rtype: tuple
+    """
+    
+    collector = RecordCollector()
+    logger.addHandler(collector)
+    rows = []
+    
+    try:
+        stat = os.stat(tle_file)
+        compression = compression_format(tle_file)
+        plan = _resume_plan(tle_file, entry, stat, compression)
+        
+        if plan is None:
+            return rows, collector.records, None
+        
+        start, line_number, filtered = plan
+        previous_epochs = {satnum: epoch_key(epoch) for satnum, epoch in last_epochs.items()} if filtered else {}
+        
+        if compression is not None:
+            file_rows = _extract_archive_rows(cospars, tle_file, compression, precise_epoch, error_summary=error_summary, tle_filter=tle_filter, columns=columns)
+        else:
+            file_rows = _extract_summarized_rows(cospars, tle_file, mapped_lines(tle_file, start, stat.st_size, line_number), precise_epoch, error_summary=error_summary, tle_filter=tle_filter, columns=columns)
+        
+        for row in file_rows:
+            if row.satnum not in previous_epochs or epoch_key(row.epoch) > previous_epochs[row.satnum]:
+                rows.append(row)
+        
+        return rows, collector.records, _state_entry(tle_file, stat, compression, start, line_number)
+    except FileNotFoundError:
+        logger.error("Unable to find " + tle_file + ".")
+        return rows, collector.records, None
+    finally:
+        logger.removeHandler(collector)
+
+def _extract_incrementally(cospars, tle_files, output_file, precise_epoch, per_satellite, output_format, order, monitor, error_summary, tle_filter, columns, decoded):
+    """Extracts only the new TLEs since the previous extraction into the output file.
+    
+    The new files are fully extracted. The files which grew since the previous
+    extraction, with the same beginning, are extracted from where it stopped,
+    keeping all the TLEs of their end. The other changed files are extracted
+    again, but only the TLEs more recent than the last epoch written for their
+    satellite are kept. The rows are appended to the output files.
+    
+    :return: True if data was written, False if there was nothing new, None if the output file cannot be written.
+    :rtype: bool
+    
+    ..seealso:: :func:`load_state`, :func:`data_extract`
+    """
+    
+    settings = incremental_settings(cospars, precise_epoch, per_satellite, tle_filter, columns)
+    state = load_state(output_file, settings)
+    
+    # Without state, the output is written again from scratch.
+    append = state is not None
+    
+    if state is None:
+        state = new_state(settings)
+    
+    previous_epochs = {satnum: epoch_key(epoch) for satnum, epoch in state["last_epochs"].items()}
+    new_epochs = {satnum: (epoch_key(epoch), epoch) for satnum, epoch in state["last_epochs"].items()}
+    monitor.start(tle_files)
+    
+    def rows():
+        for tle_file in tle_files:
+            if monitor.is_cancelled():
+                return
+            
+            path = os.path.abspath(tle_file)
+            entry = state["files"].get(path)
+            
+            try:
+                stat = os.stat(tle_file)
+                compression = compression_format(tle_file)
+            except FileNotFoundError:
+                logger.error("Unable to find " + tle_file + ".")
+                monitor.finish_file(tle_file)
+                continue
+            
+            plan = _resume_plan(tle_file, entry, stat, compression)
+            
+            if plan is None:
+                monitor.finish_file(tle_file)
+                continue
+            
+            start, line_number, filtered = plan
+            
+            # The compressed files are always extracted from their beginning.
+            if compression is not None:
+                file_rows = _extract_archive_rows(cospars, tle_file, compression, precise_epoch, monitor, error_summary, tle_filter, decoded)
+            else:
+                file_rows = _extract_summarized_rows(cospars, tle_file, mapped_lines(tle_file, start, stat.st_size, line_number), precise_epoch, monitor, error_summary, tle_filter, decoded)
+            
+            for row in file_rows:
+                row_epoch_key = epoch_key(row.epoch)
+                
+                if filtered and row.satnum in previous_epochs and row_epoch_key <= previous_epochs[row.satnum]:
+                    continue
+                
+                if row.satnum not in new_epochs or row_epoch_key > new_epochs[row.satnum][0]:
+                    new_epochs[row.satnum] = (row_epoch_key, row.epoch)
+                
+                yield row
+            
+            # A cancelled file is extracted again next time, keeping only the
+            # TLEs which were not written yet.
+            if monitor.is_cancelled():
+                if entry is None:
+                    state["files"][path] = {"size": -1, "mtime": -1, "offset": 0, "line_number": 1, "hash": None}
+                else:
+                    state["files"][path] = dict(entry, size=-1, mtime=-1, cancelled=True)
+                return
+            
+            state["files"][path] = _state_entry(tle_file, stat, compression, start, line_number)
+            monitor.finish_file(tle_file)
+    
+    extraction_success = write_output(order(rows()), output_file, per_satellite, append, output_format, columns)
+    
+    if extraction_success is not None:
+        state["last_epochs"] = {satnum: epoch for satnum, (last_epoch_key, epoch) in new_epochs.items()}
+        save_state(output_file, state)
+    
+    return extraction_success
+
+def data_extract(cospar, tle_files, output_file, workers=1, chunk_size=CHUNK_SIZE, precise_epoch=False, use_index=False, per_satellite=False, monitor=None, incremental=False, output_format=None, sort=False, deduplicate=False, error_summary=False, tle_filter=None, columns=None, cache=None):
+    """Extracts orbital parameters for the given satellite from the given files.
+    
+    The function looks into the TLE files in order to find the TLEs of the
+    satellite. Each found TLE is converted and the values are written into a
+    CSV file as soon as they are available, so that the memory usage stays
+    constant whatever the size of the files. The binary output formats are
+    written by blocks of rows, see :mod:`writers`.
+    
+    Several satellites can be extracted in a single pass over the files, by
+    giving a set of designators. Their TLEs are written in the same output
+    file, or in one output file per satellite (see :func:`satellite_output_file`).
+    
+    The TLE files must be formatted like this:
+    
+        1 00005U 58002B   14001.18782563  .00000040  00000-0  40921-4 0  1802
+        2 00005 034.2515 294.1619 1849340 178.4613 182.2758 10.84381573949160
+        1 00011U 59001A   14001.49929578  .00000254  00000-0  11590-3 0   627
+        2 00011 032.8774 265.3546 1476296 264.4994 078.6020 11.84019141336756
+        1 00012U 59001B   14001.15043527  .00000935  00000-0  54042-3 0  7398
+        2 00012 032.9115 320.5248 1673017 279.4922 062.1207 11.42639539252314
+    
+    The name of the satellite may come before each TLE (3LE files), it is then
+    written in the last column. Blank lines and stray lines are skipped, see
+    :func:`frame_tles`.
+    
+    :param cospar: International or COSPAR designator / NSSDC ID, set of designators, or None for all satellites.
+    :type cospar: str
+    :param tle_files: List of TLE filenames and paths.
+    :type tle_files: list
+    :param output_file: path and filename of the output file.
+    :type output_file: str
+    :param workers: Number of processes used for the extraction, or None for one per processor.
+    :type workers: int
+    :param chunk_size: Approximate size in bytes of the pieces of files given to the processes.
+    :type chunk_size: int
+    :param precise_epoch: Whether to keep the microseconds of the epochs, see :func:`epoch_to_datetime`.
+    :type precise_epoch: bool
+    :param use_index: Whether to use the indexes of the files when a satellite is given, see :func:`load_index`.
+    :type use_index: bool
+    :param per_satellite: Whether to write one output file per satellite. All the files stay open until the end, so this is meant for a set of designators rather than for the full extraction.
+    :type per_satellite: bool
+    :param monitor: Follows the progress of the extraction and allows to cancel it, the rows extracted before the cancellation are written. With a profile, it also measures the stages of the extraction, see :class:`ExtractionProfile`.
+    :type monitor: ExtractionMonitor
+    :param incremental: Whether to only append the new TLEs since the previous incremental extraction into the same output file, see :func:`load_state`. The files are then read by a single process, without index. The output format must allow appending, see :func:`writers.can_append`.
+    :type incremental: bool
+    :param output_format: Format of the output files, see :data:`writers.FORMATS`, or None to choose it with the extension of the output file.
+    :type output_format: str
+    :param sort: Whether to sort the rows by satellite and epoch instead of keeping the order of the files, see :func:`sorted_rows`. With ``incremental``, only the new rows are sorted.
+    :type sort: bool
+    :param deduplicate: Whether to drop the TLEs found several times, with the same satellite number, epoch and element number. The rows are then sorted too.
+    :type deduplicate: bool
+    :param error_summary: Whether to log a summary of the errors of each file instead of one message per invalid TLE, see :class:`ErrorSummary`.
+    :type error_summary: bool
+    :param tle_filter: Conditions on the fields of the TLEs, such as an epoch range or a minimal mean motion. They are checked on the columns of the lines, before the TLEs are decoded, see :class:`TLEFilter`.
+    :type tle_filter: TLEFilter
+    :param columns: Keys of the columns to write, in their order (see :data:`CSV_KEYS`), or None for all of them. The other fields are not decoded at all, unless they are needed to arrange the rows, see :func:`decoded_columns`. With ``incremental``, changing the columns starts the output over.
+    :type columns: list
+    :param cache: Keeps the valid TLEs of the files between the extractions, so that the next extractions of the same files do not read them again, see :class:`RecordCache`. The files not kept yet are read through their index with ``use_index``, and those too large to be kept are extracted by the workers, see :func:`extract_rows`. It is not used by the incremental extractions.
+    :type cache: RecordCache
+    :return: True if data was written, False if there was nothing to extract, None if the output file cannot be written.
+    :rtype: bool
+    :raise ValueError: If a column is unknown, see :func:`select_columns`.
+    
+    ..note:: When there is a problem at a certain TLE, this TLE is skipped.
+    ..seealso:: :func:`convert_tle`, :func:`extract_rows`
+    """
+    cospars = designator_set(cospar)
+    
+    if incremental:
+        # Imported here since the writers use this module.
+        import writers
+        
+        if not writers.can_append(output_file, output_format):
+            logger.error("The incremental extractions cannot append to " + output_file + ", use the CSV or the binary format.")
+            return None
+    
+    if cospars is not None:
+        logger.info("Extracting data for " + ", ".join(sorted(cospars)) + ".")
+    else:
+        logger.info("Extracting all data in files:\n" + "\n".join(["\t" + file for file in tle_files]))
+    
+    if monitor is None:
+        monitor = ExtractionMonitor()
+    
+    # Only the fields which are written or needed to arrange the rows are
+    # decoded.
+    if columns is not None:
+        columns = select_columns(columns)
+    
+    decoded = decoded_columns(columns, per_satellite, sort or deduplicate, incremental)
+    
+    # The duplicates are found by sorting the rows, so that the memory usage
+    # stays bounded.
+    if sort or deduplicate:
+        order = functools.partial(sorted_rows, deduplicate=deduplicate)
+    else:
+        order = iter
+    
+    profile = monitor.profile
+    
+    if profile is not None:
+        order = _profiled_order(order, profile)
+        profile.start()
+    
+    if incremental:
+        extraction_success = _extract_incrementally(cospars, tle_files, output_file, precise_epoch, per_satellite, output_format, order, monitor, error_summary, tle_filter, columns, decoded)
+    else:
+        rows = order(extract_rows(cospars, tle_files, workers, chunk_size, precise_epoch, use_index, monitor, error_summary, tle_filter, decoded, cache))
+        extraction_success = write_output(rows, output_file, per_satellite, output_format=output_format, columns=columns)
+    
+    if profile is not None:
+        if per_satellite:
+            output_files = [satellite_output_file(output_file, designator) for designator in sorted(cospars or ())]
+        else:
+            output_files = [output_file]
+        
+        profile.stop(output_files)
+    
+    if monitor.is_cancelled():
+        logger.warning("The extraction was cancelled, only the data extracted before was written.")
+    
+    return extraction_success
+
+def _profiled_order(order, profile):
+    """Wraps the function ordering the rows so that the profile measures the time spent to extract and to sort them.
+    
+    ..seealso:: :meth:`ExtractionProfile.timed`
+    """
+    
+    # Without sorting, the rows are arranged as soon as they are extracted.
+    if order is iter:
+        return functools.partial(profile.timed, name="extracted")
+    
+    def profiled_order(rows):
+        return profile.timed(order(profile.timed(rows, "extracted")), "arranged")
+    
+    return profiled_order
+
+def write_output(rows, output_file, per_satellite=False, append=False, output_format=None, columns=None):
+    """Writes the rows in the output file, or in one output file per satellite.
+    
+    :param rows: Iterable of :class:`TLERecord`.
+    :type rows: iterable
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param per_satellite: Whether to write one output file per satellite, see :func:`satellite_output_file`.
+    :type per_satellite: bool
+    :param append: Whether to add the rows at the end of the existing output files.
+    :type append: bool
+    :param output_format: Format of the output files, see :data:`writers.FORMATS`, or None to choose it with the extension of the output file.
+    :type output_format: str
+    :param columns: Keys of the columns to write, see :func:`select_columns`, or None for all of them.
+    :type columns: list
+    :return: True if data was written, False if there was nothing to write, None if an output file cannot be written.
+    :rtype: bool
+    """
+    
+    rows = iter(rows)
+    
+    if per_satellite:
+        return _write_per_satellite(rows, output_file, append, output_format, columns)
+    else:
+        return _write_rows(rows, output_file, append, output_format, columns)
+
+def _write_rows(rows, output_file, append=False, output_format=None, columns=None):
+    """Writes the rows in the output file.
+    
+    :return: True if data was written, False if there was nothing to extract, None if the output file cannot be written.
+    :rtype: bool
+    """
+    
+    # The output file is only created once there is something to write in it.
+    first_row = next(rows, None)
+    
+    if first_row is None:
+        if append:
+            logger.info("There was no new data to append to " + output_file + ".")
+        else:
+            logger.warning("There was no data extracted. " + output_file + " won't be created.")
+        return False
+    
+    writer = _open_writer(output_file, output_format, append, columns)
+    
+    if writer is None:
+        return None
+    
+    with writer:
+        writer.write(first_row)
+        writer.write_rows(rows)
+    
+    logger.info("Wrote " + output_file + ".")
+    return True
@@ -0,0 +1,310 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Watches directories and extracts the TLE files as soon as they arrive.
+
+The directories are polled every :data:`POLL_INTERVAL` seconds. A file is
+extracted once its size and its modification time did not change between two
+polls, so that the files being written are not read too early. The files are
+extracted by a pool of worker processes, driven by :mod:`asyncio`, and their
+rows are appended to the output files as soon as each file is done.
+
+The state of the files is the one of the incremental extraction (see
+:func:`tle.load_state`): the files already extracted are not read again when
+the watch starts over, the files which grew are only read from where they
+stopped, and an incremental extraction of :func:`tle.data_extract` can
+follow a watch into the same output file.
+
+Usage::
+
+    stope.pyw --watch feed/ --output tle.csv --per-satellite
+
+..note:: The directories are polled rather than notified of the changes, since the notifications of the systems are not available in the standard library. With the default interval, the rows are written less than a second after their file is complete.
+"""
+
+import asyncio
+import fnmatch
+import logging
+import os
+import time
+
+import tle
+import writers
+
+logger = logging.getLogger("root")
+
+# Delay between two scans of the directories, in seconds.
+POLL_INTERVAL = 0.2
+
+def scan(directories, pattern="*"):
+    """Lists the files of the directories whose name matches the pattern.
+    
+    The hidden files, whose name starts with a dot, are skipped since they are
+    usually being written before being renamed. The indexes, the states of the
+    extractions and the output files (with the extensions of
+    :data:`writers.EXTENSIONS`) are skipped too. The subdirectories are not
+    scanned.
+    
+    :param directories: Paths of the directories.
+    :type directories: list
+    :param pattern: Pattern of the names of the files, with wildcards.
+    :type pattern: str
+    :return: Dictionary of the size and of the modification time (in nanoseconds) of each file, by absolute path.
+    :rtype: dict
+    """
+    
+    files = {}
+    
+    for directory in directories:
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        
+        with entries:
+            for entry in entries:
+                name = entry.name
+                
+                if name.startswith(".") or tle.INDEX_SUFFIX in name or tle.STATE_SUFFIX in name or os.path.splitext(name)[1].lower() in writers.EXTENSIONS:
+                    continue
+                
+                if not fnmatch.fnmatch(name, pattern):
+                    continue
+                
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                
+                files[os.path.abspath(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+    
+    return files
+
+class DirectoryWatcher:
+    """Extracts the TLE files of directories as soon as they are complete.
+    
+    :param cospar: International or COSPAR designator / NSSDC ID, set of designators, or None for all satellites.
+    :type cospar: str
+    :param directories: Paths of the watched directories.
+    :type directories: list
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param pattern: Pattern of the names of the TLE files, see :func:`scan`.
+    :type pattern: str
+    :param workers: Number of files extracted at once, by as many processes, or None for one per processor.
+    :type workers: int
+    :param interval: Delay between two scans of the directories, in seconds.
+    :type interval: float
+    :param precise_epoch: Whether to keep the microseconds of the epochs, see :func:`tle.epoch_to_datetime`.
+    :type precise_epoch: bool
+    :param per_satellite: Whether to write one output file per satellite, see :func:`tle.satellite_output_file`.
+    :type per_satellite: bool
+    :param output_format: Format of the output files, see :data:`writers.FORMATS`, or None to choose it with the extension of the output file.
+    :type output_format: str
+    :param error_summary: Whether to log a summary of the errors of each file instead of one message per invalid TLE, see :class:`tle.ErrorSummary`.
+    :type error_summary: bool
+    :param tle_filter: Conditions on the fields of the TLEs, see :class:`tle.TLEFilter`.
+    :type tle_filter: tle.TLEFilter
+    :param columns: Keys of the written columns, see :func:`tle.select_columns`, or None for all of them.
+    :type columns: list
+    :raise ValueError: If the rows cannot be appended to the output files, see :func:`writers.can_append`.
+    
+    ..seealso:: :meth:`run`
+    """
+    
+    def __init__(self, cospar, directories, output_file, pattern="*", workers=1, interval=POLL_INTERVAL, precise_epoch=False, per_satellite=False, output_format=None, error_summary=False, tle_filter=None, columns=None):
+        if not writers.can_append(output_file, output_format):
+            raise ValueError("The rows of the watched files cannot be appended to " + output_file + ", use the CSV or the binary format.")
+        
+        self.cospars = tle.designator_set(cospar)
+        self.directories = directories
+        self.output_file = output_file
+        self.pattern = pattern
+        self.workers = workers or os.cpu_count() or 1
+        self.interval = interval
+        self.precise_epoch = precise_epoch
+        self.per_satellite = per_satellite
+        self.output_format = output_format
+        self.error_summary = error_summary
+        self.tle_filter = tle_filter
+        self.columns = tle.select_columns(columns) if columns is not None else None
+        self.decoded = tle.decoded_columns(self.columns, per_satellite, incremental=True)
+        
+        settings = tle.incremental_settings(self.cospars, precise_epoch, per_satellite, tle_filter, self.columns)
+        self.state = tle.load_state(output_file, settings)
+        
+        # Without state, the output is written again from scratch.
+        self.append = self.state is not None
+        
+        if self.state is None:
+            self.state = tle.new_state(settings)
+        
+        # Files waiting or being extracted, and files whose rows could not be
+        # written, with their size and modification time.
+        self.queued = set()
+        self.failed = {}
+        self._stopping = None
+        
+    def stop(self):
+        """Stops the watch, once the files waiting are extracted. This must be called from the event loop."""
+        
+        if self._stopping is not None:
+            self._stopping.set()
+        
+    def _is_new(self, tle_file, signature):
+        """Tells whether the file changed since it was extracted."""
+        
+        entry = self.state["files"].get(tle_file)
+        
+        if entry is not None and (entry["size"], entry["mtime"]) == signature:
+            return False
+        
+        return tle_file not in self.queued and self.failed.get(tle_file) != signature
+        
+    async def run(self):
+        """Watches the directories until :meth:`stop` is called.
+        
+        The files are queued when they are complete, then extracted by
+        :func:`tle.extract_changes` in the worker processes.
+        """
+        
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        queue = asyncio.Queue()
+        
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                logger.error("Unable to find the directory " + directory + ".")
+        
+        logger.info("Watching " + ", ".join(self.directories) + ".")
+        
+        with tle.process_pool(self.workers) as executor:
+            extractors = [asyncio.ensure_future(self._extract(queue, executor)) for i in range(self.workers)]
+            previous_files = {}
+            
+            try:
+                while not self._stopping.is_set():
+                    # The directories are scanned in a thread, so that the rows
+                    # of the files done meanwhile are written.
+                    files = await loop.run_in_executor(None, scan, self.directories, self.pattern)
+                    
+                    for tle_file, signature in files.items():
+                        # The file is complete when it did not change since the
+                        # previous scan.
+                        if previous_files.get(tle_file) == signature and self._is_new(tle_file, signature):
+                            self.queued.add(tle_file)
+                            queue.put_nowait((tle_file, signature, time.monotonic()))
+                    
+                    previous_files = files
+                    
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+                
+                await queue.join()
+            finally:
+                for extractor in extractors:
+                    extractor.cancel()
+                
+                await asyncio.gather(*extractors, return_exceptions=True)
+        
+        logger.info("Stopped watching " + ", ".join(self.directories) + ".")
+        
+    async def _extract(self, queue, executor):
+        """Extracts the queued files one by one, in a worker process."""
+        
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            tle_file, signature, queue_time = await queue.get()
+            
+            try:
+                entry = self.state["files"].get(tle_file)
+                rows, records, entry = await loop.run_in_executor(executor, tle.extract_changes, self.cospars, tle_file, entry, self.state["last_epochs"], self.precise_epoch, self.error_summary, self.tle_filter, self.decoded)
+                
+                for record in records:
+                    logger.handle(record)
+                
+                if entry is not None:
+                    self._write(tle_file, rows, entry)
+                    logger.info("%d new TLEs from %s, written %.3f s after the file was complete.", len(rows), tle_file, time.monotonic() - queue_time)
+            except Exception as error:
+                # The worker processes may die with various errors. The file is
+                # extracted again when it changes.
+                logger.error("Unable to extract " + tle_file + " (" + str(error) + ").")
+                self.failed[tle_file] = signature
+            finally:
+                self.queued.discard(tle_file)
+                queue.task_done()
+        
+    def _write(self, tle_file, rows, entry):
+        """Appends the rows of a file to the output files, then saves the state of the file."""
+        
+        if rows:
+            success = tle.write_output(rows, self.output_file, self.per_satellite, self.append, self.output_format, self.columns)
+            
+            if success is None:
+                # The file is extracted again when it changes.
+                self.failed[tle_file] = (entry["size"], entry["mtime"])
+                return
+            
+            self.append = True
+        
+        last_epochs = self.state["last_epochs"]
+        
+        for row in rows:
+            if row.satnum not in last_epochs or tle.epoch_key(row.epoch) > tle.epoch_key(last_epochs[row.satnum]):
+                last_epochs[row.satnum] = row.epoch
+        
+        self.failed.pop(tle_file, None)
+        self.state["files"][tle_file] = entry
+        tle.save_state(self.output_file, self.state)
+
+def watch(cospar, directories, output_file, **options):
+    """Watches the directories until the program is interrupted, see :class:`DirectoryWatcher`.
+    
+    :return: True once interrupted.
+    :rtype: bool
+    """
+    
+    watcher = DirectoryWatcher(cospar, directories, output_file, **options)
+    
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        logger.info("The watch was interrupted.")
+    
+    return True
@@ -0,0 +1,1024 @@
+﻿# -*- coding: utf-8 -*-
+
+# Copyright or © or Copr. Thomas Duchesne <thomas@duchesne.io>, 2014-2015
+# 
+# This software was funded by the Van Allen Foundation <http://fondation-va.fr>.
+# 
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use, 
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info". 
+# 
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability. 
+# 
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or 
+# data to be ensured and,  more generally, to use and operate it in the 
+# same conditions as regards security. 
+# 
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Writers of the extracted TLEs in the output files.
+
+The CSV format is always available. The binary formats keep the types of the
+data, so the files are smaller and faster to load than the CSV files:
+
+* ``binary``: compact typed binary format without any dependency, see
+  :func:`read_binary`;
+* ``npz``: NumPy archive, readable with ``numpy.load``;
+* ``parquet`` and ``feather``: Apache Arrow formats, readable with pandas.
+
+In the binary formats, the epochs are timestamps in microseconds, the numbers
+are stored as integers or floats, and the satellite numbers and the
+designators are categorical: each distinct value is stored once, and the rows
+hold its code. In NumPy archives, the codes of the column ``satnum`` are in
+the array ``satnum`` and the values in ``satnum_categories``.
+
+All the formats can hold a selection of the columns only, see
+:func:`tle.select_columns`.
+
+The binary formats are written by blocks of :data:`BLOCK_ROWS` rows, so that
+the memory usage does not grow with the number of rows. Only the CSV files
+and the files of the ``binary`` format can be appended to, see
+:func:`can_append`.
+
+..note:: The writers are chosen with the extension of the output file, see :func:`output_format`.
+"""
+
+import abc
+import logging
+import os
+import sys
+import csv
+import array
+import struct
+import datetime
+import functools
+import operator
+
+import tle
+
+logger = logging.getLogger("root")
+
+# Output formats, by extension of the output file.
+EXTENSIONS = {".csv": "csv", ".bin": "binary", ".npz": "npz", ".parquet": "parquet", ".feather": "feather", ".arrow": "feather"}
+
+FORMATS = ["csv", "binary", "npz", "parquet", "feather"]
+
+# Kinds of the columns of the binary formats.
+CATEGORY = "category"
+TIMESTAMP = "timestamp"
+NUMBER = "number"
+
+# Columns of the binary formats, in the order of :data:`tle.CSV_KEYS`: name,
+# kind and typecode of the :mod:`array` holding the values (the codes for the
+# categorical columns).
+SCHEMA = [
+    ("satnum", CATEGORY, "I"),
+    ("cospar", CATEGORY, "I"),
+    ("epoch", TIMESTAMP, "q"),
+    ("mmotd", NUMBER, "d"),
+    ("mmotdd", NUMBER, "d"),
+    ("bstar", NUMBER, "d"),
+    ("ephtype", NUMBER, "b"),
+    ("eltnum", NUMBER, "h"),
+    ("inclin", NUMBER, "d"),
+    ("raan", NUMBER, "d"),
+    ("eccentr", NUMBER, "d"),
+    ("argofper", NUMBER, "d"),
+    ("manomaly", NUMBER, "d"),
+    ("mmot", NUMBER, "d"),
+    ("epochrev", NUMBER, "i"),
+    ("name", CATEGORY, "I")]
+
+# Header of the files of the binary format.
+BINARY_MAGIC = b"STOPE"
+BINARY_VERSION = 4
+
+# Number of rows gathered by the writers of the binary formats before being
+# written as one block, see :class:`BinaryWriter`.
+BLOCK_ROWS = 65536
+
+# Formats whose files can be appended to without being written again.
+APPENDABLE_FORMATS = ["csv", "binary"]
+
+UNIX_EPOCH = datetime.date(1970, 1, 1)
+
+MICROSECONDS_PER_SECOND = 10 ** 6
+
+def output_format(output_file):
+    """Finds the format of an output file from its extension.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :return: Name of the format, see :data:`FORMATS`, CSV for unknown extensions.
+    :rtype: str
+    """
+    
+    return EXTENSIONS.get(os.path.splitext(output_file)[1].lower(), "csv")
+
+def can_append(output_file, file_format=None):
+    """Tells whether rows can be appended to the output file, see :data:`APPENDABLE_FORMATS`.
+    
+    The NumPy archives and the Apache Arrow files can only be written at once,
+    so they cannot be the output of the incremental extractions nor of the
+    watched directories.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param file_format: Name of the format, see :data:`FORMATS`, or None to use the extension of the file.
+    :type file_format: str
+    :rtype: bool
+    """
+    
+    return (file_format or output_format(output_file)) in APPENDABLE_FORMATS
+
+@functools.lru_cache(maxsize=tle.EPOCH_CACHE_SIZE)
+def _date_microseconds(date_str):
+    """Converts a date string (YYYY-MM-DD) to microseconds since 1970."""
+    
+    year, month, day = date_str.split("-")
+    
+    return (datetime.date(int(year), int(month), int(day)) - UNIX_EPOCH).days * 86400 * MICROSECONDS_PER_SECOND
+
+def epoch_timestamp(epoch):
+    """Converts an epoch string of the rows to a timestamp.
+    
+    :param epoch: Epoch, see :func:`tle.epoch_to_datetime`.
+    :type epoch: str
+    :return: Microseconds since the 1st of January 1970.
+    :rtype: int
+    """
+    
+    date_str, time_str = epoch.split(" ")
+    hours, minutes, seconds = time_str.split(":")
+    seconds, point, microseconds = seconds.partition(".")
+    
+    return _date_microseconds(date_str) + ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * MICROSECONDS_PER_SECOND + int(microseconds or 0)
+
+def row_projection(columns):
+    """Builds a function returning the tuple of the values of the selected columns of a row.
+    
+    :param columns: Keys of the columns, see :func:`tle.select_columns`.
+    :type columns: list
+    :rtype: function
+    """
+    
+    indexes = [tle.CSV_KEYS.index(column) for column in columns]
+    
+    # With a single index, itemgetter() returns the value instead of a tuple.
+    if len(indexes) == 1:
+        index = indexes[0]
+        return lambda row: (row[index],)
+    
+    return operator.itemgetter(*indexes)
+
+class Columns:
+    """Typed columns of TLE rows, see :data:`SCHEMA`.
+    
+    :param columns: Keys of the columns to keep, in their order, or None for all the columns of the schema.
+    :type columns: list
+    
+    :ivar length: Number of rows, since the last :meth:`clear`.
+    :ivar schema: The entries of :data:`SCHEMA` of the kept columns.
+    :ivar data: Dictionary of the :class:`array.array` of each column.
+    :ivar categories: Dictionary of the list of the values of each categorical column.
+    """
+    
+    def __init__(self, columns=None):
+        if columns is None:
+            self.schema = SCHEMA
+        else:
+            entries = {entry[0]: entry for entry in SCHEMA}
+            self.schema = [entries[column] for column in columns]
+        
+        self.length = 0
+        self.data = {name: array.array(typecode) for name, kind, typecode in self.schema}
+        self.categories = {name: [] for name, kind, typecode in self.schema if kind == CATEGORY}
+        self._codes = {name: {} for name in self.categories}
+    
+    def _code(self, name, value):
+        """Returns the code of a value of a categorical column, adding it if it is new."""
+        
+        codes = self._codes[name]
+        code = codes.get(value)
+        
+        if code is None:
+            code = codes[value] = len(codes)
+            self.categories[name].append(value)
+        
+        return code
+    
+    def add_categories(self, categories):
+        """Codes the categories of an existing file first, so that their codes stay the same.
+        
+        :param categories: Dictionary of the list of the categories of each categorical column, in the order of their codes.
+        :type categories: dict
+        """
+        
+        for name, values in categories.items():
+            for value in values:
+                self._code(name, value)
+    
+    def clear(self):
+        """Removes the rows, but keeps the categories and their codes for the next rows."""
+        
+        self.length = 0
+        self.data = {name: array.array(typecode) for name, kind, typecode in self.schema}
+    
+    def append(self, row):
+        """Adds a :class:`tle.TLERecord` at the end of the columns."""
+        
+        if self.schema is not SCHEMA:
+            self._append_selected(row)
+            return
+        
+        data = self.data
+        
+        data["satnum"].append(self._code("satnum", row.satnum))
+        data["cospar"].append(self._code("cospar", row.cospar))
+        data["epoch"].append(epoch_timestamp(row.epoch))
+        data["mmotd"].append(row.mmotd)
+        data["mmotdd"].append(row.mmotdd)
+        data["bstar"].append(row.bstar)
+        data["ephtype"].append(row.ephtype)
+        data["eltnum"].append(int(row.eltnum))
+        data["inclin"].append(row.inclin)
+        data["raan"].append(row.raan)
+        data["eccentr"].append(row.eccentr)
+        data["argofper"].append(row.argofper)
+        data["manomaly"].append(row.manomaly)
+        data["mmot"].append(row.mmot)
+        data["epochrev"].append(row.epochrev)
+        data["name"].append(self._code("name", row.name))
+        self.length += 1
+    
+    def _append_selected(self, row):
+        """Adds the values of the kept columns of a row, see :meth:`append`."""
+        
+        for name, kind, typecode in self.schema:
+            value = getattr(row, name)
+            
+            if kind == CATEGORY:
+                value = self._code(name, value)
+            elif kind == TIMESTAMP:
+                value = epoch_timestamp(value)
+            elif name == "eltnum":
+                value = int(value)
+            
+            self.data[name].append(value)
+        
+        self.length += 1
+    
+    def extend(self, values):
+        """Adds the values of other columns at the end of the columns.
+        
+        :param values: Dictionary of the sequence of the values of each column, with the values of the categorical columns and the timestamps of the epochs.
+        :type values: dict
+        :raise ValueError: If the columns are not the same.
+        """
+        
+        if set(values) != set(self.data):
+            raise ValueError("The columns of the existing output file are not the selected ones: " + ", ".join(values) + ".")
+        
+        for name, kind, typecode in self.schema:
+            if kind == CATEGORY:
+                self.data[name].extend(self._code(name, value) for value in values[name])
+            else:
+                self.data[name].extend(values[name])
+        
+        self.length = len(values[self.schema[0][0]])
+    
+    def values(self, name):
+        """Returns the list of the values of a categorical column."""
+        
+        categories = self.categories[name]
+        
+        return [categories[code] for code in self.data[name]]
+
+def _little_endian(data):
+    """Returns a copy of an array in little-endian byte order."""
+    
+    data = array.array(data.typecode, data)
+    
+    if sys.byteorder == "big":
+        data.byteswap()
+    
+    return data
+
+def _write_string(file, text, length_format="<B"):
+    """Writes a string as UTF-8, after its length."""
+    
+    encoded = text.encode("utf-8")
+    file.write(struct.pack(length_format, len(encoded)) + encoded)
+
+def _read_struct(file, struct_format):
+    """Reads numbers packed with the format, see :mod:`struct`.
+    
+    :raise EOFError: If the file ends before.
+    """
+    
+    size = struct.calcsize(struct_format)
+    data = file.read(size)
+    
+    if len(data) < size:
+        raise EOFError
+    
+    values = struct.unpack(struct_format, data)
+    
+    return values[0] if len(values) == 1 else values
+
+def _read_string(file, length_format="<B"):
+    """Reads a string written by :func:`_write_string`.
+    
+    :raise EOFError: If the file ends before.
+    """
+    
+    length = _read_struct(file, length_format)
+    data = file.read(length)
+    
+    if len(data) < length:
+        raise EOFError
+    
+    return data.decode("utf-8")
+
+def _read_values(file, typecode, length, skip=False):
+    """Reads the little-endian values of a column, or skips them.
+    
+    :return: The values, None when skipped.
+    :rtype: array.array
+    :raise EOFError: If the file ends before.
+    """
+    
+    data = array.array(typecode)
+    size = length * data.itemsize
+    
+    if skip:
+        if file.seek(size, os.SEEK_CUR) > os.fstat(file.fileno()).st_size:
+            raise EOFError
+        return None
+    
+    content = file.read(size)
+    
+    if len(content) < size:
+        raise EOFError
+    
+    data.frombytes(content)
+    
+    if sys.byteorder == "big":
+        data.byteswap()
+    
+    return data
+
+def _read_schema(file):
+    """Reads the number of columns of a file of the binary format, then the name, kind and typecode of each of them."""
+    
+    return [(_read_string(file), _read_string(file), _read_string(file)) for i in range(_read_struct(file, "<B"))]
+
+def _read_blocks(file, schema, skip_values=False):
+    """Reads the blocks of rows of a file of the binary format, after its header.
+    
+    An incomplete block at the end of the file, left by a writer which was
+    interrupted, is not read.
+    
+    :param file: File opened in binary mode, at the first block.
+    :param schema: The columns of the file, see :func:`_read_schema`.
+    :type schema: list
+    :param skip_values: Whether to only read the categories.
+    :type skip_values: bool
+    :return: Tuple of the dictionary of the categories of each categorical column, of the dictionary of the list of the values of each block of each column (empty when the values are skipped), and of the offset of the end of the last complete block.
+    :rtype: tuple
+    """
+    
+    categories = {name: [] for name, kind, typecode in schema if kind == CATEGORY}
+    blocks = {name: [] for name, kind, typecode in schema}
+    end = file.tell()
+    
+    while True:
+        new_categories = {}
+        values = {}
+        
+        try:
+            length = _read_struct(file, "<I")
+            
+            for name, kind, typecode in schema:
+                if kind == CATEGORY:
+                    new_categories[name] = [_read_string(file, "<H") for i in range(_read_struct(file, "<I"))]
+                
+                values[name] = _read_values(file, typecode, length, skip_values)
+        except EOFError:
+            break
+        
+        for name in new_categories:
+            categories[name].extend(new_categories[name])
+        
+        if not skip_values:
+            for name in values:
+                blocks[name].append(values[name])
+        
+        end = file.tell()
+    
+    return categories, blocks, end
+
+def read_binary(filename):
+    """Reads a file of the compact binary format, see :class:`BinaryBlocks`.
+    
+    The files of the versions 2 and 3, which hold all the rows at once after
+    their number, can still be read.
+    
+    :param filename: Path of the file.
+    :type filename: str
+    :return: Dictionary of the values of each column: lists of strings for the categorical columns, :class:`array.array` for the others, with the epochs as timestamps in microseconds.
+    :rtype: dict
+    :raise ValueError: If the file is not in the binary format, or is truncated.
+    :raise FileNotFoundError: If the file does not exist.
+    """
+    
+    with open(filename, "rb") as file:
+        if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(filename + " is not a binary TLE file.")
+        
+        values = {}
+        
+        try:
+            version = _read_struct(file, "<B")
+            
+            if version == BINARY_VERSION:
+                schema = _read_schema(file)
+                categories, blocks, end = _read_blocks(file, schema)
+                
+                if end != os.fstat(file.fileno()).st_size:
+                    raise EOFError
+                
+                for name, kind, typecode in schema:
+                    if kind == CATEGORY:
+                        values[name] = [categories[name][code] for block in blocks[name] for code in block]
+                    else:
+                        values[name] = array.array(typecode)
+                        for block in blocks[name]:
+                            values[name].extend(block)
+            elif version in (2, 3):
+                length = _read_struct(file, "<Q")
+                
+                # The files of the version 2 always hold all the columns.
+                count = _read_struct(file, "<B") if version == 3 else len(SCHEMA)
+                
+                for i in range(count):
+                    name, kind, typecode = _read_string(file), _read_string(file), _read_string(file)
+                    
+                    if kind == CATEGORY:
+                        categories = [_read_string(file, "<H") for j in range(_read_struct(file, "<I"))]
+                    
+                    data = _read_values(file, typecode, length)
+                    values[name] = [categories[code] for code in data] if kind == CATEGORY else data
+            else:
+                raise ValueError("Unsupported version of the binary format in " + filename + ".")
+        except EOFError:
+            raise ValueError(filename + " is truncated.")
+    
+    return values
+
+class BinaryBlocks:
+    """Writes the blocks of rows of a file of the compact binary format.
+    
+    The file starts with :data:`BINARY_MAGIC`, the version (8 bits) and the
+    number of columns (8 bits), followed by the name, the kind and the
+    typecode of each column of :attr:`Columns.schema` (as 8-bit length
+    prefixed ASCII strings). The rows follow by blocks: the number of rows of
+    the block (32 bits) then, for each column, the categories added since the
+    previous block for the categorical columns (their number on 32 bits, then
+    each of them as a 16-bit length prefixed UTF-8 string), and the values.
+    All the numbers are little-endian.
+    
+    A block only needs the categories of the previous ones, so the rows are
+    appended by writing new blocks at the end of the file: only the
+    categories of the existing file are read, its values are skipped.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param columns: The columns whose blocks are written, which are given the categories of the existing file when appending.
+    :type columns: Columns
+    :param append: Whether to write the blocks after the ones of the existing file.
+    :type append: bool
+    :raise ValueError: If the existing file cannot be read, or has other columns.
+    :raise PermissionError: If the file cannot be written.
+    """
+    
+    def __init__(self, output_file, columns, append=False):
+        self.schema = columns.schema
+        
+        if append:
+            self.file = open(output_file, "r+b")
+            
+            try:
+                self._resume(output_file, columns)
+            except BaseException:
+                self.file.close()
+                raise
+        else:
+            self.file = open(output_file, "wb")
+            self._write_header()
+        
+        self.written = {name: len(categories) for name, categories in columns.categories.items()}
+    
+    def _write_header(self):
+        """Writes the header of the file, see :class:`BinaryBlocks`."""
+        
+        self.file.write(BINARY_MAGIC + struct.pack("<BB", BINARY_VERSION, len(self.schema)))
+        
+        for name, kind, typecode in self.schema:
+            _write_string(self.file, name)
+            _write_string(self.file, kind)
+            _write_string(self.file, typecode)
+    
+    def _resume(self, output_file, columns):
+        """Reads the columns and the categories of the existing file, and moves to its end."""
+        
+        file = self.file
+        
+        if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(output_file + " is not a binary TLE file.")
+        
+        try:
+            version = _read_struct(file, "<B")
+            schema = _read_schema(file) if version == BINARY_VERSION else None
+        except EOFError:
+            raise ValueError(output_file + " is truncated.")
+        
+        if schema is None:
+            # The files of the previous versions are written again once, as
+            # the first block of a file of the current version.
+            values = read_binary(output_file)
+            columns.extend(values)
+            file.seek(0)
+            file.truncate()
+            self._write_header()
+            self.written = {name: 0 for name in columns.categories}
+            self.write(columns)
+            columns.clear()
+            return
+        
+        if {name for name, kind, typecode in schema} != set(columns.data):
+            raise ValueError("The columns of the existing output file are not the selected ones: " + ", ".join(name for name, kind, typecode in schema) + ".")
+        
+        # The blocks are written in the order of the columns of the file.
+        entries = {entry[0]: entry for entry in SCHEMA}
+        self.schema = [entries[name] for name, kind, typecode in schema]
+        
+        categories, blocks, end = _read_blocks(file, schema, skip_values=True)
+        columns.add_categories(categories)
+        
+        if end != os.fstat(file.fileno()).st_size:
+            logger.warning("The incomplete rows at the end of " + output_file + " were dropped.")
+        
+        file.seek(end)
+        file.truncate()
+    
+    def write(self, columns):
+        """Writes the rows of the columns as a block."""
+        
+        file = self.file
+        file.write(struct.pack("<I", columns.length))
+        
+        for name, kind, typecode in self.schema:
+            if kind == CATEGORY:
+                categories = columns.categories[name][self.written[name]:]
+                file.write(struct.pack("<I", len(categories)))
+                
+                for category in categories:
+                    _write_string(file, category, "<H")
+                
+                self.written[name] += len(categories)
+            
+            file.write(_little_endian(columns.data[name]).tobytes())
+    
+    def close(self):
+        self.file.close()
+
+class NpzBlocks:
+    """Writes the blocks of rows of a compressed NumPy archive.
+    
+    The values of each column are kept in a temporary file until the archive
+    is written, when the writer is closed.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param columns: The columns whose blocks are written.
+    :type columns: Columns
+    :param append: Unused, the archives cannot be appended to.
+    :type append: bool
+    :raise PermissionError: If the file cannot be written.
+    
+    ..warning:: This requires NumPy.
+    """
+    
+    def __init__(self, output_file, columns, append=False):
+        # Imported here, since they are only needed by the NumPy archives.
+        import tempfile
+        
+        self.file = open(output_file, "wb")
+        self.columns = columns
+        self.length = 0
+        self.values = {name: tempfile.TemporaryFile() for name, kind, typecode in columns.schema}
+    
+    def write(self, columns):
+        for name, kind, typecode in columns.schema:
+            self.values[name].write(_little_endian(columns.data[name]).tobytes())
+        
+        self.length += columns.length
+    
+    def close(self):
+        import numpy
+        import shutil
+        import zipfile
+        
+        try:
+            # The archive is laid out like with numpy.savez_compressed(), each
+            # array being copied after its header.
+            with zipfile.ZipFile(self.file, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name, kind, typecode in self.columns.schema:
+                    if kind == TIMESTAMP:
+                        dtype = numpy.dtype("<M8[us]")
+                    else:
+                        dtype = numpy.dtype(typecode).newbyteorder("<")
+                    
+                    with archive.open(name + ".npy", "w", force_zip64=True) as entry:
+                        numpy.lib.format.write_array_header_1_0(entry, {"descr": numpy.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (self.length,)})
+                        self.values[name].seek(0)
+                        shutil.copyfileobj(self.values[name], entry)
+                    
+                    if kind == CATEGORY:
+                        with archive.open(name + "_categories.npy", "w", force_zip64=True) as entry:
+                            numpy.lib.format.write_array(entry, numpy.array(self.columns.categories[name], dtype=str))
+        finally:
+            for values in self.values.values():
+                values.close()
+            
+            self.file.close()
+
+def read_npz(filename):
+    """Reads a NumPy archive written by :class:`NpzBlocks`, see :func:`open_writer` and :func:`read_binary`."""
+    
+    import numpy
+    
+    with numpy.load(filename) as archive:
+        values = {}
+        
+        for name, kind, typecode in SCHEMA:
+            if name not in archive.files:
+                continue
+            
+            if kind == CATEGORY:
+                categories = archive[name + "_categories"].tolist()
+                values[name] = [categories[code] for code in archive[name].tolist()]
+            elif kind == TIMESTAMP:
+                values[name] = archive[name].view("int64").tolist()
+            else:
+                values[name] = archive[name].tolist()
+    
+    return values
+
+def arrow_table(columns, compact=False):
+    """Converts the columns to an Apache Arrow table.
+    
+    :param columns: The columns to convert.
+    :type columns: Columns
+    :param compact: Whether the dictionaries of the categorical columns only hold the categories of these rows, instead of all the categories of the columns.
+    :type compact: bool
+    :rtype: pyarrow.Table
+    
+    ..warning:: This requires pyarrow.
+    """
+    
+    import pyarrow
+    
+    def arrow_array(arrow_type, data):
+        return pyarrow.Array.from_buffers(arrow_type, len(data), [None, pyarrow.py_buffer(_little_endian(data))])
+    
+    arrays = []
+    arrow_types = {"q": pyarrow.int64(), "d": pyarrow.float64(), "b": pyarrow.int8(), "h": pyarrow.int16(), "i": pyarrow.int32(), "I": pyarrow.uint32()}
+    
+    for name, kind, typecode in columns.schema:
+        if kind == CATEGORY:
+            indices = arrow_array(pyarrow.int32(), array.array("i", columns.data[name]))
+            categories = pyarrow.DictionaryArray.from_arrays(indices, pyarrow.array(columns.categories[name], pyarrow.string()))
+            
+            if compact:
+                categories = categories.dictionary_decode().dictionary_encode()
+            
+            arrays.append(categories)
+        elif kind == TIMESTAMP:
+            arrays.append(arrow_array(pyarrow.timestamp("us"), columns.data[name]))
+        else:
+            arrays.append(arrow_array(arrow_types[typecode], columns.data[name]))
+    
+    return pyarrow.Table.from_arrays(arrays, [name for name, kind, typecode in columns.schema])
+
+def read_arrow(table):
+    """Reads an Apache Arrow table written by :func:`arrow_table`, see :func:`read_binary`."""
+    
+    import pyarrow
+    
+    values = {}
+    
+    for name, kind, typecode in SCHEMA:
+        if name not in table.column_names:
+            continue
+        
+        column = table.column(name)
+        
+        if kind == CATEGORY:
+            column = column.cast(pyarrow.string())
+        elif kind == TIMESTAMP:
+            column = column.cast(pyarrow.int64())
+        
+        values[name] = column.to_pylist()
+    
+    return values
+
+class ParquetBlocks:
+    """Writes the blocks of rows of an Apache Parquet file, as row groups.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param columns: The columns whose blocks are written.
+    :type columns: Columns
+    :param append: Unused, the Parquet files cannot be appended to.
+    :type append: bool
+    :raise PermissionError: If the file cannot be written.
+    
+    ..warning:: This requires pyarrow.
+    """
+    
+    def __init__(self, output_file, columns, append=False):
+        self.file = open(output_file, "wb")
+        self.columns = columns
+        # The writer is opened with the schema of the first block.
+        self.writer = None
+    
+    def write(self, columns):
+        import pyarrow.parquet
+        
+        # Each row group has its own dictionaries.
+        table = arrow_table(columns, compact=True)
+        
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.file, table.schema)
+        
+        self.writer.write_table(table)
+    
+    def close(self):
+        try:
+            # A file without rows still has the columns.
+            if self.writer is None:
+                self.write(self.columns)
+            
+            self.writer.close()
+        finally:
+            self.file.close()
+
+def read_parquet(filename):
+    """Reads an Apache Parquet file written by :class:`ParquetBlocks`, see :func:`open_writer` and :func:`read_binary`."""
+    
+    import pyarrow.parquet
+    
+    return read_arrow(pyarrow.parquet.read_table(filename))
+
+class FeatherBlocks:
+    """Writes the blocks of rows of a Feather (Apache Arrow IPC) file, as record batches.
+    
+    The categories only grow from a block to the next, so the dictionaries of
+    the categorical columns are written as deltas.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param columns: The columns whose blocks are written.
+    :type columns: Columns
+    :param append: Unused, the Feather files cannot be appended to.
+    :type append: bool
+    :raise PermissionError: If the file cannot be written.
+    
+    ..warning:: This requires pyarrow.
+    """
+    
+    def __init__(self, output_file, columns, append=False):
+        self.file = open(output_file, "wb")
+        self.columns = columns
+        # The writer is opened with the schema of the first block.
+        self.writer = None
+    
+    def write(self, columns):
+        import pyarrow
+        import pyarrow.ipc
+        
+        table = arrow_table(columns)
+        
+        if self.writer is None:
+            # Compressed like with pyarrow.feather.write_feather().
+            options = pyarrow.ipc.IpcWriteOptions(compression="lz4" if pyarrow.Codec.is_available("lz4") else None, emit_dictionary_deltas=True)
+            self.writer = pyarrow.ipc.new_file(self.file, table.schema, options=options)
+        
+        self.writer.write_table(table)
+    
+    def close(self):
+        try:
+            # A file without rows still has the columns.
+            if self.writer is None:
+                self.write(self.columns)
+            
+            self.writer.close()
+        finally:
+            self.file.close()
+
+def read_feather(filename):
+    """Reads a Feather file written by :class:`FeatherBlocks`, see :func:`open_writer` and :func:`read_binary`."""
+    
+    import pyarrow.feather
+    
+    return read_arrow(pyarrow.feather.read_table(filename))
+
+# Writers of the blocks and functions reading each binary format, with the
+# modules they need.
+BINARY_FORMATS = {
+    "binary": (BinaryBlocks, read_binary, []),
+    "npz": (NpzBlocks, read_npz, ["numpy"]),
+    "parquet": (ParquetBlocks, read_parquet, ["pyarrow", "pyarrow.parquet"]),
+    "feather": (FeatherBlocks, read_feather, ["pyarrow", "pyarrow.ipc", "pyarrow.feather"])}
+
+class Writer(abc.ABC):
+    """Base of the writers of rows, which can be used in a ``with`` statement."""
+    
+    @abc.abstractmethod
+    def write(self, row):
+        """Writes a row, see :class:`tle.TLERecord`."""
+    
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+    
+    @abc.abstractmethod
+    def close(self):
+        """Writes the rows left and closes the output file."""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class CSVWriter(Writer):
+    """Writes rows in a CSV file, with :data:`tle.CSV_HEADER`.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param append: Whether to keep the rows of an existing file.
+    :type append: bool
+    :param columns: Keys of the written columns, or None for all of them.
+    :type columns: list
+    :raise PermissionError: If the file cannot be written.
+    :raise ValueError: If the existing file to append to has other columns.
+    
+    ..note:: When appending, the columns are written in the order of the header of the existing file.
+    """
+    
+    def __init__(self, output_file, append=False, columns=None):
+        if append and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+            columns = self._existing_columns(output_file, columns)
+        else:
+            append = False
+        
+        self.project = row_projection(columns) if columns is not None and columns != tle.CSV_KEYS else None
+        
+        if append:
+            self.file = open(output_file, "a", newline="")
+            self.writer = csv.writer(self.file)
+        else:
+            self.file = open(output_file, "w", newline="")
+            self.writer = csv.writer(self.file)
+            
+            if columns is None:
+                self.writer.writerow(tle.CSV_HEADER)
+            else:
+                self.writer.writerow([tle.CSV_HEADER[tle.CSV_KEYS.index(column)] for column in columns])
+    
+    @staticmethod
+    def _existing_columns(output_file, columns):
+        """Reads the keys of the columns of the existing file, which must be the selected ones."""
+        
+        with open(output_file, "r", newline="") as file:
+            header = next(csv.reader(file), [])
+        
+        keys = [tle.CSV_KEYS[tle.CSV_HEADER.index(name)] if name in tle.CSV_HEADER else name for name in header]
+        
+        if sorted(keys) != sorted(tle.CSV_KEYS if columns is None else columns):
+            raise ValueError("The columns of the existing output file " + output_file + " are not the selected ones: " + ", ".join(header) + ".")
+        
+        return keys
+    
+    def write(self, row):
+        if self.project is not None:
+            row = self.project(row)
+        
+        self.writer.writerow(row)
+    
+    def write_rows(self, rows):
+        if self.project is not None:
+            rows = map(self.project, rows)
+        
+        self.writer.writerows(rows)
+    
+    def close(self):
+        self.file.close()
+
+class BinaryWriter(Writer):
+    """Writes rows in a file of a binary format, see :data:`BINARY_FORMATS`.
+    
+    The rows are gathered in :class:`Columns` and written by blocks of
+    :data:`BLOCK_ROWS` rows. The file is opened first, so that it is known at
+    once if it cannot be written.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param file_format: Name of the format.
+    :type file_format: str
+    :param append: Whether to keep the rows of an existing file, see :func:`can_append`.
+    :type append: bool
+    :param columns: Keys of the written columns, or None for all of them.
+    :type columns: list
+    :raise ImportError: If the module needed by the format is not installed.
+    :raise ValueError: If the existing file to append to cannot be read, has other columns, or is of a format that cannot be appended to.
+    :raise PermissionError: If the file cannot be written.
+    """
+    
+    def __init__(self, output_file, file_format, append=False, columns=None):
+        blocks_class, read_columns, modules = BINARY_FORMATS[file_format]
+        
+        for module in modules:
+            __import__(module)
+        
+        append = append and os.path.exists(output_file) and os.path.getsize(output_file) > 0
+        
+        if append and file_format not in APPENDABLE_FORMATS:
+            raise ValueError("Rows cannot be appended to " + output_file + ", the " + file_format + " files are written at once.")
+        
+        self.columns = Columns(columns)
+        self.blocks = blocks_class(output_file, self.columns, append)
+    
+    def write(self, row):
+        columns = self.columns
+        columns.append(row)
+        
+        if columns.length >= BLOCK_ROWS:
+            self.blocks.write(columns)
+            columns.clear()
+    
+    def close(self):
+        try:
+            if self.columns.length:
+                self.blocks.write(self.columns)
+                self.columns.clear()
+        finally:
+            self.blocks.close()
+
+def open_writer(output_file, file_format=None, append=False, columns=None):
+    """Opens a writer of rows in an output file.
+    
+    See :class:`Writer`.
+    
+    :param output_file: Path of the output file.
+    :type output_file: str
+    :param file_format: Name of the format, see :data:`FORMATS`, or None to use the extension of the file.
+    :type file_format: str
+    :param append: Whether to keep the rows of an existing file.
+    :type append: bool
+    :param columns: Keys of the written columns, see :func:`tle.select_columns`, or None for all of them.
+    :type columns: list
+    :return: The writer.
+    :rtype: Writer
+    :raise ImportError: If the module needed by the format is not installed.
+    :raise ValueError: If the format is unknown, or if the existing file to append to cannot be read or cannot be appended to.
+    :raise PermissionError: If the file cannot be written.
+    """
+    
+    if file_format is None:
+        file_format = output_format(output_file)
+    
+    if file_format == "csv":
+        return CSVWriter(output_file, append, columns)
+    elif file_format in BINARY_FORMATS:
+        return BinaryWriter(output_file, file_format, append, columns)
+    else:
+        raise ValueError("Unknown output format " + file_format + ".")